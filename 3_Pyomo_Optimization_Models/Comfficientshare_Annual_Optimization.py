@@ -0,0 +1,94 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import numpy as np
+import datetime
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import annual_input_data, load_fleet_csv, load_input_data, run_annual_optimization
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Year of 15-minute car data: 'private_fleets_ep.csv' (3 cars) or 'shared_fleets_cs.csv' (5 cars)
+fleet_file = 'private_fleets_ep.csv'
+fleet_path = os.path.join(base_dir, '..', '6_Input_Data_(Preprocessing)', '1_project_data_full', fleet_file)
+
+# Building load, PV generation and price repeated over the year from the season weeks
+summer_file_path = os.path.join(base_dir, 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx')
+winter_file_path = os.path.join(base_dir, 'Pyomo_Optimization_Model_Winter', 'Comfficientshare_v10_Winter.xlsx')
+
+# Blocks solved in parallel ('week' or 'month')
+block = 'week'
+
+# Solver ('gurobi', 'highs' or 'cbc'; None: $COMFFICIENTSHARE_SOLVER or the first installed one), worker processes and the solver threads shared between them
+# (None: one worker per core, the cores split evenly between the workers)
+solver_name = 'gurobi'
+workers = None
+total_threads = None
+
+# Scenario settings and formulation (see Comfficientshare_v9_Summer.py)
+max_shift_share = 0.20   # Max percentage of flexible load that can be shifted (20%)
+shift_window = 24        # Allowing shifts up to ±24 intervals (6 hours)
+receiving_factor = 1.2   # Max flexible load at the receiving interval (120% of original)
+formulation = 'milp'
+
+# Memory budget of all workers together (MB, None: no limit); the largest block model is estimated
+# before the build and rejected ('abort') or replaced by a lighter model for all blocks ('switch')
+memory_budget_mb = None
+memory_budget_action = 'switch'
+
+# ============================================
+# Section 3: Solve the Blocks of the Year
+# ============================================
+
+# The process pool needs the main guard to start its workers on every platform
+if __name__ == '__main__':
+    input_data = annual_input_data(load_fleet_csv(fleet_path), load_input_data(summer_file_path),
+                                   load_input_data(winter_file_path))
+    results_dict, blocks = run_annual_optimization(input_data, block=block, workers=workers,
+                                                   total_threads=total_threads, solver_name=solver_name,
+                                                   memory_budget_mb=memory_budget_mb,
+                                                   memory_budget_action=memory_budget_action,
+                                                   max_shift_share=max_shift_share, shift_window=shift_window,
+                                                   receiving_factor=receiving_factor, formulation=formulation,
+                                                   reporting_variables=False)
+
+    # Changes of the recorded car data (stays merged into the tour, trips limited to the battery range)
+    print(input_data['adjustments'].to_string(index=False))
+
+    # Per-block summary
+    blocks_df = pd.DataFrame(blocks)
+    print(blocks_df[['block', 'first_interval', 'stop', 'cost', 'build_time', 'solve_time', 'worker_peak_memory_MB']].to_string(index=False))
+
+    # Cost of the year
+    total_electricity_cost_PV = float(np.dot(results_dict['P_total'], input_data['C_t']))
+    total_electricity_cost_noPV = float(np.dot(results_dict['P_total_noPV'], input_data['C_t']))
+    print(f"Total electricity cost of the year (With PV): €{total_electricity_cost_PV:.2f}")
+    print(f"Total electricity cost of the year (Without PV): €{total_electricity_cost_noPV:.2f}")
+
+    # ==========================================
+    # Section 4: Write the Year Results
+    # ==========================================
+
+    current_time = datetime.datetime.now()
+    scenario_label = f"{os.path.splitext(fleet_file)[0]}_{round(max_shift_share * 100)}PShift_{shift_window // 4}HLimit_{block.capitalize()}Blocks"
+    folder_name = current_time.strftime(f"OptimizationResults_ANNUAL_{scenario_label}_%Y-%m-%d_%H-%M-%S")
+    os.makedirs(f"Results_Comfficientshare/{folder_name}", exist_ok=True)
+
+    # Results in the format of the monolithic model, the block summaries and the changes of the car data on further sheets
+    output_file_path = os.path.join('Results_Comfficientshare', folder_name, f"{folder_name}.xlsx")
+    with pd.ExcelWriter(output_file_path) as writer:
+        pd.DataFrame(results_dict).to_excel(writer, sheet_name='Results', index=False)
+        blocks_df.to_excel(writer, sheet_name='Blocks', index=False)
+        input_data['adjustments'].to_excel(writer, sheet_name='Adjustments', index=False)
+    print(f"Results saved to Excel file at: {output_file_path}")
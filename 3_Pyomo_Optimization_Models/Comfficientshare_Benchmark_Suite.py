@@ -0,0 +1,61 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import BENCHMARK_CASES, run_benchmark_suite
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+# Synthetic cases: horizon (days, 1-364), fleet size (cars, 1-1000), shift window (intervals,
+# 24 = ±6H ... 96 = ±24H), formulation, PV profile ('summer', 'winter', 'none'), price profile
+# ('dynamic', 'time_of_use', 'flat'), seed, and solve=False to time only the build, e.g.
+# cases = [{'name': 'week_100cars_12H', 'days': 7, 'cars': 100, 'shift_window': 48, 'formulation': 'milp',
+#           'pv_profile': 'winter', 'price_profile': 'time_of_use'}]
+cases = BENCHMARK_CASES
+
+# Solver backend ('gurobi', 'highs' or 'cbc'; None: $COMFFICIENTSHARE_SOLVER or the first installed one)
+solver_name = None
+time_limit = 600
+
+# Repeats of every case (the median and the minimum time are stored)
+repeats = 3
+
+# History of all runs; every case is compared with its previous run and flagged if a phase got
+# more than tolerance slower (and more than min_seconds), or if its objective changed
+history_file = os.path.join('Results_Comfficientshare', 'benchmarks', 'benchmark_history.csv')
+tolerance = 0.25
+min_seconds = 0.05
+
+# Exit with status 1 if a regression was flagged (for automated runs)
+fail_on_regression = False
+
+# ==========================================
+# Section 3: Run the Suite and Flag Changes
+# ==========================================
+
+results_df = run_benchmark_suite(cases, history_file=history_file, solver_name=solver_name, repeats=repeats,
+                                 time_limit=time_limit, tolerance=tolerance, min_seconds=min_seconds)
+columns = ['name', 'variables', 'constraints', 'build_time_median', 'solve_time_median', 'extract_time_median',
+           'termination_condition', 'objective', 'baseline_run', 'regressions']
+with pd.option_context('display.max_colwidth', 80):
+    print(results_df[columns].to_string(index=False))
+print(f"Benchmark history saved to: {history_file}")
+
+regressions = results_df[results_df['regressions'] != '']
+if len(regressions):
+    print(f"{len(regressions)} case(s) flagged as regression:")
+    for _, row in regressions.iterrows():
+        print(f"  {row['name']}: {row['regressions']}")
+    if fail_on_regression:
+        sys.exit(1)
+else:
+    print("No regressions against the previous run")
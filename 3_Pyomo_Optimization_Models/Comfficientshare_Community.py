@@ -0,0 +1,102 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import numpy as np
+import datetime
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import load_community, solve_community
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Input workbooks of the buildings behind the substation (all covering the same intervals)
+season = 'SUMMER'
+building_files = [
+    os.path.join(base_dir, 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx'),
+]
+
+# Large communities for scaling studies: every workbook is repeated building_copies times, the
+# load, PV and car profiles of each copy shifted by whole days
+building_copies = 1
+
+# Capacity of the transformer per building (kW), below the 65 kW connection limit of a building
+transformer_limit_per_building = 40
+
+# Block solver ('highs' or 'gurobi') and worker processes (None: one per core)
+solver_name = 'highs'
+workers = None
+
+# Stop at this relative gap between the feasible schedule and the lower bound
+tolerance = 1e-4
+max_iterations = 50
+
+# Scenario settings and formulation of every building (see Comfficientshare_v9_Summer.py)
+max_shift_share = 0.20   # Max percentage of flexible load that can be shifted (20%)
+shift_window = 24        # Allowing shifts up to ±24 intervals (6 hours)
+receiving_factor = 1.2   # Max flexible load at the receiving interval (120% of original)
+formulation = 'milp'
+
+# ================================================
+# Section 3: Solve the Buildings of the Community
+# ================================================
+
+# The process pool needs the main guard to start its workers on every platform
+if __name__ == '__main__':
+    buildings = []
+    for input_data in load_community(building_files):
+        for copy in range(building_copies):
+            shifted = dict(input_data)
+            for key in ('P_fixed', 'P_flexible', 'P_pv'):
+                shifted[key] = np.roll(np.asarray(input_data[key], dtype=float), copy * 24 * 4)
+            for key in ('car_location', 'car_trip_distance'):
+                shifted[key] = np.roll(input_data[key], copy * 24 * 4, axis=1)
+            buildings.append(shifted)
+    transformer_limit = transformer_limit_per_building * len(buildings)
+
+    building_results, aggregate, iterations = solve_community(buildings, transformer_limit, solver_name=solver_name,
+                                                              workers=workers, tolerance=tolerance,
+                                                              max_iterations=max_iterations,
+                                                              max_shift_share=max_shift_share, shift_window=shift_window,
+                                                              receiving_factor=receiving_factor, formulation=formulation)
+
+    # Convergence table
+    iterations_df = pd.DataFrame(iterations)
+    print(iterations_df.to_string(index=False))
+
+    # Cost of every building and of the community
+    for b, (input_data, results_dict) in enumerate(zip(buildings, building_results)):
+        print(f"Building {b}: electricity cost (With PV) €{np.dot(results_dict['P_total'], input_data['C_t']):.2f}, "
+              f"peak load {max(results_dict['P_total_noPV']):.2f} kW")
+    total_electricity_cost_PV = sum(float(np.dot(results_dict['P_total'], input_data['C_t']))
+                                    for input_data, results_dict in zip(buildings, building_results))
+    print(f"Total electricity cost of the community (With PV): €{total_electricity_cost_PV:.2f}")
+    print(f"Peak load of the community: {max(aggregate['P_total_noPV']):.2f} kW (transformer limit {transformer_limit:.2f} kW)")
+
+    # ==========================================
+    # Section 4: Write the Results
+    # ==========================================
+
+    current_time = datetime.datetime.now()
+    scenario_label = f"{round(max_shift_share * 100)}PShift_{shift_window // 4}HLimit_Community_{len(buildings)}Buildings"
+    folder_name = current_time.strftime(f"OptimizationResults_{season}_{scenario_label}_%Y-%m-%d_%H-%M-%S")
+    os.makedirs(f"Results_Comfficientshare/{folder_name}", exist_ok=True)
+
+    # Aggregate schedule, convergence table and one sheet per building in the format of the
+    # monolithic model
+    output_file_path = os.path.join('Results_Comfficientshare', folder_name, f"{folder_name}.xlsx")
+    with pd.ExcelWriter(output_file_path) as writer:
+        pd.DataFrame(aggregate).to_excel(writer, sheet_name='Aggregate', index=False)
+        iterations_df.to_excel(writer, sheet_name='Iterations', index=False)
+        for b, results_dict in enumerate(building_results):
+            pd.DataFrame(results_dict).to_excel(writer, sheet_name=f'Building_{b}', index=False)
+    print(f"Results saved to Excel file at: {output_file_path}")
@@ -0,0 +1,85 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import numpy as np
+import datetime
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import load_input_data, solve_decomposition
+from comfficientshare.model import STATIC_PARAMETERS
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+# Input workbook of the season
+season = 'SUMMER'
+file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx')
+
+# Large fleets for scaling studies: the cars of the workbook are repeated fleet_copies times, each
+# copy shifted by whole days, and the connection limit is scaled with the number of copies
+fleet_copies = 1
+
+# Subproblem solver ('highs' or 'gurobi'), worker processes and cars per car subproblem
+# (None: one worker per core, the fleet split evenly over the workers)
+solver_name = 'highs'
+workers = None
+chunk_size = None
+
+# Stop at this relative gap between the feasible schedule and the lower bound
+tolerance = 1e-4
+max_iterations = 50
+
+# Scenario settings and formulation (see Comfficientshare_v9_Summer.py)
+max_shift_share = 0.20   # Max percentage of flexible load that can be shifted (20%)
+shift_window = 24        # Allowing shifts up to ±24 intervals (6 hours)
+receiving_factor = 1.2   # Max flexible load at the receiving interval (120% of original)
+formulation = 'milp'
+
+# ================================================
+# Section 3: Solve the Building and the Car Chunks
+# ================================================
+
+# The process pool needs the main guard to start its workers on every platform
+if __name__ == '__main__':
+    input_data = load_input_data(file_path)
+    if fleet_copies > 1:
+        days = 24 * 4
+        input_data['car_ids'] = [f"{car}_{copy}" for copy in range(fleet_copies) for car in input_data['car_ids']]
+        input_data['car_location'] = np.concatenate([np.roll(input_data['car_location'], copy * days, axis=1) for copy in range(fleet_copies)])
+        input_data['car_trip_distance'] = np.concatenate([np.roll(input_data['car_trip_distance'], copy * days, axis=1) for copy in range(fleet_copies)])
+
+    results_dict, iterations = solve_decomposition(input_data, solver_name=solver_name, workers=workers, chunk_size=chunk_size,
+                                                   tolerance=tolerance, max_iterations=max_iterations,
+                                                   upper_power_limit=STATIC_PARAMETERS['Upper_Power_Limit'] * fleet_copies,
+                                                   max_shift_share=max_shift_share, shift_window=shift_window,
+                                                   receiving_factor=receiving_factor, formulation=formulation)
+
+    # Convergence table
+    iterations_df = pd.DataFrame(iterations)
+    print(iterations_df.to_string(index=False))
+
+    total_electricity_cost_PV = float(np.dot(results_dict['P_total'], input_data['C_t']))
+    print(f"Total electricity cost (With PV): €{total_electricity_cost_PV:.2f}")
+
+    # ==========================================
+    # Section 4: Write the Results
+    # ==========================================
+
+    current_time = datetime.datetime.now()
+    scenario_label = f"{round(max_shift_share * 100)}PShift_{shift_window // 4}HLimit_Decomposition_{len(input_data['car_ids'])}Cars"
+    folder_name = current_time.strftime(f"OptimizationResults_{season}_{scenario_label}_%Y-%m-%d_%H-%M-%S")
+    os.makedirs(f"Results_Comfficientshare/{folder_name}", exist_ok=True)
+
+    # Results in the format of the monolithic model, the convergence table on a second sheet
+    output_file_path = os.path.join('Results_Comfficientshare', folder_name, f"{folder_name}.xlsx")
+    with pd.ExcelWriter(output_file_path) as writer:
+        pd.DataFrame(results_dict).to_excel(writer, sheet_name='Results', index=False)
+        iterations_df.to_excel(writer, sheet_name='Iterations', index=False)
+    print(f"Results saved to Excel file at: {output_file_path}")
@@ -0,0 +1,99 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import matplotlib.pyplot as plt
+import numpy as np
+import datetime
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import load_input_data, build_scenario_engine, extract_results, solve_scenario
+from comfficientshare import heuristic_results, heuristic_schedule, load_heuristic_start
+from comfficientshare.engine import apply_warm_start
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+# Input workbook of the season
+season = 'SUMMER'
+file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx')
+
+# Scenario settings (see Comfficientshare_v9_Summer.py)
+max_shift_share = 0.20   # Max percentage of flexible load that can be shifted (20%)
+shift_window = 24        # Allowing shifts up to ±24 intervals (6 hours)
+receiving_factor = 1.2   # Max flexible load at the receiving interval (120% of original)
+Target_SOC_value = 100   # Target SOC, assuming all cars at 100% SOC (Percentage)
+
+# Also solve the exact model ('gurobi' or 'highs', None: heuristic schedules only), with the
+# smart heuristic schedule as MIP start
+solver_name = 'gurobi'
+formulation = 'milp'
+
+# ==================================================
+# Section 3: Heuristic Schedules and Optimized Model
+# ==================================================
+
+input_data = load_input_data(file_path)
+scenario = {'max_shift_share': max_shift_share, 'receiving_factor': receiving_factor, 'target_soc': Target_SOC_value}
+
+schedules = {strategy: heuristic_schedule(input_data, shift_window=shift_window, strategy=strategy, **scenario)
+             for strategy in ('uncontrolled', 'smart')}
+results = {
+    'Uncontrolled': heuristic_results(input_data, schedules['uncontrolled']),
+    'Smart_Heuristic': heuristic_results(input_data, schedules['smart']),
+}
+summary = [{'schedule': name, 'cost': schedules[strategy]['cost'], 'time': schedules[strategy]['run_time']}
+           for name, strategy in (('Uncontrolled', 'uncontrolled'), ('Smart_Heuristic', 'smart'))]
+
+if solver_name is not None:
+    model, solver = build_scenario_engine(input_data, solver_name=solver_name, shift_window=shift_window,
+                                          formulation=formulation, **scenario)
+    load_heuristic_start(model, schedules['smart'])
+    apply_warm_start(model, solver)
+    solved = solve_scenario(model, solver)
+    if solved['cost'] is not None:
+        results['Optimized'] = extract_results(model, input_data)
+        summary.append({'schedule': 'Optimized', 'cost': solved['cost'], 'time': solved['solve_time']})
+
+summary_df = pd.DataFrame(summary)
+summary_df['peak_load'] = [max(results[name]['P_total_noPV']) for name in summary_df['schedule']]
+print(summary_df.to_string(index=False))
+
+# ==========================================
+# Section 4: Write the Results and Plots
+# ==========================================
+
+current_time = datetime.datetime.now()
+scenario_label = f"{round(max_shift_share * 100)}PShift_{shift_window // 4}HLimit_Heuristic"
+folder_name = current_time.strftime(f"OptimizationResults_{season}_{scenario_label}_%Y-%m-%d_%H-%M-%S")
+os.makedirs(f"Results_Comfficientshare/{folder_name}", exist_ok=True)
+
+# One sheet per schedule in the format of the monolithic model, the costs on a summary sheet
+output_file_path = os.path.join('Results_Comfficientshare', folder_name, f"{folder_name}.xlsx")
+with pd.ExcelWriter(output_file_path) as writer:
+    summary_df.to_excel(writer, sheet_name='Summary', index=False)
+    for name, results_dict in results.items():
+        pd.DataFrame(results_dict).to_excel(writer, sheet_name=name, index=False)
+print(f"Results saved to Excel file at: {output_file_path}")
+
+# Comparison plots: total power demand and car charging of the schedules
+colors = {'Uncontrolled': 'darkorange', 'Smart_Heuristic': 'forestgreen', 'Optimized': 'mediumblue'}
+for column, ylabel, title in (('P_total_noPV', 'Power (kW)', 'Total Power Demand without PV System'),
+                              ('P_cars_total', 'Power (kW)', 'Car Charging Total')):
+    plt.figure(figsize=(14, 8))
+    for name, results_dict in results.items():
+        plt.plot(input_data['timeseries'], results_dict[column], label=name.replace('_', ' '), color=colors[name], lw=1.5)
+    plt.xlabel(f'{season.capitalize()} Week Time', fontsize=14)
+    plt.ylabel(ylabel, fontsize=14)
+    plt.title(f'{title}: Uncontrolled, Heuristic and Optimized Schedules', fontsize=16)
+    plt.legend(fontsize=12)
+    plt.grid(linestyle='--', linewidth=0.7, alpha=0.5)
+    plt.savefig(f"Results_Comfficientshare/{folder_name}/Comparison_{column}.png", dpi=300)
+    plt.close()
+print(f"All plots saved in the Results_Comfficientshare folder: Results_Comfficientshare/{folder_name}")
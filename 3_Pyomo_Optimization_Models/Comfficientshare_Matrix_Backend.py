@@ -0,0 +1,65 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import numpy as np
+import pandas as pd
+import os
+import sys
+import time
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import load_input_data, build_matrix_model, check_parity
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+file_paths = {
+    'Summer': os.path.join(base_dir, 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx'),
+    'Winter': os.path.join(base_dir, 'Pyomo_Optimization_Model_Winter', 'Comfficientshare_v10_Winter.xlsx'),
+}
+
+# Solver of the parity check ('gurobi' or 'highs') and linear formulations to compare
+solver_name = 'gurobi'
+formulations = ['milp', 'transport']
+scenario = {'max_shift_share': 0.20, 'receiving_factor': 1.20, 'shift_window': 24}
+
+# Size of the synthetic build benchmark: the weekly input tiled to one year and the fleet tiled to 100 cars
+weeks = 52
+cars = 100
+
+# =====================================================
+# Section 3: Parity Check Against the Pyomo Model
+# =====================================================
+
+parity = []
+for season, file_path in file_paths.items():
+    input_data = load_input_data(file_path)
+    for formulation in formulations:
+        summary = check_parity(input_data, solver_name=solver_name, formulation=formulation, **scenario)
+        summary.update({'season': season, 'formulation': formulation})
+        parity.append(summary)
+
+print(pd.DataFrame(parity)[['season', 'formulation', 'pyomo_cost', 'matrix_cost', 'max_violation', 'parity',
+                            'pyomo_build_time', 'matrix_build_time']].to_string(index=False))
+
+# =====================================================
+# Section 4: Build Time of a One-Year, 100-Car Instance
+# =====================================================
+
+input_data = load_input_data(file_paths['Summer'])
+fleet_copies = -(-cars // len(input_data['car_ids']))
+year_data = {key: np.tile(input_data[key], weeks) for key in ('P_fixed', 'P_flexible', 'P_pv', 'C_t')}
+year_data['car_location'] = np.tile(input_data['car_location'], (fleet_copies, weeks))[:cars]
+year_data['car_trip_distance'] = np.tile(input_data['car_trip_distance'], (fleet_copies, weeks))[:cars]
+
+for formulation in formulations:
+    start = time.perf_counter()
+    mm = build_matrix_model(year_data, formulation=formulation, **scenario)
+    print(f"{formulation}: {cars} cars x {len(year_data['P_fixed'])} intervals, "
+          f"{mm['A'].shape[1]} columns, {mm['A'].shape[0]} rows, {mm['A'].nnz} nonzeros, "
+          f"built in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,55 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import THESIS_SCENARIOS, run_parallel_sweep, scenario_grid
+
+# ==================================
+# Section 2: Sweep Settings
+# ==================================
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Scenario grid: the 14 thesis scenarios (SUMMER/WINTER x 20/30/40/50% x 6H, 50% x 12/18/24H)
+# or any grid of seasons x shift shares x horizons (hours) x receiving factors, e.g.
+# scenarios = scenario_grid(['SUMMER', 'WINTER'], [0.20, 0.50], [6, 24], receiving_factors=[1.2, 1.5])
+scenarios = THESIS_SCENARIOS
+
+# Solver ('gurobi', 'highs' or 'cbc'; None: $COMFFICIENTSHARE_SOLVER or the first installed one)
+# and formulation ('milp' or 'miqcp', Gurobi only)
+solver_name = 'gurobi'
+formulation = 'milp'
+
+# Worker processes and the solver threads shared between them (None: one worker per scenario
+# up to the number of cores, the cores split evenly between the workers)
+workers = None
+total_threads = None
+
+# Results folder of the sweep (None: Results_Sweep_<timestamp> next to this script)
+output_dir = None
+
+# Solve cache: unchanged scenarios are loaded instead of solved again (None disables the cache)
+cache_dir = os.path.join(base_dir, 'Results_Sweep_Cache')
+
+# Write the plots of Comfficientshare_v9_Summer.py / Comfficientshare_v10_Winter.py for every scenario
+plots = True
+
+# ========================================
+# Section 3: Run the Scenarios in Parallel
+# ========================================
+
+# The process pool needs the main guard to start its workers on every platform
+if __name__ == '__main__':
+    summaries = run_parallel_sweep(scenarios, base_dir, output_dir=output_dir, workers=workers,
+                                   total_threads=total_threads, solver_name=solver_name, formulation=formulation,
+                                   cache_dir=cache_dir, plots=plots)
+
+    # Print the sweep summary
+    print(pd.DataFrame(summaries)[['name', 'termination_condition', 'cost', 'cache_hit', 'build_time', 'solve_time', 'threads']].to_string(index=False))
@@ -0,0 +1,75 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pyomo.environ as pyo
+import pandas as pd
+import numpy as np
+import datetime
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import get_solver, load_input_data, solve_rolling_horizon
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+# Input workbook of the season
+season = 'SUMMER'
+file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx')
+
+# Rolling horizon: each window is optimized over optimize_hours, the first commit_hours are kept
+optimize_hours = 48
+commit_hours = 24
+
+# Scenario settings and formulation (see Comfficientshare_v9_Summer.py)
+max_shift_share = 0.20   # Max percentage of flexible load that can be shifted (20%)
+shift_window = 24        # Allowing shifts up to ±24 intervals (6 hours)
+receiving_factor = 1.2   # Max flexible load at the receiving interval (120% of original)
+formulation = 'milp'
+
+# Solver backend of the windows ('gurobi', 'highs' or 'cbc'; None: $COMFFICIENTSHARE_SOLVER or the first
+# installed one)
+solver_name = 'gurobi'
+
+# ===================================================
+# Section 3: Solve the Windows and Stitch the Schedule
+# ===================================================
+
+solver = get_solver(solver_name)
+input_data = load_input_data(file_path)
+results_dict, windows = solve_rolling_horizon(solver, input_data, optimize_hours=optimize_hours, commit_hours=commit_hours,
+                                              max_shift_share=max_shift_share, shift_window=shift_window,
+                                              receiving_factor=receiving_factor, formulation=formulation,
+                                              reporting_variables=False)
+
+# Per-window timing table
+windows_df = pd.DataFrame(windows)
+print(windows_df.to_string(index=False))
+print(f"Total build time {windows_df['build_time'].sum():.2f} s, total solve time {windows_df['solve_time'].sum():.2f} s")
+
+# Cost of the stitched schedule
+total_electricity_cost_PV = float(np.dot(results_dict['P_total'], input_data['C_t']))
+total_electricity_cost_noPV = float(np.dot(results_dict['P_total_noPV'], input_data['C_t']))
+print(f"Total electricity cost (With PV): €{total_electricity_cost_PV:.2f}")
+print(f"Total electricity cost (Without PV): €{total_electricity_cost_noPV:.2f}")
+
+# ==========================================
+# Section 4: Write the Stitched Results
+# ==========================================
+
+current_time = datetime.datetime.now()
+scenario_label = f"{round(max_shift_share * 100)}PShift_{shift_window // 4}HLimit_Rolling_{optimize_hours}H_{commit_hours}H"
+folder_name = current_time.strftime(f"OptimizationResults_{season}_{scenario_label}_%Y-%m-%d_%H-%M-%S")
+os.makedirs(f"Results_Comfficientshare/{folder_name}", exist_ok=True)
+
+# Results in the format of the monolithic model, the window timings on a second sheet
+output_file_path = os.path.join('Results_Comfficientshare', folder_name, f"{folder_name}.xlsx")
+with pd.ExcelWriter(output_file_path) as writer:
+    pd.DataFrame(results_dict).to_excel(writer, sheet_name='Results', index=False)
+    windows_df.to_excel(writer, sheet_name='Windows', index=False)
+print(f"Results saved to Excel file at: {output_file_path}")
@@ -0,0 +1,56 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import load_input_data, build_scenario_engine, run_scenario_sweep
+
+# ==================================
+# Section 2: Sweep Settings
+# ==================================
+
+# Input workbook of the season
+file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx')
+
+# Persistent solver ('gurobi' or 'highs') and formulation ('milp' or 'miqcp', Gurobi only)
+solver_name = 'gurobi'
+formulation = 'milp'
+
+# The shift window changes the model structure, so one model is built per window
+shift_window = 24        # Allowing shifts up to ±24 intervals (6 hours)
+
+# Shift percentages of the sweep, the receiving limit follows the shift percentage (20% -> 120%)
+shift_shares = [0.20, 0.30, 0.40, 0.50]
+scenarios = [{'max_shift_share': share, 'receiving_factor': 1 + share} for share in shift_shares]
+
+# Chain the scenarios: the repaired solution of each scenario is the MIP start of the next
+warm_start = True
+
+# Solve every warm-started scenario again without the MIP start to report the speedup of the
+# warm start on the first incumbent (doubles the solves)
+cold_baseline = False
+
+# ========================================================
+# Section 3: Build Once, Update Parameters and Re-Solve
+# ========================================================
+
+input_data = load_input_data(file_path)
+
+model, solver = build_scenario_engine(input_data, solver_name=solver_name, shift_window=shift_window,
+                                      formulation=formulation, **scenarios[0])
+print(f"Model built and loaded into the persistent solver in {model.engine_build_time:.2f} s")
+
+summaries = run_scenario_sweep(model, solver, scenarios, warm_start=warm_start, cold_baseline=cold_baseline)
+
+# Print the sweep summary (time to the first incumbent and final gap show the effect of the warm start)
+columns = ['max_shift_share', 'receiving_factor', 'termination_condition', 'cost', 'solve_time',
+           'time_to_first_incumbent', 'gap', 'warm_started']
+if cold_baseline:
+    columns += ['cold_solve_time', 'cold_time_to_first_incumbent', 'first_incumbent_speedup']
+print(pd.DataFrame(summaries)[columns].to_string(index=False))
@@ -0,0 +1,53 @@
+# ===========================================
+# Section 1: Libraries and Environment Setup
+# ===========================================
+
+# Import necessary libraries
+import pandas as pd
+import datetime
+import os
+import sys
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from comfficientshare import FORMULATIONS, available_solvers, benchmark_backends
+
+# ==================================
+# Section 2: Settings
+# ==================================
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+file_paths = {
+    'SUMMER': os.path.join(base_dir, 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx'),
+    'WINTER': os.path.join(base_dir, 'Pyomo_Optimization_Model_Winter', 'Comfficientshare_v10_Winter.xlsx'),
+}
+
+# Backends to compare ('gurobi', 'highs', 'cbc'; None: every installed backend) and formulations
+solver_names = None
+formulations = list(FORMULATIONS)
+
+# Time limit of every solve (s, None: no limit)
+time_limit = 600
+
+# Scenario settings (see Comfficientshare_v9_Summer.py)
+scenario = {'max_shift_share': 0.20, 'shift_window': 24, 'receiving_factor': 1.2, 'target_soc': 100}
+
+# ===============================================
+# Section 3: Solve Every Season x Backend x Model
+# ===============================================
+
+print(f"Installed solver backends: {', '.join(available_solvers()) or 'none'}")
+rows = benchmark_backends(file_paths, solver_names=solver_names, formulations=formulations, time_limit=time_limit,
+                          **scenario)
+benchmark_df = pd.DataFrame(rows)
+print(benchmark_df.to_string(index=False))
+
+# ==========================================
+# Section 4: Write the Benchmark Table
+# ==========================================
+
+current_time = datetime.datetime.now()
+os.makedirs('Results_Comfficientshare', exist_ok=True)
+output_file_path = os.path.join('Results_Comfficientshare', current_time.strftime("Solver_Benchmark_%Y-%m-%d_%H-%M-%S.xlsx"))
+benchmark_df.to_excel(output_file_path, index=False)
+print(f"Benchmark table saved to Excel file at: {output_file_path}")
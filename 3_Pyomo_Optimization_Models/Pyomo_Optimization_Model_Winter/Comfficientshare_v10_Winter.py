@@ -4,16 +4,29 @@
 
 # Import necessary libraries
 import pyomo.environ as pyo
-from pyomo.opt import SolverFactory
-import gurobipy as gp
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import datetime
 import os
-
-# Ensure Gurobi solver is being used
-solver = SolverFactory('gurobi')
+import sys
+import time
+
+# Shared ComfficientShare model package (3_Pyomo_Optimization_Models/comfficientshare)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comfficientshare import load_input_data, build_model, extract_results, relaxation_gap, solve_transport_lp
+from comfficientshare import load_cached_solution, solve_cache_key, solve_kpis, store_solution
+from comfficientshare import SOLVER_BACKENDS, check_formulation, get_solver, resolve_solver_name
+from comfficientshare import compute_iis, format_iis_report
+from comfficientshare import solve_with_telemetry, write_telemetry
+from comfficientshare import end_phase, run_summary, start_run_manifest, write_run_manifest
+from comfficientshare import apply_memory_budget, check_feasibility, format_model_size
+
+# Run manifest: wall time, CPU time and memory of every phase of the run, written next to the
+# results workbook (trace_memory also traces the Python allocations, which slows down the build)
+trace_memory = False
+print_run_summary = True
+manifest = start_run_manifest(os.path.basename(__file__), trace_memory=trace_memory)
 
 # =====================================================
 # Section 2: Data Import (Time Series Input from Excel)
@@ -21,444 +34,171 @@ solver = SolverFactory('gurobi')
 
 # Load the Excel file
 file_path = 'examples/Comfficientshare_v10_Winter.xlsx'
-excel_data = pd.ExcelFile(file_path)
-
-# Load 'Building_data' sheet
-building_data = pd.read_excel(excel_data, 'Building_data')
-
-# Parse Building Data
-# -------------------
-# Timeseries
-building_timeseries = pd.to_datetime(building_data['Timeseries'])
-# Fixed power consumption (kW)
-P_fixed = building_data['P_fixed (kW)'].values
-# Flexible power consumption (kW)
-P_flexible = building_data['P_flexible (kW)'].values
-# PV generation (kW)
-P_pv = building_data['P_pv (kW)'].values
-# Electricity cost (€/kWh)
-C_t = building_data['C_t (€/kWh)'].values
-
-# Load 'Cars_location' sheet
-cars_location = pd.read_excel(excel_data, 'Cars_location')
-
-# Parse Car Location Data
-# -----------------------
-# Timeseries
-car_location_timeseries = pd.to_datetime(cars_location['Timeseries'])
-# Car location status (binary values indicating car presence at home)
-car_204E_location = cars_location['204E'].values
-car_213E_location = cars_location['213E'].values
-car_288E_location = cars_location['288E'].values
-car_349E_location = cars_location['349E'].values
-car_397E_location = cars_location['397E'].values
-
-# Load 'Cars_trips_distance' sheet
-cars_trips_distance = pd.read_excel(excel_data, 'Cars_trips_distance')
-
-# Parse Car Trip Distance Data
-# ----------------------------
-# Timeseries
-car_trip_timeseries = pd.to_datetime(cars_trips_distance['Timeseries'])
-# Car trip distances (in km, values appear at the end of each trip)
-car_204E_trip_distance = cars_trips_distance['204E'].fillna(0).values
-car_213E_trip_distance = cars_trips_distance['213E'].fillna(0).values
-car_288E_trip_distance = cars_trips_distance['288E'].fillna(0).values
-car_349E_trip_distance = cars_trips_distance['349E'].fillna(0).values
-car_397E_trip_distance = cars_trips_distance['397E'].fillna(0).values
-
-# Check Data Integrity and Alignment
-# -----------------------------------
-# Ensure that timeseries data across sheets align for consistent indexing
-assert (building_timeseries.equals(car_location_timeseries) and 
-        building_timeseries.equals(car_trip_timeseries)), \
-    "Timeseries data across sheets are misaligned!"
-
-# Organize the imported data in a dictionary for easy reference within Pyomo
-input_data = {
-    'P_fixed': P_fixed,
-    'P_flexible': P_flexible,
-    'P_pv': P_pv,
-    'C_t': C_t,
-    'car_location': {
-        '204E': car_204E_location,
-        '213E': car_213E_location,
-        '288E': car_288E_location,
-        '349E': car_349E_location,
-        '397E': car_397E_location
-    },
-    'car_trip_distance': {
-        '204E': car_204E_trip_distance,
-        '213E': car_213E_trip_distance,
-        '288E': car_288E_trip_distance,
-        '349E': car_349E_trip_distance,
-        '397E': car_397E_trip_distance
-    },
-    'timeseries': building_timeseries
-}
-
-# =================================
-# Section 3: Define Model and Sets
-# =================================
-
-# Define the optimization model
-model = pyo.ConcreteModel()
-
-# Set of time intervals T, corresponding to each 15-minute interval in the week
-model.T = pyo.Set(initialize=range(len(input_data['P_fixed'])), ordered=True)
-
-# Set of cars based on available car identifiers from the input data
-car_ids = ['204E', '213E', '288E', '349E', '397E']
-model.C = pyo.Set(initialize=car_ids, ordered=True)
-
-# Define subsets for car-specific data at each time interval
-# Binary sets for car location status, where '1' indicates the car is at home, '0' if away
-# and distance set indicating trip distance at the end of each trip
-model.car_location = pyo.Param(model.C, model.T, initialize={(car, t): input_data['car_location'][car][t] for car in car_ids for t in range(len(input_data['car_location'][car]))}, within=pyo.Binary)
-model.car_distance = pyo.Param(model.C, model.T, initialize={(car, t): input_data['car_trip_distance'][car][t] if not pd.isnull(input_data['car_trip_distance'][car][t]) else 0 for car in car_ids for t in range(len(input_data['car_trip_distance'][car]))}, within=pyo.NonNegativeReals)
-
-# =================================
-# Section 4: Define Parameters
-# =================================
-
-# Define static parameters within the Pyomo model
-model.SOC_min = pyo.Param(initialize=20)  # Minimum allowable SOC (Percentage)
-model.SOC_max = pyo.Param(initialize=100) # Maximum allowable SOC (Percentage)
-
-# Define parameters within the Pyomo model
-model.P_fixed = pyo.Param(model.T, initialize={t: input_data['P_fixed'][t] for t in model.T}, within=pyo.NonNegativeReals)   # Fixed power consumption at each time interval (kW)
-
-model.P_flexible = pyo.Param(model.T, initialize={t: input_data['P_flexible'][t] for t in model.T}, within=pyo.NonNegativeReals)   # Flexible power consumption at each time interval (kW)
-
-model.P_pv = pyo.Param(model.T, initialize={t: input_data['P_pv'][t] for t in model.T}, within=pyo.NonNegativeReals)   # PV generation at each time interval (kW)
-
-model.C_t = pyo.Param(model.T, initialize={t: input_data['C_t'][t] for t in model.T}, within=pyo.NonNegativeReals)   # Electricity cost at each time interval (€/kWh)
-
-model.eta = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=0.95)   # Charging efficiency per Car (Percentage)
-
-model.Max_Shifting_Capability = pyo.Param(model.T, within=pyo.NonNegativeReals, initialize=0.20)   # Max percentage of flexible load that can be shifted (Percentage)
-
-model.Upper_Power_Limit = pyo.Param(model.T, within=pyo.NonNegativeReals, initialize=65)   # Upper power limit (kW)
-
-model.Lower_Power_Limit = pyo.Param(model.T, within=pyo.NonNegativeReals, initialize=0)   # Lower power limit (kW)
-
-model.Battery_Capacity = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=84)   # Battery capacity per Car (kWh) 
-
-model.P_car_max = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=11)   # Max Charging Power per Car (11kW for CUPRA Born Charger)
-
-model.Car_Mileage = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=6.28)   # Car mileage per Car (km/kWh)
-
-
-# Target SOC, assuming all cars at 100% SOC
-Target_SOC_value = 100 # Percentage
-model.SOC_Target = pyo.Param(model.C, initialize={car: Target_SOC_value for car in model.C})
-
-
-# =================================================
-# Section 5: Define Variables (Decision Variables)
-# =================================================
-
-# Charging power for each car at each time interval (kW)
-# The domain is non-negative as charging power cannot be negative
-model.P_car_charge = pyo.Var(model.C, model.T, domain=pyo.NonNegativeReals)
-
-# State of Charge (SOC) for each car at each time interval (%)
-# Bounds are defined by SOC_min and SOC_max parameters
-model.SOC = pyo.Var(model.C, model.T, bounds=(model.SOC_min, model.SOC_max))
-
-# Shifted flexible load at each time interval (kW)
-# The domain is non-negative as load shifting cannot reduce the overall load below zero
-model.P_shift = pyo.Var(model.T, domain=pyo.NonNegativeReals)     # Non-negative for fractional flexible loads
-
-# Modify Delta_P_shift to allow forward/backward range of ±24 intervals
-# Allowing shifts up to ±24 intervals (6 hours)
-model.Delta_P_shift = pyo.Var(model.T, domain=pyo.Integers, bounds=(-24, 24))     # Integer shifts within ±6 hours
-
-# Binary variable y_shift[t, delta] that determines whether P_shift[t] is moved to interval t+delta
-model.y_shift = pyo.Var(model.T, range(-24, 25), domain=pyo.Binary)
-
-# Introduce a new binary variable z_shift[t] that is 1 if P_shift[t] > 0, and 0 otherwise
-model.z_shift = pyo.Var(model.T, domain=pyo.Binary)
-
-
-# ========================================================================
-# Section 6: Define Objective Function: Minimize Overall Electricity Costs
-# ========================================================================
-
-# Define the objective function to minimize electricity costs
-def objective_rule(model):
-    return sum(
-        model.C_t[t] * (model.P_fixed[t] + model.P_flexible[t] - model.P_shift[t] 
-            + sum(model.P_shift[t - delta] * model.y_shift[t - delta, delta]  
-                  for delta in range(-24, 25) if 0 <= t - delta < len(model.T))
-            + sum(model.P_car_charge[c, t] for c in model.C) - model.P_pv[t]) for t in model.T)
-
-# Add the objective to the model
-model.objective = pyo.Objective(rule=objective_rule, sense=pyo.minimize)
-
-
-# ==================================================
-# Section 7: Define Constraints (All 5 Constraints)
-# ==================================================
-
-# ==========================================
-# Section 7.1: Car Charging Power Constraint
-# ==========================================
-
-def car_charging_power_rule(model, c, t):
-    # If the car is available for charging (binary 1 in Cars_location sheet)
-    if model.car_location[c, t] == 1:
-        return model.P_car_charge[c, t] <= model.P_car_max[c]
-    # If the car is not available for charging (binary 0 in Cars_location sheet)
-    else:
-        return model.P_car_charge[c, t] == 0
-
-# Add the constraint to the model
-model.car_charging_power_constraint = pyo.Constraint(model.C, model.T, rule=car_charging_power_rule)
-
-# ===========================================================================
-# Section 7.1.1: No charging at the start of the week if SOC is already 100%
-# ===========================================================================
-
-def no_charging_initial_rule(model, c):
-    # At the first time interval, if SOC starts at 100%, P_car_charge should be 0
-    if model.SOC_Target[c] == 100:
-        return model.P_car_charge[c, model.T.first()] == 0
-    else:
-        return pyo.Constraint.Skip
-
-# Add the constraint to the model
-model.no_charging_initial_constraint = pyo.Constraint(model.C, rule=no_charging_initial_rule)
-
-# ================================
-# Section 7.2: Car SOC Constraints
-# ================================
-
-# ===========================================================
-# Car SOC Constraint 7.2.1: Initial SOC at Start of the Week
-# ===========================================================
-
-def initial_soc_rule(model, c):
-    # At the first time interval, all cars start with 100% SOC
-    return model.SOC[c, model.T.first()] == model.SOC_Target[c]
-
-# Add the constraint to the model
-model.initial_soc_constraint = pyo.Constraint(model.C, rule=initial_soc_rule)
-
-# =======================================================
-# Car SOC Constraint 7.2.2: SOC at Departure (SOC_target)
-# =======================================================
-
-def soc_target_rule(model, c, t):
-    # Check if car switches from "at building" (1) to "not at building" (0)
-    if t < model.T.last() and model.car_location[c, t] == 1 and model.car_location[c, t + 1] == 0:
-        return model.SOC[c, t] >= model.SOC_Target[c]
-    else:
-        return pyo.Constraint.Skip
-
-# Add the constraint to the model
-model.soc_target_constraint = pyo.Constraint(model.C, model.T, rule=soc_target_rule)
-
-# =======================================================
-# Car SOC Constraints 7.2.3: SOC at Arrival (SOC_arrival)
-# =======================================================
-
-def soc_arrival_rule(model, c, t):
-    # Check if car switches from "not at building" (0) to "at building" (1)
-    if t < model.T.last() and model.car_location[c, t] == 0 and model.car_location[c, t + 1] == 1:
-        # SOC at arrival based on trip distance; must remain above SOC_min
-        return model.SOC[c, t + 1] == model.SOC_Target[c] - (model.car_distance[c, t] / model.Car_Mileage[c]) * (100 / model.Battery_Capacity[c])
-    else:
-        return pyo.Constraint.Skip
-
-# Additional Constraint: Enforce SOC_min after arrival
-def enforce_minimum_soc_rule(model, c, t):
-    # Ensure SOC does not drop below SOC_min after arriving
-    if t < model.T.last() and model.car_location[c, t] == 0 and model.car_location[c, t + 1] == 1:
-        return model.SOC[c, t + 1] >= model.SOC_min
-    else:
-        return pyo.Constraint.Skip
-
-# Add the constraints to the model
-model.soc_arrival_constraint = pyo.Constraint(model.C, model.T, rule=soc_arrival_rule)
-model.enforce_minimum_soc_constraint = pyo.Constraint(model.C, model.T, rule=enforce_minimum_soc_rule)
-
-# ======================================================
-# Car SOC Constraints 7.2.4: SOC During Charging Periods
-# ======================================================
-
-def soc_during_charging_rule(model, c, t):
-    # Only during the time car is at the building for charging
-    if t > model.T.first() and model.car_location[c, t] == 1 and model.car_location[c, t - 1] == 1:
-        # SOC at time t is equal to SOC at (t-1) plus charging increment
-        return model.SOC[c, t] == model.SOC[c, t - 1] + (model.P_car_charge[c, t] * model.eta[c] * 100 / model.Battery_Capacity[c])
-    else:
-        return pyo.Constraint.Skip
-
-# Additional Constraint: Enforce SOC_max during charging
-def enforce_maximum_soc_rule(model, c, t):
-    # Ensure SOC does not exceed SOC_max during charging
-    if t > model.T.first() and model.car_location[c, t] == 1:
-        return model.SOC[c, t] <= model.SOC_max
-    else:
-        return pyo.Constraint.Skip
-
-# Add the constraints to the model
-model.soc_during_charging_constraint = pyo.Constraint(model.C, model.T, rule=soc_during_charging_rule)
-model.enforce_maximum_soc_constraint = pyo.Constraint(model.C, model.T, rule=enforce_maximum_soc_rule)
-
-# ======================================================
-# Car SOC Constraint 7.2.5: Final SOC at End of the Week
-# ======================================================
-
-def final_soc_rule(model, c):
-    # At the last time interval, ensure the car reaches 100% SOC if it is at home
-    if model.car_location[c, model.T.last()] == 1:
-        return model.SOC[c, model.T.last()] >= model.SOC_Target[c]
-    else:
-        return pyo.Constraint.Skip
-
-# Add the constraint to the model
-model.final_soc_constraint = pyo.Constraint(model.C, rule=final_soc_rule)
-
-# ===============================================
-# Section 7.3: Upper Connection Limit Constraint
-# ===============================================
-
-def upper_power_limit_rule(model, t):
-    return (model.P_fixed[t] + model.P_flexible[t] - model.P_shift[t]  
-        + sum(model.P_shift[t - delta] * model.y_shift[t - delta, delta] for delta in range(-24, 25) if 0 <= t - delta < len(model.T))  # Add received flexible load
-        + sum(model.P_car_charge[c, t] for c in model.C) <= model.Upper_Power_Limit[t])
-
-model.power_limit_upper = pyo.Constraint(model.T, rule=upper_power_limit_rule)
-
-# ==============================================
-# Section 7.4: Lower Connection Limit Constraint
-# ==============================================
-
-def lower_power_limit_rule(model, t):
-    return (model.Lower_Power_Limit[t] <= model.P_fixed[t] + model.P_flexible[t] - model.P_shift[t]  
-        + sum(model.P_shift[t - delta] * model.y_shift[t - delta, delta] for delta in range(-24, 25) if 0 <= t - delta < len(model.T))  # Add received flexible load
-        + sum(model.P_car_charge[c, t] for c in model.C))
-
-model.power_limit_lower = pyo.Constraint(model.T, rule=lower_power_limit_rule)
-
-
-# ================================================
-# Section 7.5: Flexible Load Shifting Constraints
-# ================================================
-
-# ================================================================
-# Flexible Load 7.5.1: Restrict P_shift to Available Flexible Load
-# ================================================================
-# Constraint: Ensure P_shift[t] is between 0 and 20% of P_flexible[t]
-
-# Lower bound: P_shift[t] must be at least 0 kW (shifting is optional)
-def flexible_load_limit_lower_rule(model, t):
-    return model.P_shift[t] >= 0  # Allows no shifting when it's not needed
-
-model.flexible_load_limit_lower = pyo.Constraint(model.T, rule=flexible_load_limit_lower_rule)
-
-# Upper bound: P_shift[t] cannot exceed 20% of P_flexible[t]
-def flexible_load_limit_upper_rule(model, t):
-    return model.P_shift[t] <= model.P_flexible[t] * model.Max_Shifting_Capability[t]
-
-model.flexible_load_limit_upper = pyo.Constraint(model.T, rule=flexible_load_limit_upper_rule)
-
-# =========================================================
-# Flexible Load 7.5.2: Assign Binary Variables for Shifting
-# =========================================================
-
-# This ensures that each P_shift[t] is assigned to exactly one target interval.
-# Constraint to ensure that P_shift[t] is assigned to exactly one time interval
-def shift_assignment_rule(model, t):
-    return sum(model.y_shift[t, delta] for delta in range(-24, 25) if 0 <= t + delta < len(model.T)) == 1
-
-model.shift_assignment = pyo.Constraint(model.T, rule=shift_assignment_rule)
-
-# ================================================================
-# Flexible Load 7.5.3: Enforce Load Balance at the Target Interval
-# ================================================================
-
-# This ensures that no time interval gets overloaded beyond 120% of its original flexible load.
-# Constraint to limit the final flexible load after shifting
-def shifted_load_limit_rule(model, t, delta):
-    if 0 <= t + delta < len(model.T):
-        return model.P_flexible[t + delta] + model.P_shift[t] * model.y_shift[t, delta] <= 1.2 * model.P_flexible[t + delta]
-    else:
-        return pyo.Constraint.Skip
-
-model.shifted_load_limit = pyo.Constraint(model.T, range(-24, 25), rule=shifted_load_limit_rule)
-
-# ===========================================
-# Flexible Load 7.5.4: Enforce Load Shifting
-# ===========================================
-
-# This ensures that P_shift[t] moves to exactly one location and does not disappear.
-# Constraint to ensure the shifted load is assigned properly
-def enforce_shift_rule(model, t):
-    return model.P_shift[t] == sum(model.P_shift[t] * model.y_shift[t, delta] for delta in range(-24, 25) if 0 <= t + delta < len(model.T))
-
-model.enforce_shift = pyo.Constraint(model.T, rule=enforce_shift_rule)
-
-
-# ==========================================================================
-# Flexible Load 7.5.5: Add a Constraint to Link z_shift[t] to P_shift[t]
-# ==========================================================================
-
-def link_z_shift_rule(model, t):
-    return model.P_shift[t] <= model.z_shift[t] * 100  # Big-M method (assuming max P_shift is 100 kW)
-
-model.link_z_shift = pyo.Constraint(model.T, rule=link_z_shift_rule)
-
-# =======================================================================
-# Flexible Load 7.5.6: Define Delta_P_shift[t] based on y_shift[t, delta]
-# =======================================================================
-
-# This ensures that Delta_P_shift represents the actual shift interval.
-# Ensure that Delta_P_shift[t] is 0 when no load is shifted.
-def delta_p_shift_definition_rule(model, t):
-    return model.Delta_P_shift[t] == sum(delta * model.y_shift[t, delta] for delta in range(-24, 25)) * model.z_shift[t]
-
-model.delta_p_shift_definition = pyo.Constraint(model.T, rule=delta_p_shift_definition_rule)
-
-# ============================================================================
-# Flexible Load 7.5.7: Prevent y_shift[t, 0] from being 1 when P_shift[t] > 0
-# ============================================================================
-
-# If P_shift[t] > 0, at least one nonzero shift interval must be chosen.
-def prevent_zero_shift_rule(model, t):
-    return model.y_shift[t, 0] <= 1 - (model.P_shift[t] / (model.P_flexible[t] * model.Max_Shifting_Capability[t] + 1e-6))
-
-model.prevent_zero_shift = pyo.Constraint(model.T, rule=prevent_zero_shift_rule)
+input_data = load_input_data(file_path)
+end_phase(manifest, 'excel_load')
+
+# Unpack the time series used in the results and plots
+building_timeseries = input_data['timeseries']
+P_fixed = input_data['P_fixed']
+P_flexible = input_data['P_flexible']
+P_pv = input_data['P_pv']
+C_t = input_data['C_t']
+car_ids = input_data['car_ids']
+
+# ==========================================================
+# Section 3-7: Build the Model (Sets, Parameters, Variables,
+#              Objective Function and Constraints)
+# ==========================================================
+
+# Scenario settings
+max_shift_share = 0.20   # Max percentage of flexible load that can be shifted (20%)
+shift_window = 24        # Allowing shifts up to ±24 intervals (6 hours)
+receiving_factor = 1.2   # Max flexible load at the receiving interval (120% of original)
+Target_SOC_value = 100   # Target SOC, assuming all cars at 100% SOC (Percentage)
+
+# Formulation of the flexible load shifting
+# 'miqcp': original P_shift * y_shift products, 'milp': exact linearization (pure MILP, much faster)
+# 'transport': divisible shifting (pure LP screening model, lower bound on the cost)
+formulation = 'miqcp'
+
+# Solver backend ('gurobi', 'highs' or 'cbc'; None: $COMFFICIENTSHARE_SOLVER or the first installed one)
+# The 'miqcp' formulation needs Gurobi, HiGHS and CBC solve 'milp' and 'transport'
+solver_name = 'gurobi'
+
+# Also solve the transport LP and report its cost next to the exact model (relaxation gap, one
+# more build and solve per run)
+report_transport_lp = False
+
+# Fold single-variable constraints (charging power limits, SOC bounds, P_shift limits)
+# into variable bounds and fixed variables at build time
+compact = False
+
+# Optimize Delta_P_shift and z_shift as variables (True) or derive the shift interval of the
+# results and the histogram from y_shift after the solve (False, 2 x T fewer integer variables)
+reporting_variables = True
+
+# Memory budget of the model (MB, None: no limit): the model size is estimated from the inputs
+# before the build; a model above the budget is rejected ('abort') or replaced by the first lighter
+# model that fits ('switch': no reporting variables, compaction, then the next formulation)
+memory_budget_mb = None
+memory_budget_action = 'switch'
+
+# Stop before the build if the feasibility pre-check finds infeasible input data (trips below
+# SOC_min, stays too short to recharge, load above the connection limit); False solves anyway
+stop_if_infeasible = True
+
+# Export the model as LP file with symbolic labels (model.lp) after the solve, e.g. to inspect it
+# with another tool (for a week the export takes about as long as the solve)
+write_lp_file = False
+
+# Solve cache: a scenario with unchanged inputs, settings, solver version and model is loaded
+# from the cache instead of being solved again (None disables the cache)
+cache_dir = 'Results_Comfficientshare/solve_cache'
+
+settings = {'max_shift_share': max_shift_share, 'shift_window': shift_window, 'receiving_factor': receiving_factor,
+            'target_soc': Target_SOC_value, 'formulation': formulation, 'compact': compact,
+            'reporting_variables': reporting_variables}
+
+# Structural feasibility pre-check of the input data, before any model is built
+feasibility_issues = check_feasibility(input_data, **settings)
+if len(feasibility_issues):
+    print(f"Feasibility pre-check: {len(feasibility_issues)} structural infeasibilities in the input data")
+    print(feasibility_issues.to_string(index=False))
+    if stop_if_infeasible:
+        sys.exit(1)
+else:
+    print("Feasibility pre-check: no structural infeasibilities found")
+end_phase(manifest, 'feasibility_check')
+
+settings, model_size = apply_memory_budget(input_data, settings, memory_budget_mb, memory_budget_action)
+formulation, compact, reporting_variables = settings['formulation'], settings['compact'], settings['reporting_variables']
+print(f"Model size estimate: {format_model_size(model_size)}")
+solver_name = resolve_solver_name(solver_name)
+check_formulation(solver_name, formulation)
+solver = get_solver(solver_name)
+cache_key = solve_cache_key(input_data, settings, SOLVER_BACKENDS[solver_name]['pyomo_name']) if cache_dir is not None else None
+cached = load_cached_solution(cache_dir, cache_key, input_data) if cache_dir is not None else None
+manifest['metadata'].update(settings, solver_name=solver_name, cache_hit=cached is not None,
+                            model_size={key: value for key, value in model_size.items() if key != 'components'})
+end_phase(manifest, 'cache_lookup')
+
+if cached is None:
+    model = build_model(input_data, **settings)
+
+    if compact:
+        print(f"Model compaction: removed {model.compaction_report['rows']} constraint rows "
+              f"and {model.compaction_report['columns']} fixed variable columns")
+    end_phase(manifest, 'model_build', phases=model.build_phases)
 
 
 # =======================================
-# Section 8: Solver Setup (Using Gurobi)
+# Section 8: Solver Setup (Backend of solver_name)
 # =======================================
 
-# Solve the optimization problem using Gurobi
-results = solver.solve(model, tee=True)
-model.write('model.lp', io_options={'symbolic_solver_labels': True})
-
-# Check the solver status
-if results.solver.termination_condition == pyo.TerminationCondition.optimal:
-    print('Solution is optimal and feasible!')
+# Solve only on a cache miss
+if cached is None:
+    # Solve the optimization problem with the chosen backend; the solver log is parsed into the
+    # solver telemetry (presolve, root relaxation, nodes, incumbent / bound trajectory, gap, memory)
+    solve_start = time.perf_counter()
+    # The solution is loaded only if there is one (an infeasible model is diagnosed below)
+    results, telemetry = solve_with_telemetry(solver, model, tee=True, load_solutions=False)
+    solve_time = time.perf_counter() - solve_start
+    if results.solver.termination_condition == pyo.TerminationCondition.optimal:
+        model.solutions.load_from(results)
+    end_phase(manifest, 'solve')
+    if write_lp_file:
+        model.write('model.lp', io_options={'symbolic_solver_labels': True})
+        end_phase(manifest, 'lp_export')
+
+    # Check the solver status
+    if results.solver.termination_condition == pyo.TerminationCondition.optimal:
+        print('Solution is optimal and feasible!')
+    else:
+        print('1_Solver could not find an optimal solution.')
+
+    if results.solver.termination_condition != 'optimal':
+        print("2_Solver could not find an optimal solution.")
+
+    # Irreducible infeasible subsystem, computed on the in-memory solver model and reported by
+    # constraint / variable bound with the car and the interval
+    if results.solver.termination_condition in (pyo.TerminationCondition.infeasible,
+                                                pyo.TerminationCondition.infeasibleOrUnbounded):
+        iis = compute_iis(model, solver_name, solver=solver, timeseries=building_timeseries)
+        print(format_iis_report(iis))
+        iis.to_csv('model_iis.csv', index=False)
+        print("IIS saved to: model_iis.csv")
+        end_phase(manifest, 'iis')
+
+    # Transport LP screening: cost of the divisible shifting relaxation next to the exact model
+    if results.solver.termination_condition == 'optimal' and report_transport_lp and formulation != 'transport':
+        exact_cost = pyo.value(model.objective)
+        lp_cost, lp_solve_time, _ = solve_transport_lp(solver, input_data, max_shift_share=max_shift_share, shift_window=shift_window,
+                                                       receiving_factor=receiving_factor, target_soc=Target_SOC_value)
+        absolute_gap, relative_gap = relaxation_gap(exact_cost, lp_cost)
+        print(f"Exact model cost ({formulation}): €{exact_cost:.2f}")
+        print(f"Transport LP screening cost: €{lp_cost:.2f} (solved in {lp_solve_time:.2f} s)")
+        print(f"Relaxation gap: €{absolute_gap:.2f} ({relative_gap:.2%})")
+        end_phase(manifest, 'transport_lp_screening')
+
+    # Collect the time series results (power profiles, SOC and charging power per car) and store them in the cache
+    solved = results.solver.termination_condition == 'optimal'
+    if solved:
+        results_dict = extract_results(model, input_data)
+        kpis = solve_kpis(model, results_dict, input_data, solve_time)
+        if cache_dir is not None:
+            store_solution(cache_dir, cache_key, results_dict, kpis)
+        end_phase(manifest, 'result_extraction')
 else:
-    print('1_Solver could not find an optimal solution.')
-
-if results.solver.termination_condition != 'optimal':
-   print("2_Solver could not find an optimal solution.")
-   iis_prob = gp.read('model.lp')
-   iis_prob.computeIIS()
-   iis_prob.write('model_iis.ilp')
+    results_dict, kpis = cached
+    solved = True
+    print(f"Solution loaded from the solve cache ({cache_key[:12]}), solved in {kpis['solve_time']:.2f} s originally")
 
 # ======================================================
 # Section 9: Generate and Write Output (Including Plots)
 # ======================================================
 
 # Check if the optimization problem was solved to optimality
-if results.solver.termination_condition == 'optimal':
+if solved:
     print("Optimization completed successfully. Extracting results...")
 
     # Create a results folder with a timestamp
@@ -466,57 +206,29 @@ if results.solver.termination_condition == 'optimal':
     folder_name = current_time.strftime("OptimizationResults_WINTER_20PShift_6HLimit_%Y-%m-%d_%H-%M-%S")
     os.makedirs(f"Results_Comfficientshare/{folder_name}", exist_ok=True)
 
-    # Initialize dictionaries to store results
-    results_dict = {
-        'Timeseries': building_timeseries,
-        'P_fixed': [P_fixed[t] for t in model.T],
-        'P_flexible': [P_flexible[t] for t in model.T],
-        'P_shift': [model.P_shift[t]() for t in model.T],
-        'Delta_P_shift': [model.Delta_P_shift[t]() for t in model.T],
-        'P_flexible_post_shift': [P_flexible[t] - model.P_shift[t]() +  
-            sum(model.P_shift[t - delta]() * model.y_shift[t - delta, delta]() for delta in range(-24, 25) if 0 <= t - delta < len(model.T))
-            for t in model.T],
-        'P_pv': [P_pv[t] for t in model.T],
-        'P_total': [P_fixed[t] + P_flexible[t] - model.P_shift[t]() + 
-            sum(model.P_shift[t - delta]() * model.y_shift[t - delta, delta]() for delta in range(-24, 25) if 0 <= t - delta < len(model.T)) +
-            sum(model.P_car_charge[c, t]() for c in model.C) - P_pv[t]
-            for t in model.T],
-        'P_total_noPV': [P_fixed[t] + P_flexible[t] - model.P_shift[t]() + 
-            sum(model.P_shift[t - delta]() * model.y_shift[t - delta, delta]() for delta in range(-24, 25) if 0 <= t - delta < len(model.T)) +
-            sum(model.P_car_charge[c, t]() for c in model.C) for t in model.T]
-    }
-
-    # Add SOC results and individual car charging power to the results_dict
-    for car in model.C:
-        results_dict[f'SOC_{car}'] = [model.SOC[car, t]() for t in model.T]
-        results_dict[f'P_car_charge_{car}'] = [model.P_car_charge[car, t]() for t in model.T]
-
-    # Add collective car charging power over all cars
-    results_dict['P_cars_total'] = [sum(model.P_car_charge[c, t]() for c in model.C) for t in model.T]
-
     # Compute total electricity costs
-    total_electricity_cost_PV = sum(results_dict['P_total'][t] * C_t[t] for t in range(len(model.T)))  # With PV
-    total_electricity_cost_noPV = sum(results_dict['P_total_noPV'][t] * C_t[t] for t in range(len(model.T)))  # Without PV
+    total_electricity_cost_PV = sum(results_dict['P_total'][t] * C_t[t] for t in range(len(P_fixed)))  # With PV
+    total_electricity_cost_noPV = sum(results_dict['P_total_noPV'][t] * C_t[t] for t in range(len(P_fixed)))  # Without PV
 
     # Print the values in the VS Code terminal
     print(f"Total electricity cost (With PV): €{total_electricity_cost_PV:.2f}")
     print(f"Total electricity cost (Without PV): €{total_electricity_cost_noPV:.2f}")
 
     # Add the total electricity cost values ONLY in the first row of the last two columns
-    results_dict['Total_Electricity_Cost_PV'] = [total_electricity_cost_PV] + [None] * (len(model.T) - 1)
-    results_dict['Total_Electricity_Cost_noPV'] = [total_electricity_cost_noPV] + [None] * (len(model.T) - 1)
+    results_dict['Total_Electricity_Cost_PV'] = [total_electricity_cost_PV] + [None] * (len(P_fixed) - 1)
+    results_dict['Total_Electricity_Cost_noPV'] = [total_electricity_cost_noPV] + [None] * (len(P_fixed) - 1)
 
     # Compute the total shifted load and the global limit
-    total_shifted_load = sum(model.P_shift[t].value for t in model.T)
-    global_shifted_load_limit = sum(model.P_flexible[t] * model.Max_Shifting_Capability[t] for t in model.T)
+    total_shifted_load = kpis['total_shifted_load']
+    global_shifted_load_limit = kpis['global_shifting_limit']
 
     # Print the values in the VS Code terminal
     print(f"Total shifted load: {total_shifted_load}")
     print(f"Global shifting limit: {global_shifted_load_limit}")
 
     # Add the values in the first row of the last two columns
-    results_dict['Total_Shifted_Load'] = [total_shifted_load] + [None] * (len(model.T) - 1)
-    results_dict['Global_Shifting_Limit'] = [global_shifted_load_limit] + [None] * (len(model.T) - 1)
+    results_dict['Total_Shifted_Load'] = [total_shifted_load] + [None] * (len(P_fixed) - 1)
+    results_dict['Global_Shifting_Limit'] = [global_shifted_load_limit] + [None] * (len(P_fixed) - 1)
 
 
     # Create a DataFrame for numerical results
@@ -527,6 +239,13 @@ if results.solver.termination_condition == 'optimal':
     output_file_path = os.path.join('Results_Comfficientshare', folder_name, file_name)
     results_df.to_excel(output_file_path, index=False)
     print(f"Results saved to Excel file at: {output_file_path}")
+    end_phase(manifest, 'excel_write')
+
+    # Save the solver telemetry of this solve next to the results (not on a cache hit)
+    if cached is None:
+        telemetry_file_path = os.path.join('Results_Comfficientshare', folder_name, 'solver_telemetry.json')
+        write_telemetry(dict(telemetry, solver_name=solver_name, settings=settings), telemetry_file_path)
+        print(f"Solver telemetry saved to: {telemetry_file_path}")
 
 
     # Visualization: Generate and save plots
@@ -543,6 +262,8 @@ if results.solver.termination_condition == 'optimal':
     plt.savefig(f"Results_Comfficientshare/{folder_name}/Total_Power_Demand_with_PV_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300)
     plt.close()
 
+    end_phase(manifest, 'plot_total_power_with_pv')
+
     # 2. Plot Total Power Demand Over Time without PV System
     scenario_label = "20% Shift, 6H Limit"  # Update this based on the scenario
     plt.figure(figsize=(14, 8))
@@ -557,9 +278,11 @@ if results.solver.termination_condition == 'optimal':
     plt.close()
 
 
+    end_phase(manifest, 'plot_total_power_without_pv')
+
     # 3. Plot SOC evolution for each car
     scenario_label = "20% Shift, 6H Limit"  # Update this based on the scenario
-    for car in model.C:
+    for car in car_ids:
         plt.figure(figsize=(14, 8))
         plt.plot(results_df['Timeseries'], results_df[f'SOC_{car}'], label=f'SOC of Car {car}', color='forestgreen', lw=2.5)
         plt.xlabel('Winter Week Time', fontsize=14)
@@ -570,6 +293,8 @@ if results.solver.termination_condition == 'optimal':
         plt.savefig(f"Results_Comfficientshare/{folder_name}/SOC_Car_{car}_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300)
         plt.close()
 
+    end_phase(manifest, 'plot_soc_cars')
+
     # 4. Power Profiles: Fixed, Flexible After Shifting, PV, and Total Car Charging Power (all cars)
     scenario_label = "20% Shift, 6H Limit"  # Update this based on the scenario
     plt.figure(figsize=(14, 8))
@@ -585,9 +310,11 @@ if results.solver.termination_condition == 'optimal':
     plt.savefig(f"Results_Comfficientshare/{folder_name}/Power_Profiles_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300, bbox_inches='tight')
     plt.close()
 
+    end_phase(manifest, 'plot_power_profiles')
+
     # 5. Plot Individual Car Charging Power Profiles
     scenario_label = "20% Shift, 6H Limit"  # Update this based on the scenario
-    for car in model.C:
+    for car in car_ids:
         plt.figure(figsize=(14, 8))
         plt.plot(results_df['Timeseries'], results_df[f'P_car_charge_{car}'], label=f'Charging Power of Car {car} (kW)', color='dodgerblue', lw=2.5)
         plt.xlabel('Winter Week Time', fontsize=14)
@@ -598,18 +325,22 @@ if results.solver.termination_condition == 'optimal':
         plt.savefig(f"Results_Comfficientshare/{folder_name}/Charging_Power_Car_{car}_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300)
         plt.close()
       
-    # 6. Total Car Charging Power (5 cars)
+    end_phase(manifest, 'plot_charging_power_cars')
+
+    # 6. Total Car Charging Power (all cars)
     scenario_label = "20% Shift, 6H Limit"  # Update this based on the scenario
     plt.figure(figsize=(14, 8))
     plt.plot(results_df['Timeseries'], results_df['P_cars_total'], label='Car Charging Total (kW)', color='royalblue', lw=2.5)
     plt.xlabel('Winter Week Time', fontsize=14)
     plt.ylabel('Power (kW)', fontsize=14)
-    plt.title(f'Total Car Charging Power (5 Cars) ({scenario_label})', fontsize=16)
+    plt.title(f'Total Car Charging Power ({len(car_ids)} Cars) ({scenario_label})', fontsize=16)
     plt.legend(fontsize=12)
     plt.grid(linestyle='--', linewidth=0.7, alpha=0.5)
-    plt.savefig(f"Results_Comfficientshare/{folder_name}/5_Cars_Charging_Power_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300)
+    plt.savefig(f"Results_Comfficientshare/{folder_name}/{len(car_ids)}_Cars_Charging_Power_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300)
     plt.close()
     
+    end_phase(manifest, 'plot_total_charging_power')
+
     # 7. Flexible Load Shifts for DSM
     scenario_label = "20% Shift, 6H Limit"  # Update this based on the scenario
     plt.figure(figsize=(14, 8))
@@ -622,6 +353,8 @@ if results.solver.termination_condition == 'optimal':
     plt.savefig(f"Results_Comfficientshare/{folder_name}/Flexible_Load_Shifting_Plot_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300)
     plt.close()
 
+    end_phase(manifest, 'plot_flexible_load_shifting')
+
     # 8. Comparison of Flexible Load Before and After Shifting
     scenario_label = "20% Shift, 6H Limit"  # Update this based on the scenario
     plt.figure(figsize=(14, 8))
@@ -636,6 +369,8 @@ if results.solver.termination_condition == 'optimal':
     plt.close()
 
     
+    end_phase(manifest, 'plot_flexible_load_comparison')
+
     # 9. Flexible_Load_Shifting_Histogram
     # Get the values of Delta_P_shift (number of hours shifted) and P_shift (shifted load)
     # Ensure valid data (replace None values with 0)
@@ -666,13 +401,22 @@ if results.solver.termination_condition == 'optimal':
     plt.legend(['Total Shifted Load'], fontsize=12)
     plt.savefig(f"Results_Comfficientshare/{folder_name}/Flexible_Load_Shifting_Histogram_{scenario_label.replace('%', 'P').replace(', ', '_')}.png", dpi=300)
     plt.close()
+    end_phase(manifest, 'plot_flexible_load_histogram')
 
 
 
     print(f"All plots saved in the Results_Comfficientshare folder: Results_Comfficientshare/{folder_name}")
+
+    # Save the run manifest (phases of this run) next to the results
+    manifest_file_path = os.path.join('Results_Comfficientshare', folder_name, 'run_manifest.json')
+    write_run_manifest(manifest, manifest_file_path)
+    print(f"Run manifest saved to: {manifest_file_path}")
     
 
 
 else:
     print("Optimization was not successful. Please check the model for infeasibility or errors.")
 
+# Where the time and memory of the run went
+if print_run_summary:
+    print(run_summary(manifest)[['phase', 'wall_time', 'cpu_time', 'wall_share', 'rss_delta_MB', 'peak_rss_MB']].to_string(index=False))
@@ -0,0 +1,24 @@
+# ComfficientShare EV charging and flexible load shifting optimization model
+
+from .data import load_fleet_csv, load_input_data
+from .model import FORMULATIONS, build_model
+from .results import extract_results
+from .screening import relaxation_gap, solve_transport_lp
+from .engine import build_scenario_engine, run_scenario_sweep, solve_scenario, update_scenario
+from .matrix import build_matrix_model, check_parity, solve_matrix_model
+from .sweep import THESIS_SCENARIOS, run_parallel_sweep, scenario_grid
+from .plots import write_result_plots
+from .cache import load_cached_solution, solve_cache_key, solve_kpis, store_solution
+from .rolling import solve_rolling_horizon
+from .annual import annual_input_data, block_bounds, run_annual_optimization
+from .decomposition import solve_decomposition
+from .community import load_community, solve_community
+from .heuristic import HEURISTIC_STRATEGIES, heuristic_results, heuristic_schedule, load_heuristic_start
+from .solvers import SOLVER_BACKENDS, available_solvers, check_formulation, get_solver, resolve_solver_name, write_gurobi_iis
+from .solvers import benchmark_backends, solve_with_backend
+from .telemetry import parse_solver_log, solve_with_telemetry, write_telemetry
+from .profiling import end_phase, run_summary, start_run_manifest, write_run_manifest
+from .benchmark import BENCHMARK_CASES, flag_regressions, run_benchmark_suite, synthetic_input_data
+from .sizing import apply_memory_budget, estimate_model_size, format_model_size
+from .feasibility import check_feasibility
+from .iis import compute_iis, format_iis_report
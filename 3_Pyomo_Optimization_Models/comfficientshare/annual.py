@@ -0,0 +1,259 @@
+# ====================================================================
+# Year-Long Optimization in Parallel Weekly / Monthly Blocks
+# ====================================================================
+# The fleet CSVs of 1_project_data_full cover about a year of 15-minute
+# car data. The year is cut into calendar weeks or months and the blocks
+# are solved in a process pool. Only one block model per worker is in
+# memory at a time.
+#
+# The blocks are decoupled instead of handing the SOC over from one block
+# to the next (as the windows of rolling.py do), so they can be solved in
+# parallel: a boundary is placed where every car is away or has been at
+# home long enough to be recharged, every block starts with the cars at
+# the target SOC and ends with the cars at home at the target SOC
+# (final_soc), and the stitched SOC is continuous. This is an
+# approximation of the year model: a car at home at a boundary cannot
+# postpone its charging into the next block and no load is shifted
+# across a boundary, so the stitched schedule is feasible for the year
+# model and its cost is an upper bound on the year optimum.
+
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+
+from .data import INTERVALS_PER_HOUR
+from .model import STATIC_PARAMETERS, build_model, charging_energy_per_interval, trip_energy
+from .results import extract_results
+from .rolling import slice_input_data
+from .sizing import apply_memory_budget, estimate_model_size
+from .solvers import check_formulation, get_solver, resolve_solver_name
+
+
+# Months using the building profile of the summer week (the winter week is used for the others)
+SUMMER_MONTHS = (4, 5, 6, 7, 8, 9)
+
+# Block lengths: calendar weeks (Monday to Sunday) or calendar months
+BLOCK_PERIODS = {'week': 'W', 'month': 'M'}
+
+
+# Building profile of a weekly workbook (load_input_data) for each timestamp, matched by
+# weekday and time of day
+def _tiled_weekly_profile(timeseries, weekly_data, key):
+    week = weekly_data['timeseries']
+    slot = dict(zip(zip(week.dt.dayofweek, week.dt.hour * INTERVALS_PER_HOUR + week.dt.minute // 15), range(len(week))))
+    rows = [slot[(day, interval)] for day, interval in
+            zip(timeseries.dt.dayofweek, timeseries.dt.hour * INTERVALS_PER_HOUR + timeseries.dt.minute // 15)]
+    return np.asarray(weekly_data[key], dtype=float)[rows]
+
+
+# SOC (%) that a car gains per interval when charging at full power (SOC balance of the model)
+def _charge_per_interval():
+    return charging_energy_per_interval() * 100 / STATIC_PARAMETERS['Battery_Capacity']
+
+
+# SOC (%) used by a trip of the given distance (km)
+def _trip_soc(distance):
+    return trip_energy(distance) * 100 / STATIC_PARAMETERS['Battery_Capacity']
+
+
+# Number of charging intervals needed after an arrival to be back at the target SOC
+def _recharge_intervals(distance):
+    return int(np.ceil(_trip_soc(distance) / _charge_per_interval() - 1e-9))
+
+
+# Count a stay at home that is too short to recharge the arriving trip before the next
+# departure (the model requires the target SOC at every departure) as part of the tour:
+# the car stays away and the distance of the trip is added to the next trip, at its arrival
+# interval (the last interval away, where the model takes the distance off the SOC); the
+# combined trip is checked against its own following stay in turn. A tour that does not
+# return before the end of the data keeps the distance at its last interval
+# Returns the number of merged stays
+def _merge_short_stays(car_location, car_trip_distance, max_trip_distance):
+    merged = 0
+    for location, distance in zip(car_location, car_trip_distance):
+        for arrival in np.flatnonzero((location[:-1] == 0) & (location[1:] == 1)):
+            departures = np.flatnonzero(location[arrival + 1:] == 0)
+            if len(departures) == 0:
+                break
+            # Intervals at home arrival+1 .. arrival+stay, charging from the second one
+            stay = departures[0]
+            if stay - 1 < _recharge_intervals(min(distance[arrival], max_trip_distance)):
+                location[arrival + 1:arrival + 1 + stay] = 0
+                returns = np.flatnonzero(location[arrival + 1 + stay:] == 1)
+                next_arrival = arrival + stay + returns[0] if len(returns) else len(location) - 1
+                distance[next_arrival] += distance[arrival]
+                distance[arrival] = 0
+                merged += 1
+    return merged
+
+
+# Year-long input data (same keys as load_input_data) from a fleet (load_fleet_csv) and the
+# summer and winter week workbooks
+# The fleet CSVs contain no building data, so the building load, PV generation and price of
+# the summer / winter week are repeated over the year by weekday and time of day
+# The recorded car data is adapted to the assumptions of the model (every departure at the
+# target SOC, no charging on the way): stays too short to recharge are merged into the tour
+# and a trip that needs more energy than the battery holds between the target SOC and
+# SOC_min (the cars charge on the way, atac / atdc) is limited to that energy
+# The changes are reported per car in input_data['adjustments'] (merged stays, limited trips,
+# recorded and modelled trip distance)
+def annual_input_data(fleet_data, summer_data, winter_data, target_soc=100):
+    timeseries = fleet_data['timeseries']
+    summer = timeseries.dt.month.isin(SUMMER_MONTHS).to_numpy()
+    input_data = dict(fleet_data)
+    for key in ('P_fixed', 'P_flexible', 'P_pv', 'C_t'):
+        input_data[key] = np.where(summer, _tiled_weekly_profile(timeseries, summer_data, key),
+                                   _tiled_weekly_profile(timeseries, winter_data, key))
+
+    max_trip_distance = ((target_soc - STATIC_PARAMETERS['SOC_min']) / 100
+                         * STATIC_PARAMETERS['Battery_Capacity'] * STATIC_PARAMETERS['Car_Mileage'])
+    input_data['car_location'] = fleet_data['car_location'].copy()
+    input_data['car_trip_distance'] = fleet_data['car_trip_distance'].copy()
+    merged = _merge_short_stays(input_data['car_location'], input_data['car_trip_distance'], max_trip_distance)
+    limited = input_data['car_trip_distance'] > max_trip_distance
+    input_data['car_trip_distance'] = np.minimum(input_data['car_trip_distance'], max_trip_distance)
+
+    # Each merged stay removes one arrival of the car
+    recorded_arrivals = ((fleet_data['car_location'][:, :-1] == 0) & (fleet_data['car_location'][:, 1:] == 1)).sum(axis=1)
+    arrivals = ((input_data['car_location'][:, :-1] == 0) & (input_data['car_location'][:, 1:] == 1)).sum(axis=1)
+    input_data['adjustments'] = pd.DataFrame({
+        'car': list(fleet_data['car_ids']),
+        'merged_stays': recorded_arrivals - arrivals,
+        'limited_trips': limited.sum(axis=1),
+        'recorded_distance_km': fleet_data['car_trip_distance'].sum(axis=1),
+        'modelled_distance_km': input_data['car_trip_distance'].sum(axis=1),
+    })
+    print(f"{merged} stays at home too short to recharge merged into the tour, "
+          f"{limited.sum()} trips longer than {max_trip_distance:.0f} km limited to the battery range "
+          f"({input_data['adjustments']['recorded_distance_km'].sum() - input_data['adjustments']['modelled_distance_km'].sum():.0f} km)")
+    return input_data
+
+
+# Intervals at which a block may end without cutting into a car schedule: every car is away
+# (and not arriving in the next interval) or back at the target SOC (recharged at full power)
+def _block_end_allowed(input_data):
+    location = input_data['car_location']
+    n_T = location.shape[1]
+    allowed = np.ones(n_T, dtype=bool)
+    for car_location, distance in zip(location, input_data['car_trip_distance']):
+        arriving = np.r_[(car_location[:-1] == 0) & (car_location[1:] == 1), False]
+        ready = ~arriving
+        for arrival in np.flatnonzero(arriving):
+            ready[arrival + 1:arrival + 1 + _recharge_intervals(distance[arrival])] = False
+        allowed &= ready
+    return allowed
+
+
+# (start, stop) intervals of the blocks of input_data: calendar weeks or months, each boundary
+# moved forward to the first interval at which every car is away or back at the target SOC
+# (the SOC coupling of neighbouring blocks, see the header of this module)
+def block_bounds(input_data, block='week'):
+    if block not in BLOCK_PERIODS:
+        raise ValueError(f"Unknown block '{block}', expected one of {tuple(BLOCK_PERIODS)}")
+    periods = input_data['timeseries'].dt.to_period(BLOCK_PERIODS[block]).to_numpy()
+    allowed_ends = np.flatnonzero(_block_end_allowed(input_data))
+    starts = [0]
+    for boundary in np.flatnonzero(periods[1:] != periods[:-1]) + 1:
+        later = allowed_ends[allowed_ends >= boundary - 1]
+        if len(later) and later[0] + 1 > starts[-1] and later[0] + 1 < len(periods):
+            starts.append(int(later[0]) + 1)
+    stops = starts[1:] + [len(periods)]
+    return list(zip(starts, stops))
+
+
+# Build and solve one block (runs in a worker process)
+# Returns the block summary and its result arrays (extract_results without the timeseries)
+def solve_annual_block(block_input_data, solver_name=None, threads=None, **settings):
+    start = time.perf_counter()
+    model = build_model(block_input_data, **settings)
+    build_time = time.perf_counter() - start
+
+    solver = get_solver(solver_name, threads=threads)
+    start = time.perf_counter()
+    # An infeasible block is reported in its summary instead of stopping the other blocks
+    results = solver.solve(model, load_solutions=False)
+    solve_time = time.perf_counter() - start
+
+    termination_condition = str(results.solver.termination_condition)
+    arrays = None
+    if termination_condition == 'optimal':
+        model.solutions.load_from(results)
+        results_dict = extract_results(model, block_input_data)
+        arrays = {name: np.asarray(values, dtype=float) for name, values in results_dict.items() if name != 'Timeseries'}
+
+    summary = {
+        'termination_condition': termination_condition,
+        'cost': float(pyo.value(model.objective)) if arrays is not None else None,
+        'variables': model.nvariables(),
+        'constraints': model.nconstraints(),
+        'build_time': build_time,
+        'solve_time': solve_time,
+        # Peak memory of the worker process so far (ru_maxrss is in kB on Linux)
+        'worker_peak_memory_MB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'pid': os.getpid(),
+    }
+    return summary, arrays
+
+
+# Solve the year of input_data in weekly or monthly blocks in a process pool; the total
+# solver threads are split evenly between the workers
+#   block      - 'week' or 'month'
+#   memory_budget_mb, memory_budget_action - memory budget of all workers (MB) and the action
+#                if the largest block model does not fit its share ('abort' or 'switch' to a
+#                lighter model for all blocks, see sizing.apply_memory_budget)
+#   **settings - build_model() settings (max_shift_share, shift_window, formulation, ...);
+#                shifts do not cross block boundaries
+# Returns the stitched results (same keys as extract_results) and one summary row per block
+def run_annual_optimization(input_data, block='week', workers=None, total_threads=None, solver_name=None,
+                            memory_budget_mb=None, memory_budget_action='switch', **settings):
+    solver_name = resolve_solver_name(solver_name)
+    bounds = block_bounds(input_data, block)
+    # The end of the data may cut into a car schedule (a car arriving shortly before it),
+    # the last block then leaves out the target SOC at its end
+    allowed_ends = _block_end_allowed(input_data)
+    total_threads = total_threads or os.cpu_count() or 1
+    workers = max(1, min(workers or total_threads, len(bounds)))
+    threads = max(1, total_threads // workers)
+
+    # The workers build their blocks at the same time, so the block with the largest estimated
+    # model has to fit an equal share of the memory budget (before any block is built)
+    if memory_budget_mb is not None:
+        largest = max(bounds, key=lambda bound: estimate_model_size(slice_input_data(input_data, *bound), **settings)['memory_MB'])
+        settings, _ = apply_memory_budget(slice_input_data(input_data, *largest), settings,
+                                          memory_budget_mb / workers, memory_budget_action)
+    check_formulation(solver_name, settings.get('formulation', 'miqcp'))
+
+    start_time = time.perf_counter()
+    summaries = [None] * len(bounds)
+    block_arrays = [None] * len(bounds)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Every worker receives only the input slice of its block
+        futures = {pool.submit(solve_annual_block, slice_input_data(input_data, start, stop), solver_name,
+                               threads, final_soc=bool(allowed_ends[stop - 1]), **settings): i
+                   for i, (start, stop) in enumerate(bounds)}
+        for future in as_completed(futures):
+            i = futures[future]
+            summary, arrays = future.result()
+            start, stop = bounds[i]
+            summaries[i] = dict(block=i, start=start, stop=stop, first_interval=input_data['timeseries'][start], **summary)
+            block_arrays[i] = arrays
+            print(f"Block {i} ({summaries[i]['first_interval']:%Y-%m-%d}, {stop - start} intervals): "
+                  f"{summary['termination_condition']}, cost {summary['cost']}, solved in {summary['solve_time']:.2f} s")
+    wall_time = time.perf_counter() - start_time
+
+    failed = [s['block'] for s in summaries if s['termination_condition'] != 'optimal']
+    if failed:
+        raise RuntimeError(f"Blocks {failed} were not solved to optimality")
+    print(f"{len(bounds)} blocks on {workers} workers x {threads} threads in {wall_time:.2f} s "
+          f"(sum of the block times {sum(s['build_time'] + s['solve_time'] for s in summaries):.2f} s)")
+
+    # Stitched schedule in the result format of extract_results
+    results_dict = {'Timeseries': input_data['timeseries']}
+    for name in block_arrays[0]:
+        results_dict[name] = np.concatenate([arrays[name] for arrays in block_arrays]).tolist()
+    return results_dict, summaries
@@ -0,0 +1,257 @@
+# ====================================================================
+# Synthetic-Instance Benchmark Suite (Scaling and Regression Flags)
+# ====================================================================
+# Synthetic inputs in the format of load_input_data() with a configurable
+# horizon (1 day to 1 year), fleet size (1 to 1000 cars), PV profile and
+# price profile, generated from a seed so every run benchmarks the same
+# instances. Each case is built, solved and extracted several times and
+# the median and minimum times are appended to a history file with the
+# git commit and the hash of the model source. A case is flagged as a
+# regression if a phase got slower than its previous run by more than the
+# tolerance, or if the objective or the termination condition changed.
+
+import datetime
+import os
+import statistics
+import subprocess
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import data as data_module, solvers as solvers_module, telemetry as telemetry_module
+from .cache import SOURCE_MODULES, source_digest
+from .data import INTERVALS_PER_HOUR
+from .model import STATIC_PARAMETERS, build_model
+from .profiling import current_rss_mb
+from .results import extract_results
+from .solvers import SOLVER_BACKENDS, resolve_solver_name, solve_with_backend
+
+
+# PV and price profiles of the synthetic instances
+PV_PROFILES = ('summer', 'winter', 'none')
+PRICE_PROFILES = ('dynamic', 'time_of_use', 'flat')
+
+# Peak PV generation (kW) of the profiles, as in the summer and winter workbooks
+PV_PEAK = {'summer': 30.0, 'winter': 12.0, 'none': 0.0}
+
+# Share of the connection limit headroom (energy over the horizon) the fleet may use for
+# charging; the trip distances of large fleets are scaled down to it so every instance is
+# feasible within the 65 kW connection limit
+FLEET_ENERGY_SHARE = 0.25
+
+# Default suite: from one day with one car to a year of the transport LP, and the build
+# (no solve) of the largest fleets
+BENCHMARK_CASES = [
+    {'name': 'day_1car_6H', 'days': 1, 'cars': 1, 'shift_window': 24, 'formulation': 'milp'},
+    {'name': 'week_5cars_6H', 'days': 7, 'cars': 5, 'shift_window': 24, 'formulation': 'milp'},
+    {'name': 'week_5cars_24H', 'days': 7, 'cars': 5, 'shift_window': 96, 'formulation': 'milp'},
+    {'name': 'week_50cars_6H', 'days': 7, 'cars': 50, 'shift_window': 24, 'formulation': 'milp'},
+    {'name': 'month_20cars_6H_transport', 'days': 28, 'cars': 20, 'shift_window': 24, 'formulation': 'transport'},
+    {'name': 'week_1000cars_6H_build', 'days': 7, 'cars': 1000, 'shift_window': 24, 'formulation': 'milp', 'solve': False,
+     'repeats': 1},
+    {'name': 'year_5cars_6H_build', 'days': 364, 'cars': 5, 'shift_window': 24, 'formulation': 'milp', 'solve': False,
+     'repeats': 1},
+]
+
+# Columns that identify a case in the history (equal values: same instance and model settings)
+CASE_KEYS = ('name', 'days', 'cars', 'shift_window', 'formulation', 'pv_profile', 'price_profile', 'seed', 'solver')
+
+# Timed phases of a case
+BENCHMARK_PHASES = ('build', 'solve', 'extract')
+
+
+# Daily profile (one value per interval of a day) evaluated from hourly anchor values
+def _daily_profile(hourly_values):
+    hours = np.arange(24 * INTERVALS_PER_HOUR) / INTERVALS_PER_HOUR
+    return np.interp(hours, np.arange(len(hourly_values)), hourly_values, period=24)
+
+
+# Synthetic input data in the format of load_input_data()
+#   days          - horizon in days (1 to 364)
+#   cars          - fleet size; the trips of large fleets are scaled to FLEET_ENERGY_SHARE
+#   pv_profile    - 'summer', 'winter' or 'none'
+#   price_profile - 'dynamic' (day-ahead like, PV dip and evening peak), 'time_of_use' or 'flat'
+#   seed          - seed of the random load noise and car schedules
+def synthetic_input_data(days=7, cars=5, pv_profile='summer', price_profile='dynamic', seed=0, start='2024-06-03'):
+    if pv_profile not in PV_PROFILES:
+        raise ValueError(f"Unknown PV profile '{pv_profile}', expected one of {PV_PROFILES}")
+    if price_profile not in PRICE_PROFILES:
+        raise ValueError(f"Unknown price profile '{price_profile}', expected one of {PRICE_PROFILES}")
+    rng = np.random.default_rng(seed)
+    per_day = 24 * INTERVALS_PER_HOUR
+    n_T = days * per_day
+
+    # Building load: fixed base load and flexible load with morning and evening peaks
+    fixed_shape = _daily_profile([1.2, 1.0, 1.0, 1.0, 1.0, 1.2, 1.8, 2.6, 2.4, 2.0, 2.0, 2.2,
+                                  2.4, 2.2, 2.0, 2.0, 2.2, 2.8, 3.4, 3.6, 3.2, 2.6, 2.0, 1.5])
+    flexible_shape = _daily_profile([1.0, 0.5, 0.3, 0.3, 0.3, 0.5, 2.0, 5.0, 6.0, 5.0, 4.0, 4.5,
+                                     5.0, 4.5, 4.0, 4.0, 4.5, 6.0, 8.0, 9.0, 8.0, 6.0, 4.0, 2.0])
+    P_fixed = np.tile(fixed_shape, days) * rng.uniform(0.8, 1.2, n_T)
+    P_flexible = np.tile(flexible_shape, days) * rng.uniform(0.5, 1.5, n_T)
+    P_flexible[rng.random(n_T) < 0.1] = 0.0
+
+    # PV generation: a clear-sky bell from sunrise to sunset scaled by a daily cloudiness
+    sunrise, sunset = (5.5, 21.5) if pv_profile == 'summer' else (8.0, 16.5)
+    hours = np.arange(per_day) / INTERVALS_PER_HOUR
+    bell = np.clip(np.sin(np.pi * (hours - sunrise) / (sunset - sunrise)), 0, None) ** 1.5
+    P_pv = PV_PEAK[pv_profile] * np.tile(bell, days) * np.repeat(rng.uniform(0.3, 1.0, days), per_day)
+
+    # Electricity price (€/kWh)
+    if price_profile == 'flat':
+        C_t = np.full(n_T, 0.30)
+    elif price_profile == 'time_of_use':
+        C_t = np.tile(_daily_profile([0.22] * 6 + [0.30] * 11 + [0.40] * 4 + [0.30] * 3), days)
+    else:
+        C_t = (np.tile(_daily_profile([0.32, 0.31, 0.30, 0.30, 0.30, 0.31, 0.34, 0.35, 0.35, 0.33, 0.31, 0.30,
+                                       0.29, 0.28, 0.28, 0.27, 0.29, 0.30, 0.34, 0.39, 0.40, 0.41, 0.39, 0.35]), days)
+               - 0.003 * P_pv + rng.normal(0, 0.01, n_T))
+
+    # Car schedules: one tour per working day (leaving in the morning, back in the evening) and
+    # an occasional tour on the weekend, at most 150 km; every car is at home at the start and
+    # the end of each day, the distance of a tour is given at its last interval away
+    car_location = np.ones((cars, n_T), dtype=int)
+    car_trip_distance = np.zeros((cars, n_T))
+    weekday = (pd.Timestamp(start).dayofweek + np.arange(days)) % 7
+    for i in range(cars):
+        for day in range(days):
+            if rng.random() < (0.9 if weekday[day] < 5 else 0.3):
+                leave = int(np.clip(rng.normal(7.5, 1.0), 5, 11) * INTERVALS_PER_HOUR)
+                back = int(np.clip(rng.normal(17.5, 1.5), 13, 21) * INTERVALS_PER_HOUR)
+                car_location[i, day * per_day + leave:day * per_day + back] = 0
+                car_trip_distance[i, day * per_day + back - 1] = min(rng.lognormal(np.log(35), 0.5), 150)
+
+    # Scale the tours of large fleets to the charging energy the connection limit allows
+    charging_energy = car_trip_distance.sum() / STATIC_PARAMETERS['Car_Mileage'] / STATIC_PARAMETERS['eta']
+    headroom_energy = np.clip(STATIC_PARAMETERS['Upper_Power_Limit'] - P_fixed - P_flexible, 0, None).sum() / INTERVALS_PER_HOUR
+    if charging_energy > FLEET_ENERGY_SHARE * headroom_energy:
+        car_trip_distance *= FLEET_ENERGY_SHARE * headroom_energy / charging_energy
+
+    return {
+        'P_fixed': P_fixed,
+        'P_flexible': P_flexible,
+        'P_pv': P_pv,
+        'C_t': C_t,
+        'car_ids': [f'S{i:04d}' for i in range(cars)],
+        'car_location': car_location,
+        'car_trip_distance': car_trip_distance,
+        'timeseries': pd.Series(pd.date_range(start, periods=n_T, freq=f'{60 // INTERVALS_PER_HOUR}min')),
+    }
+
+
+# Modules whose source decides the timed phases: the build, compaction and result extraction
+# of the solve cache, the data loading and the solver backends
+BENCHMARK_SOURCE_MODULES = SOURCE_MODULES + (data_module, solvers_module, telemetry_module)
+
+
+# Git commit of the code (with '-dirty' for uncommitted changes) and hash of the source of the
+# modules behind the timings
+def code_version():
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=package_dir, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', '.'], cwd=package_dir, capture_output=True,
+                               text=True, check=True).stdout.strip()
+        commit += '-dirty' if dirty else ''
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'git_commit': commit, 'model_source': source_digest(BENCHMARK_SOURCE_MODULES)[:12]}
+
+
+# Build, solve and extract one case `repeats` times (or the 'repeats' of the case); returns one
+# history row with the median and minimum time of every phase, the model size and the objective
+def run_benchmark_case(case, solver_name=None, repeats=3, time_limit=None):
+    case = dict({'pv_profile': 'summer', 'price_profile': 'dynamic', 'seed': 0, 'solve': True,
+                 'max_shift_share': 0.20, 'receiving_factor': 1.2, 'repeats': repeats}, **case)
+    repeats = case['repeats']
+    solver_name = resolve_solver_name(solver_name)
+    solve = case['solve'] and case['formulation'] in SOLVER_BACKENDS[solver_name]['formulations']
+    input_data = synthetic_input_data(case['days'], case['cars'], case['pv_profile'], case['price_profile'], case['seed'])
+
+    times = {phase: [] for phase in BENCHMARK_PHASES}
+    row = {key: case.get(key) for key in CASE_KEYS if key != 'solver'}
+    row.update({'solver': solver_name if solve else None, 'termination_condition': 'not solved', 'objective': None})
+    for _ in range(repeats):
+        rss = current_rss_mb()
+        start = time.perf_counter()
+        model = build_model(input_data, max_shift_share=case['max_shift_share'], shift_window=case['shift_window'],
+                            receiving_factor=case['receiving_factor'], formulation=case['formulation'],
+                            reporting_variables=False)
+        times['build'].append(time.perf_counter() - start)
+        row.update({'variables': model.nvariables(), 'constraints': model.nconstraints(),
+                    'model_rss_MB': current_rss_mb() - rss if rss is not None else None})
+        if not solve:
+            continue
+        try:
+            summary = solve_with_backend(model, solver_name, time_limit=time_limit)
+        except Exception as error:
+            row['termination_condition'] = f"error: {str(error).splitlines()[0]}"
+            break
+        times['solve'].append(summary['solve_time'])
+        row.update({'termination_condition': summary['termination_condition'], 'objective': summary['objective'],
+                    'gap': summary['gap'], 'nodes': summary['telemetry']['nodes']})
+        if summary['objective'] is not None:
+            start = time.perf_counter()
+            extract_results(model, input_data)
+            times['extract'].append(time.perf_counter() - start)
+        del model
+
+    for phase, values in times.items():
+        row[f'{phase}_time_median'] = statistics.median(values) if values else None
+        row[f'{phase}_time_min'] = min(values) if values else None
+    row['repeats'] = repeats
+    return row
+
+
+# Compare the rows of the current run with the latest earlier run of the same case
+#   tolerance   - allowed relative slowdown of the median time of a phase (0.25 = 25%)
+#   min_seconds - slowdowns below this absolute time are timing noise and not flagged
+# Returns the rows with the baseline run and a 'regressions' description ('' if none)
+def flag_regressions(current, history, tolerance=0.25, min_seconds=0.05, objective_tolerance=1e-6):
+    flagged = []
+    for row in current.to_dict('records'):
+        row = dict(row, baseline_run=None, regressions='')
+        earlier = history
+        for key in CASE_KEYS:
+            earlier = earlier[earlier[key].isna()] if pd.isna(row[key]) else earlier[earlier[key] == row[key]]
+        earlier = earlier[earlier['run_id'] < row['run_id']]
+        if len(earlier):
+            baseline = earlier.sort_values('run_id').iloc[-1]
+            row['baseline_run'] = baseline['run_id']
+            messages = []
+            for phase in BENCHMARK_PHASES:
+                now, before = row[f'{phase}_time_median'], baseline[f'{phase}_time_median']
+                if pd.notna(now) and pd.notna(before) and now > (1 + tolerance) * before and now - before > min_seconds:
+                    messages.append(f"{phase} {before:.3f} s -> {now:.3f} s (+{now / before - 1:.0%})")
+            if row['termination_condition'] != baseline['termination_condition']:
+                messages.append(f"termination {baseline['termination_condition']} -> {row['termination_condition']}")
+            elif pd.notna(row['objective']) and pd.notna(baseline['objective']) and \
+                    abs(row['objective'] - baseline['objective']) > objective_tolerance * max(1.0, abs(baseline['objective'])):
+                messages.append(f"objective {baseline['objective']:.6f} -> {row['objective']:.6f}")
+            row['regressions'] = '; '.join(messages)
+        flagged.append(row)
+    return pd.DataFrame(flagged)
+
+
+# Run the suite, append it to the history file (CSV) and flag the regressions against the
+# previous run of every case
+# Returns the rows of this run with the regression flags
+def run_benchmark_suite(cases=BENCHMARK_CASES, history_file='benchmark_history.csv', solver_name=None, repeats=3,
+                        time_limit=None, tolerance=0.25, min_seconds=0.05):
+    run = dict(code_version(), run_id=datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S'))
+    rows = []
+    for case in cases:
+        row = dict(run, **run_benchmark_case(case, solver_name, repeats, time_limit))
+        rows.append(row)
+        print(f"{row['name']}: build {row['build_time_median']:.3f} s, solve "
+              + (f"{row['solve_time_median']:.3f} s" if row['solve_time_median'] is not None else '-')
+              + f", {row['termination_condition']}, objective {row['objective']}")
+    current = pd.DataFrame(rows)
+
+    history = pd.concat([pd.read_csv(history_file), current], ignore_index=True) if os.path.isfile(history_file) else current
+    directory = os.path.dirname(history_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    history.to_csv(history_file, index=False)
+    return flag_regressions(current, history, tolerance, min_seconds)
@@ -0,0 +1,112 @@
+# ====================================================================
+# Content-Addressed Solve Cache (Results Keyed by Inputs and Settings)
+# ====================================================================
+# A solve is identified by the hash of the input time series, the model
+# settings, the solver name and version and the source of the modules
+# that decide the cached output (model build, compaction, result
+# extraction and this module), so an unchanged scenario is loaded from
+# the cache instead of re-solved.
+# Each entry is a folder <cache_dir>/<key>/ with the result time series
+# (results.npz) and the key figures of the solve (kpis.json).
+
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+import pyomo.environ as pyo
+
+from . import compaction as compaction_module, model as model_module, results as results_module
+
+
+# Input arrays of load_input_data() that define the optimization problem
+INPUT_KEYS = ('P_fixed', 'P_flexible', 'P_pv', 'C_t', 'car_location', 'car_trip_distance')
+
+# Modules whose source decides the cached arrays: the model, its compaction and the result
+# extraction (editing any of them, or the key figures and format of this module, invalidates
+# the cache)
+SOURCE_MODULES = (model_module, compaction_module, results_module)
+
+
+# Version of a Pyomo solver as a string (None if the solver is not available)
+def solver_version(pyomo_solver_name):
+    try:
+        version = pyo.SolverFactory(pyomo_solver_name).version()
+    except Exception:
+        return None
+    return None if version is None else '.'.join(str(part) for part in version)
+
+
+# Hash of the input time series, the car identifiers and the timeseries index
+def input_data_digest(input_data):
+    digest = hashlib.sha256()
+    for key in INPUT_KEYS:
+        array = np.ascontiguousarray(input_data[key], dtype=float)
+        digest.update(key.encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(json.dumps(list(input_data['car_ids'])).encode())
+    digest.update(np.asarray(input_data['timeseries'], dtype='datetime64[ns]').tobytes())
+    return digest.hexdigest()
+
+
+# Hash of the source of the modules (SOURCE_MODULES by default) and of this module
+def source_digest(modules=SOURCE_MODULES):
+    digest = hashlib.sha256()
+    for module in tuple(modules) + (sys.modules[__name__],):
+        digest.update(module.__name__.encode())
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+
+# Cache key of one solve: inputs, model settings (scenario parameters and formulation
+# options), solver name and version, and the source of the modules behind the cached output
+def solve_cache_key(input_data, settings, solver_name):
+    key = {
+        'inputs': input_data_digest(input_data),
+        'settings': settings,
+        'solver': solver_name,
+        'solver_version': solver_version(solver_name),
+        'source': source_digest(),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# Key figures of a solved model stored next to the result time series
+def solve_kpis(model, results_dict, input_data, solve_time):
+    C_t = input_data['C_t']
+    return {
+        'cost': pyo.value(model.objective),
+        'total_electricity_cost_PV': float(np.dot(results_dict['P_total'], C_t)),
+        'total_electricity_cost_noPV': float(np.dot(results_dict['P_total_noPV'], C_t)),
+        'total_shifted_load': float(np.sum(results_dict['P_shift'])),
+        'global_shifting_limit': float(sum(pyo.value(model.P_flexible[t] * model.Max_Shifting_Capability[t]) for t in model.T)),
+        'solve_time': solve_time,
+    }
+
+
+# Load a cached solve; returns (results_dict, kpis) or None on a cache miss
+# The timeseries is not stored, it is taken from the (identical) input data
+def load_cached_solution(cache_dir, key, input_data):
+    folder = os.path.join(cache_dir, key)
+    if not (os.path.isfile(os.path.join(folder, 'results.npz')) and os.path.isfile(os.path.join(folder, 'kpis.json'))):
+        return None
+    with np.load(os.path.join(folder, 'results.npz')) as arrays:
+        results_dict = {'Timeseries': input_data['timeseries']}
+        results_dict.update({name: arrays[name].tolist() for name in arrays.files})
+    with open(os.path.join(folder, 'kpis.json')) as kpis_file:
+        kpis = json.load(kpis_file)
+    return results_dict, kpis
+
+
+# Store a solve in the cache (the arrays first, the key figures last: an
+# interrupted write leaves no kpis.json and is treated as a miss)
+def store_solution(cache_dir, key, results_dict, kpis):
+    folder = os.path.join(cache_dir, key)
+    os.makedirs(folder, exist_ok=True)
+    arrays = {name: np.asarray(values, dtype=float) for name, values in results_dict.items() if name != 'Timeseries'}
+    np.savez_compressed(os.path.join(folder, 'results.npz'), **arrays)
+    with open(os.path.join(folder, 'kpis.json'), 'w') as kpis_file:
+        json.dump(kpis, kpis_file, indent=2)
@@ -0,0 +1,232 @@
+# ====================================================================
+# Multi-Building Community Model with a Shared Transformer Limit
+# ====================================================================
+# Several ComfficientShare buildings behind one substation. Each building
+# keeps its own cars, load shifting and connection limits (STATIC_PARAMETERS),
+# and the buildings are coupled through the capacity of the transformer,
+# a limit on their total load like the connection limit of each building:
+#   lower_transformer_limit <= sum_b P_building_b[t] <= transformer_limit
+# The coupling rows are relaxed with price multipliers as in
+# decomposition.py, so every building is an independent block (a matrix
+# model of the whole building, solved in a process pool) priced at
+# C_t + lambda_t - mu_t. The multipliers are the smoothed duals of the
+# restricted master LP over the building schedules found so far; a
+# feasible schedule is the relaxed one if it keeps the transformer limit,
+# otherwise the dominant master schedule of every building, otherwise the
+# buildings re-solved one by one within the transformer headroom left by
+# the others.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from .data import load_input_data
+from .decomposition import decomposition_results, solve_master, solve_subproblem
+from .model import STATIC_PARAMETERS
+
+
+# Smoothing of the multipliers (Wentges): the next multipliers are this share of the multipliers
+# with the best lower bound plus the rest of the master duals, which damps the oscillation of
+# the master duals over the many coupled intervals
+SMOOTHING = 0.5
+
+
+# Load the input workbooks of the buildings (load_input_data), one per building
+# All buildings must cover the same intervals
+def load_community(file_paths):
+    buildings = [load_input_data(file_path) for file_path in file_paths]
+    for file_path, building in zip(file_paths, buildings):
+        if not building['timeseries'].equals(buildings[0]['timeseries']):
+            raise ValueError(f"{file_path} does not cover the same intervals as {file_paths[0]}")
+    return buildings
+
+
+# Load of a building that does not depend on its schedule (fixed and flexible load)
+def _base_load(input_data):
+    return np.asarray(input_data['P_fixed'], dtype=float) + np.asarray(input_data['P_flexible'], dtype=float)
+
+
+# Solve one building block (runs in a worker process) within its own connection limits and,
+# for a repair, within the transformer headroom (lower, upper) left for its load
+def solve_building_block(input_data, prices, solver_name='highs', transformer_headroom=None, time_limit=None, **settings):
+    lower = STATIC_PARAMETERS['Lower_Power_Limit'] - _base_load(input_data)
+    upper = STATIC_PARAMETERS['Upper_Power_Limit'] - _base_load(input_data)
+    if transformer_headroom is not None:
+        lower = np.maximum(lower, transformer_headroom[0] - _base_load(input_data))
+        upper = np.minimum(upper, transformer_headroom[1] - _base_load(input_data))
+    return solve_subproblem(input_data, prices, solver_name, headroom=(lower, upper), time_limit=time_limit, **settings)
+
+
+# Feasible community schedule at the current prices around the reserved loads of the buildings:
+# first all buildings at once in the pool, each within its reserved load plus an even share of
+# the headroom (or violation) of the transformer limit; if a building cannot keep its share and
+# the reserved loads keep the transformer limit, the buildings one by one, each taking an even
+# share of the violation left by the others (or all of the headroom left by them)
+# Returns the building solutions or None
+def _repair_community(pool, buildings, reserved_loads, prices, solver_name, lower, upper, repair_time_limit, settings):
+    loads = [_base_load(input_data) + load for input_data, load in zip(buildings, reserved_loads)]
+    total = sum(loads)
+    futures = [pool.submit(solve_building_block, input_data, prices[b], solver_name,
+                           transformer_headroom=(loads[b] + (lower - total) / len(buildings), loads[b] + (upper - total) / len(buildings)),
+                           time_limit=repair_time_limit, **settings)
+               for b, input_data in enumerate(buildings)]
+    solutions = [future.result() for future in futures]
+    if all('load' in solution for solution in solutions):
+        return solutions
+    if np.any(total > upper + 1e-6) or np.any(total < lower - 1e-6):
+        return None
+
+    solutions = []
+    for b, input_data in enumerate(buildings):
+        others = sum(loads) - loads[b]
+        remaining = len(buildings) - b
+        shared = (loads[b] + (lower - others - loads[b]) / remaining, loads[b] + (upper - others - loads[b]) / remaining)
+        for headroom in (shared, (lower - others, upper - others)):
+            solution = solve_building_block(input_data, prices[b], solver_name, transformer_headroom=headroom,
+                                            time_limit=repair_time_limit, **settings)
+            if 'load' in solution:
+                break
+        else:
+            return None
+        loads[b] = _base_load(input_data) + solution['load']
+        solutions.append(solution)
+    return solutions
+
+
+# Per-building results (extract_results format) and the aggregate schedule of the community
+def community_results(buildings, solutions, transformer_limit):
+    building_results = [decomposition_results(input_data, solution, [list(range(len(input_data['car_ids'])))], [solution])
+                        for input_data, solution in zip(buildings, solutions)]
+    aggregate = {'Timeseries': buildings[0]['timeseries']}
+    for name in ('P_fixed', 'P_flexible', 'P_flexible_post_shift', 'P_pv', 'P_cars_total', 'P_total_noPV', 'P_total'):
+        aggregate[name] = np.sum([results[name] for results in building_results], axis=0).tolist()
+    for b, results in enumerate(building_results):
+        aggregate[f'P_total_building_{b}'] = results['P_total']
+    aggregate['Transformer_Limit'] = np.full(len(aggregate['P_total']), float(transformer_limit)).tolist()
+    return building_results, aggregate
+
+
+# Solve the community by decomposition over the buildings
+#   buildings               - input data of each building (load_community)
+#   transformer_limit       - capacity of the transformer for the load of all buildings (kW)
+#   lower_transformer_limit - lower limit of the load of all buildings (kW), by default the sum of
+#                             the Lower_Power_Limit of the buildings
+#   workers, tolerance, max_iterations, repair_time_limit - as in solve_decomposition
+#   **settings              - build_matrix_model() settings of every building
+# Returns the per-building results, the aggregate schedule and one row per iteration
+def solve_community(buildings, transformer_limit, lower_transformer_limit=None, solver_name='highs', workers=None,
+                    tolerance=1e-3, max_iterations=50, repair_time_limit=30, **settings):
+    n_B = len(buildings)
+    workers = workers or os.cpu_count() or 1
+    C = [np.asarray(input_data['C_t'], dtype=float) for input_data in buildings]
+    n_T = len(C[0])
+    base_load = sum(_base_load(input_data) for input_data in buildings)
+    constant_cost = sum(float(np.dot(C_b, _base_load(input_data) - np.asarray(input_data['P_pv'], dtype=float)))
+                        for C_b, input_data in zip(C, buildings))
+    upper = np.full(n_T, float(transformer_limit))
+    if lower_transformer_limit is None:
+        lower_transformer_limit = n_B * STATIC_PARAMETERS['Lower_Power_Limit']
+    lower = np.full(n_T, float(lower_transformer_limit))
+    penalty = 100 * max(1.0, max(np.abs(C_b).max() for C_b in C))
+
+    # Columns of the master: the schedules of each building
+    column_loads = []
+    column_costs = []
+    column_agents = []
+    column_solutions = []
+
+    def add_columns(solutions):
+        for b, solution in enumerate(solutions):
+            column_loads.append(solution['load'])
+            column_costs.append(float(np.dot(C[b], solution['load'])))
+            column_agents.append(b)
+            column_solutions.append(solution)
+
+    def total_load(solutions):
+        return base_load + sum(solution['load'] for solution in solutions)
+
+    multipliers_upper = np.zeros(n_T)
+    multipliers_lower = np.zeros(n_T)
+    weights = None
+    lower_bound = -np.inf
+    upper_bound = np.inf
+    best = None
+    iterations = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for iteration in range(max_iterations):
+            start = time.perf_counter()
+            prices = [C_b + multipliers_upper - multipliers_lower for C_b in C]
+
+            # Relaxed building blocks, solved independently
+            futures = [pool.submit(solve_building_block, input_data, prices[b], solver_name, **settings)
+                       for b, input_data in enumerate(buildings)]
+            solutions = [future.result() for future in futures]
+            if not all(solution['optimal'] for solution in solutions):
+                raise RuntimeError(f"Iteration {iteration}: a building block was not solved to optimality")
+            add_columns(solutions)
+
+            # Lower bound: the dual function at the current multipliers (exact up to the MIP gap
+            # of the building blocks)
+            dual_value = (sum(solution['objective'] for solution in solutions) + constant_cost
+                          + np.dot(multipliers_upper - multipliers_lower, base_load)
+                          - np.dot(multipliers_upper, upper) + np.dot(multipliers_lower, lower))
+            if dual_value > lower_bound:
+                lower_bound = dual_value
+                stability_center = (multipliers_upper, multipliers_lower)
+
+            # Feasible schedules: the relaxed one, the dominant master schedule of every building,
+            # or a repair around the master (relaxed before the first master) schedules
+            load = total_load(solutions)
+            violation = np.maximum(load - upper, lower - load)
+            candidates = [solutions] if violation.max() <= 1e-6 else []
+            if weights is not None and not candidates:
+                dominant = [column_solutions[np.flatnonzero(agents == b)[np.argmax(weights[agents == b])]] for b in range(n_B)]
+                dominant_load = total_load(dominant)
+                if np.all(dominant_load <= upper + 1e-6) and np.all(dominant_load >= lower - 1e-6):
+                    candidates.append(dominant)
+            if not candidates:
+                reserved_loads = [solution['load'] for solution in solutions]
+                if weights is not None:
+                    reserved_loads = [master_loads[:, agents == b] @ weights[agents == b] for b in range(n_B)]
+                repaired = _repair_community(pool, buildings, reserved_loads, prices, solver_name, lower, upper, repair_time_limit, settings)
+                if repaired is not None:
+                    add_columns(repaired)
+                    candidates.append(repaired)
+            for candidate in candidates:
+                cost = constant_cost + sum(float(np.dot(C[b], solution['load'])) for b, solution in enumerate(candidate))
+                if cost < upper_bound:
+                    upper_bound = cost
+                    best = candidate
+
+            gap = (upper_bound - lower_bound) / max(1.0, abs(upper_bound)) if best is not None else np.inf
+            iterations.append({
+                'iteration': iteration,
+                'lower_bound': lower_bound,
+                'upper_bound': upper_bound,
+                'gap': gap,
+                'max_violation': float(violation.max()),
+                'subproblem_time': sum(solution['solve_time'] for solution in solutions),
+                'iteration_time': time.perf_counter() - start,
+            })
+            print(f"Iteration {iteration}: lower bound {lower_bound:.4f}, upper bound {upper_bound:.4f}, "
+                  f"gap {gap:.2e}, max transformer violation {violation.max():.3f} kW")
+            if gap <= tolerance:
+                break
+
+            # Next multipliers: the duals of the transformer rows in the master, smoothed towards
+            # the multipliers of the best lower bound
+            master_loads = sp.csc_matrix(np.column_stack(column_loads))
+            weights, master_upper, master_lower, _ = solve_master(
+                master_loads, np.array(column_costs), np.array(column_agents), n_B, lower - base_load, upper - base_load, penalty)
+            agents = np.array(column_agents)
+            multipliers_upper = SMOOTHING * stability_center[0] + (1 - SMOOTHING) * master_upper
+            multipliers_lower = SMOOTHING * stability_center[1] + (1 - SMOOTHING) * master_lower
+
+    if best is None:
+        raise RuntimeError("No schedule within the transformer limit was found")
+    building_results, aggregate = community_results(buildings, best, transformer_limit)
+    return building_results, aggregate, iterations
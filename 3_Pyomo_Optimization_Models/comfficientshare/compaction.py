@@ -0,0 +1,78 @@
+# ===========================================================
+# Model Compaction: Single-Variable Constraints as Var Bounds
+# ===========================================================
+
+import pyomo.environ as pyo
+from pyomo.core.expr.relational_expr import EqualityExpression, InequalityExpression
+
+
+# Feasibility tolerance for checking fixed values against bounds
+TOLERANCE = 1e-9
+
+
+# Counters of the constraint rows and variable columns removed from the model
+def new_compaction_report():
+    return {'rows': 0, 'columns': 0}
+
+
+# Split a relational expression "var <= value", "value <= var" or "var == value"
+# into (variable, value, kind); returns None for any other constraint
+def _single_variable_bound(expr):
+    if not isinstance(expr, (EqualityExpression, InequalityExpression)):
+        return None
+    lhs, rhs = expr.args
+    lhs_is_var = hasattr(lhs, 'is_variable_type') and lhs.is_variable_type()
+    rhs_is_var = hasattr(rhs, 'is_variable_type') and rhs.is_variable_type()
+    if isinstance(expr, EqualityExpression):
+        if lhs_is_var and not pyo.is_potentially_variable(rhs):
+            return lhs, pyo.value(rhs), 'fix'
+        if rhs_is_var and not pyo.is_potentially_variable(lhs):
+            return rhs, pyo.value(lhs), 'fix'
+        return None
+    if expr.strict:
+        return None
+    if lhs_is_var and not pyo.is_potentially_variable(rhs):
+        return lhs, pyo.value(rhs), 'ub'
+    if rhs_is_var and not pyo.is_potentially_variable(lhs):
+        return rhs, pyo.value(lhs), 'lb'
+    return None
+
+
+# Fold the bound into the variable; returns False if the constraint has to be kept
+# (a fixed variable violating the bound or a fixed value outside the bounds would
+# otherwise hide an infeasible input from the solver)
+def _fold(report, var, value, kind):
+    if var.fixed:
+        if kind == 'fix' and abs(var.value - value) > TOLERANCE:
+            return False
+        if kind == 'ub' and var.value > value + TOLERANCE:
+            return False
+        if kind == 'lb' and var.value < value - TOLERANCE:
+            return False
+    elif kind == 'fix':
+        if (var.lb is not None and value < var.lb - TOLERANCE) or (var.ub is not None and value > var.ub + TOLERANCE):
+            return False
+        var.fix(value)
+        report['columns'] += 1
+    elif kind == 'ub':
+        if var.ub is None or value < var.ub:
+            var.setub(value)
+    elif var.lb is None or value > var.lb:
+        var.setlb(value)
+    report['rows'] += 1
+    return True
+
+
+# Wrap a constraint rule: single-variable constraints are folded into the variable
+# bounds (or fix the variable) at build time instead of becoming constraint rows
+def fold_single_variable_rule(rule, report):
+    def folded_rule(model, *index):
+        expr = rule(model, *index)
+        if expr is pyo.Constraint.Skip or isinstance(expr, bool):
+            return expr
+        bound = _single_variable_bound(expr)
+        if bound is not None and _fold(report, *bound):
+            return pyo.Constraint.Skip
+        return expr
+
+    return folded_rule
@@ -0,0 +1,114 @@
+# ======================================================
+# Data Import (Time Series Input from the Excel Workbook)
+# ======================================================
+
+import numpy as np
+import pandas as pd
+
+
+# Time resolution of the input time series (15-minute intervals)
+INTERVALS_PER_HOUR = 4
+
+
+# Load the 'Building_data', 'Cars_location' and 'Cars_trips_distance' sheets
+# and organize them in a dictionary for easy reference within Pyomo
+def load_input_data(file_path):
+    excel_data = pd.ExcelFile(file_path)
+
+    # Load 'Building_data' sheet
+    building_data = pd.read_excel(excel_data, 'Building_data')
+
+    # Parse Building Data
+    # -------------------
+    # Timeseries
+    building_timeseries = pd.to_datetime(building_data['Timeseries'])
+    # Fixed power consumption (kW)
+    P_fixed = building_data['P_fixed (kW)'].values
+    # Flexible power consumption (kW)
+    P_flexible = building_data['P_flexible (kW)'].values
+    # PV generation (kW)
+    P_pv = building_data['P_pv (kW)'].values
+    # Electricity cost (€/kWh)
+    C_t = building_data['C_t (€/kWh)'].values
+
+    # Load 'Cars_location' sheet
+    cars_location = pd.read_excel(excel_data, 'Cars_location')
+
+    # Parse Car Location Data
+    # -----------------------
+    # Timeseries
+    car_location_timeseries = pd.to_datetime(cars_location['Timeseries'])
+    # The fleet is every car column of the sheet (car identifiers as column names)
+    car_columns = [column for column in cars_location.columns if column != 'Timeseries']
+    car_ids = [str(column) for column in car_columns]
+    # Car location status (binary values indicating car presence at home), shape (cars, time steps)
+    car_location = cars_location[car_columns].to_numpy(dtype=int).T
+
+    # Load 'Cars_trips_distance' sheet
+    cars_trips_distance = pd.read_excel(excel_data, 'Cars_trips_distance')
+
+    # Parse Car Trip Distance Data
+    # ----------------------------
+    # Timeseries
+    car_trip_timeseries = pd.to_datetime(cars_trips_distance['Timeseries'])
+    # Car trip distances (in km, values appear at the end of each trip), shape (cars, time steps)
+    assert [column for column in cars_trips_distance.columns if column != 'Timeseries'] == car_columns, \
+        "Cars in 'Cars_location' and 'Cars_trips_distance' do not match!"
+    car_trip_distance = cars_trips_distance[car_columns].fillna(0).to_numpy(dtype=float).T
+
+    # Check Data Integrity and Alignment
+    # -----------------------------------
+    # Ensure that timeseries data across sheets align for consistent indexing
+    assert (building_timeseries.equals(car_location_timeseries) and
+            building_timeseries.equals(car_trip_timeseries)), \
+        "Timeseries data across sheets are misaligned!"
+
+    return {
+        'P_fixed': P_fixed,
+        'P_flexible': P_flexible,
+        'P_pv': P_pv,
+        'C_t': C_t,
+        'car_ids': car_ids,
+        'car_location': car_location,
+        'car_trip_distance': car_trip_distance,
+        'timeseries': building_timeseries
+    }
+
+
+# Load a fleet CSV of 1_project_data_full (about a year of 15-minute car data, header rows
+# car name / field with the fields atbase, dsoc, consumption, atac, atdc and tour_dist per car)
+# and return the car part of load_input_data(): car_ids, car_location, car_trip_distance, timeseries
+#   car_mileage - km/kWh used to convert the driving consumption (W) into a distance for fleets
+#                 without tour_dist values (the shared fleet); the Car_Mileage of the model
+def load_fleet_csv(file_path, car_mileage=6.28):
+    fleet_data = pd.read_csv(file_path, header=[0, 1], index_col=0)
+
+    # Timeseries in local time (the CSV carries the UTC offset, +01:00 / +02:00)
+    timeseries = pd.Series(pd.to_datetime(fleet_data.index, utc=True).tz_convert('Europe/Berlin').tz_localize(None))
+
+    car_ids = list(dict.fromkeys(fleet_data.columns.get_level_values(0)))
+    car_location = np.zeros((len(car_ids), len(fleet_data)), dtype=int)
+    car_trip_distance = np.zeros((len(car_ids), len(fleet_data)))
+    for i, car in enumerate(car_ids):
+        at_home = fleet_data[(car, 'atbase')].astype(bool).to_numpy()
+        car_location[i] = at_home
+
+        # Distance per interval away from home: tour_dist (km, at the start of a trip) or,
+        # without tour_dist values, the driving consumption (W) over the interval in km
+        distance = fleet_data[(car, 'tour_dist')].to_numpy(dtype=float)
+        if not distance.any():
+            distance = fleet_data[(car, 'consumption')].to_numpy(dtype=float) / 1000 / INTERVALS_PER_HOUR * car_mileage
+        distance = np.where(at_home, 0.0, distance)
+
+        # The model expects the distance of a trip at its last interval away from home
+        # (SOC at arrival), so the distances of each away period are summed there
+        trip_number = np.cumsum(np.r_[1, np.diff(car_location[i]) != 0])
+        last_away = np.flatnonzero(~at_home & np.r_[trip_number[1:] != trip_number[:-1], True])
+        car_trip_distance[i, last_away] = np.bincount(trip_number, weights=distance)[trip_number[last_away]]
+
+    return {
+        'car_ids': car_ids,
+        'car_location': car_location,
+        'car_trip_distance': car_trip_distance,
+        'timeseries': timeseries,
+    }
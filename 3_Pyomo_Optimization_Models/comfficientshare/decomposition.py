@@ -0,0 +1,285 @@
+# ====================================================================
+# Per-Car Decomposition (Lagrangian Relaxation of the Connection Limits)
+# ====================================================================
+# The cars and the flexible load of the building only interact through
+# the connection limits Lower_Power_Limit <= P_building[t] <= Upper_Power_Limit
+# (the objective is a sum over the same terms). Relaxing these rows with
+# price multipliers lambda_t (upper limit) and mu_t (lower limit) splits
+# the model into one building subproblem (flexible load shifting) and
+# independent car subproblems (SOC and charging, LPs), all priced at
+# C_t + lambda_t - mu_t. The subproblems are assembled as matrix models
+# (matrix.py) and solved in a process pool, the cars in chunks of
+# independent cars.
+#
+# Every iteration gives a lower bound (the dual function) and a feasible
+# schedule (upper bound): the relaxed schedule if it keeps the limits,
+# otherwise the cars repaired chunk by chunk within the headroom left by a
+# reserved building load, followed by the building shifts within the
+# headroom left by the cars. The multipliers are the duals of the limit
+# rows in a restricted master LP over all schedules found so far
+# (Dantzig-Wolfe column generation, scipy / HiGHS); the loop stops when the
+# relative gap between the bounds is below the tolerance.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import linprog
+
+from .matrix import build_matrix_model, solution_arrays, solve_matrix_model
+from .model import STATIC_PARAMETERS
+from .results import SHIFT_TOLERANCE
+
+
+# Input data of the building alone (no cars)
+def _building_data(input_data):
+    n_T = len(input_data['P_fixed'])
+    return dict(input_data, car_ids=[], car_location=np.zeros((0, n_T), dtype=int),
+                car_trip_distance=np.zeros((0, n_T)))
+
+
+# Input data of a group of cars without building load
+def _car_data(input_data, cars):
+    n_T = len(input_data['P_fixed'])
+    return dict(input_data, P_fixed=np.zeros(n_T), P_flexible=np.zeros(n_T), P_pv=np.zeros(n_T),
+                car_ids=[input_data['car_ids'][i] for i in cars],
+                car_location=input_data['car_location'][cars], car_trip_distance=input_data['car_trip_distance'][cars])
+
+
+# Solve one subproblem (runs in a worker process)
+#   prices     - price of the building load at each interval (C_t + lambda_t - mu_t)
+#   headroom   - None for the relaxed subproblem, or the (lower, upper) bounds left under the
+#                connection limits for the load of this subproblem (repair of the car schedules)
+# Returns the schedule, the load added to the building (kW) and the priced objective
+#   time_limit - solver time limit (s); a repair accepts the best schedule found within it
+def solve_subproblem(sub_data, prices, solver_name='highs', headroom=None, time_limit=None, **settings):
+    mm = build_matrix_model(sub_data, reporting_variables=False, **settings)
+    rows = mm['rows']['power_limit']
+    if headroom is None:
+        mm['row_lower'][rows] = -np.inf
+        mm['row_upper'][rows] = np.inf
+    else:
+        mm['row_lower'][rows], mm['row_upper'][rows] = headroom
+
+    # Objective: prices times the load of the subproblem (the constant load terms are added
+    # by the coordinator)
+    n_C, t_k, delta_k = mm['n_C'], mm['t_k'], mm['delta_k']
+    mm['c'] = np.zeros(len(mm['c']))
+    mm['c'][mm['columns']['P_car_charge']] = np.tile(prices, n_C)
+    mm['c'][mm['columns']['P_shift']] = -prices
+    mm['c'][mm['columns']['P_shift_to']] = prices[t_k + delta_k]
+    mm['objective_constant'] = 0.0
+
+    solution = solve_matrix_model(mm, solver_name, time_limit=time_limit)
+    if solution['x'] is None:
+        return {'optimal': False, 'status': solution['status'], 'solve_time': solution['solve_time']}
+    arrays = solution_arrays(mm, solution['x'])
+
+    # Shift interval of each P_shift[t]: the target receiving the largest part of it
+    flows = np.full((mm['n_T'], 2 * settings.get('shift_window', 24) + 1), -np.inf)
+    flows[t_k, delta_k + settings.get('shift_window', 24)] = arrays['P_shift_to']
+    delta_p_shift = np.where(arrays['P_shift'] > SHIFT_TOLERANCE, np.argmax(flows, axis=1) - settings.get('shift_window', 24), 0)
+
+    return {
+        'optimal': solution['optimal'],
+        'status': solution['status'],
+        'objective': solution['cost'],
+        'load': arrays['P_car_charge'].sum(axis=0) - arrays['P_shift'] + arrays['P_shift_received'],
+        'P_car_charge': arrays['P_car_charge'],
+        'SOC': arrays['SOC'],
+        'P_shift': arrays['P_shift'],
+        'P_shift_received': arrays['P_shift_received'],
+        'Delta_P_shift': delta_p_shift,
+        'solve_time': solution['solve_time'],
+    }
+
+
+# Feasible schedule for the relaxed subproblem solutions that exceed the limits: the cars are
+# scheduled chunk by chunk at the current prices within the headroom left by a reserved building
+# load, then the building shifts its flexible load at the energy price within the headroom left
+# by the cars. Returns (building, car chunks) or None if a step finds no schedule
+def _repair_schedule(building_data, chunk_data, reserved_load, prices, C_t, upper, lower, base_load,
+                     solver_name, car_settings, repair_time_limit, settings):
+    remaining = upper - reserved_load
+    repaired = []
+    for data in chunk_data:
+        chunk = solve_subproblem(data, prices, solver_name, headroom=(np.full(len(C_t), -np.inf), remaining), **car_settings)
+        if not chunk['optimal']:
+            return None
+        repaired.append(chunk)
+        remaining = remaining - chunk['load']
+    cars_load = upper - reserved_load - remaining
+    building = solve_subproblem(building_data, C_t, solver_name, time_limit=repair_time_limit,
+                                headroom=(lower - base_load - cars_load, upper - base_load - cars_load), **settings)
+    if 'load' not in building:
+        return None
+    return building, repaired
+
+
+# Schedule of the whole site in the result format of extract_results
+def decomposition_results(input_data, building, car_chunks, chunk_solutions):
+    P_fixed = np.asarray(input_data['P_fixed'], dtype=float)
+    P_flexible = np.asarray(input_data['P_flexible'], dtype=float)
+    P_pv = np.asarray(input_data['P_pv'], dtype=float)
+    P_cars_total = sum(solution['P_car_charge'].sum(axis=0) for solution in chunk_solutions)
+    building_load = P_fixed + P_flexible - building['P_shift'] + building['P_shift_received'] + P_cars_total
+
+    results_dict = {
+        'Timeseries': input_data['timeseries'],
+        'P_fixed': P_fixed.tolist(),
+        'P_flexible': P_flexible.tolist(),
+        'P_shift': building['P_shift'].tolist(),
+        'Delta_P_shift': building['Delta_P_shift'].tolist(),
+        'P_flexible_post_shift': (P_flexible - building['P_shift'] + building['P_shift_received']).tolist(),
+        'P_pv': P_pv.tolist(),
+        'P_total': (building_load - P_pv).tolist(),
+        'P_total_noPV': building_load.tolist(),
+    }
+    for cars, solution in zip(car_chunks, chunk_solutions):
+        for i, car in enumerate(cars):
+            results_dict[f"SOC_{input_data['car_ids'][car]}"] = solution['SOC'][i].tolist()
+            results_dict[f"P_car_charge_{input_data['car_ids'][car]}"] = solution['P_car_charge'][i].tolist()
+    results_dict['P_cars_total'] = P_cars_total.tolist()
+    return results_dict
+
+
+# Restricted master LP over the schedules (columns) found so far: the convex combination of the
+# schedules of every agent (the building and each car) with the lowest energy cost that keeps the
+# connection limits. Its duals on the limit rows are the next price multipliers. Limit
+# violations are allowed at a penalty cost, so the master is always feasible
+#   column_loads  - (intervals, columns) sparse load of each schedule added to the building (kW)
+#   column_costs  - energy cost of each schedule, column_agents - agent of each schedule
+# Returns the column weights, the multipliers of the upper and lower limit and the master cost
+def solve_master(column_loads, column_costs, column_agents, n_agents, headroom_lower, headroom_upper, penalty):
+    n_T, n_columns = column_loads.shape
+    identity = sp.identity(n_T, format='csr')
+    zero = sp.csr_matrix((n_T, n_T))
+    A_ub = sp.vstack([sp.hstack([column_loads, -identity, zero]), sp.hstack([-column_loads, zero, -identity])]).tocsr()
+    A_eq = sp.csr_matrix((np.ones(n_columns), (column_agents, np.arange(n_columns))), shape=(n_agents, n_columns + 2 * n_T))
+    c = np.concatenate([column_costs, np.full(2 * n_T, penalty)])
+    result = linprog(c, A_ub=A_ub, b_ub=np.concatenate([headroom_upper, -headroom_lower]), A_eq=A_eq,
+                     b_eq=np.ones(n_agents), bounds=(0, None), method='highs')
+    if result.status != 0:
+        raise RuntimeError(f"The master problem was not solved: {result.message}")
+    return result.x[:n_columns], -result.ineqlin.marginals[:n_T], -result.ineqlin.marginals[n_T:], result.fun
+
+
+# Solve the model by Lagrangian (Dantzig-Wolfe) decomposition over the building and chunks of cars
+#   solver_name       - matrix solver of the subproblems ('highs' or 'gurobi')
+#   workers           - worker processes (None: one per core)
+#   chunk_size        - cars per car subproblem (None: the fleet split evenly over the workers)
+#   tolerance         - relative gap between the feasible schedule and the lower bound at which
+#                       the loop stops (the building subproblem is solved to the MIP gap of the
+#                       solver, so the lower bound is exact up to that gap)
+#   repair_time_limit - time limit (s) of the building in a repair, where the limits make it harder
+#   upper_power_limit, lower_power_limit - connection limits (kW), STATIC_PARAMETERS by default
+#   **settings        - build_matrix_model() settings (max_shift_share, shift_window,
+#                       receiving_factor, target_soc, formulation)
+# Returns the best feasible schedule (same keys as extract_results) and one row per iteration
+def solve_decomposition(input_data, solver_name='highs', workers=None, chunk_size=None, tolerance=1e-3,
+                        max_iterations=50, repair_time_limit=30, upper_power_limit=None, lower_power_limit=None, **settings):
+    n_C = len(input_data['car_ids'])
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-n_C // workers))
+    car_chunks = [list(range(first, min(first + chunk_size, n_C))) for first in range(0, n_C, chunk_size)]
+    car_settings = {'target_soc': settings.get('target_soc', 100), 'shift_window': 0, 'formulation': 'transport'}
+
+    C_t = np.asarray(input_data['C_t'], dtype=float)
+    base_load = np.asarray(input_data['P_fixed'], dtype=float) + np.asarray(input_data['P_flexible'], dtype=float)
+    pv_cost = float(np.dot(C_t, input_data['P_pv']))
+    upper = np.full(len(C_t), float(STATIC_PARAMETERS['Upper_Power_Limit'] if upper_power_limit is None else upper_power_limit))
+    lower = np.full(len(C_t), float(STATIC_PARAMETERS['Lower_Power_Limit'] if lower_power_limit is None else lower_power_limit))
+    # Penalty of a limit violation in the master (an upper bound of the multipliers)
+    penalty = 100 * max(1.0, np.abs(C_t).max())
+
+    # Columns of the master: agent 0 is the building, agent 1 + i is car i
+    column_loads = []
+    column_costs = []
+    column_agents = []
+
+    def add_columns(building, chunks):
+        column_loads.append(building['load'])
+        column_costs.append(float(np.dot(C_t, building['load'])))
+        column_agents.append(0)
+        for cars, chunk in zip(car_chunks, chunks):
+            for i, car in enumerate(cars):
+                column_loads.append(chunk['P_car_charge'][i])
+                column_costs.append(float(np.dot(C_t, chunk['P_car_charge'][i])))
+                column_agents.append(1 + car)
+
+    multipliers_upper = np.zeros(len(C_t))
+    multipliers_lower = np.zeros(len(C_t))
+    master_building_load = None
+    lower_bound = -np.inf
+    upper_bound = np.inf
+    best = None
+    iterations = []
+
+    building_data = _building_data(input_data)
+    chunk_data = [_car_data(input_data, cars) for cars in car_chunks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for iteration in range(max_iterations):
+            start = time.perf_counter()
+            prices = C_t + multipliers_upper - multipliers_lower
+
+            # Relaxed subproblems, solved independently
+            building_future = pool.submit(solve_subproblem, building_data, prices, solver_name, **settings)
+            chunk_futures = [pool.submit(solve_subproblem, data, prices, solver_name, **car_settings) for data in chunk_data]
+            building = building_future.result()
+            chunks = [future.result() for future in chunk_futures]
+            if not building['optimal'] or not all(chunk['optimal'] for chunk in chunks):
+                raise RuntimeError(f"Iteration {iteration}: a subproblem was not solved to optimality")
+            add_columns(building, chunks)
+
+            # Lower bound: the dual function at the current multipliers
+            dual_value = (building['objective'] + sum(chunk['objective'] for chunk in chunks)
+                          + np.dot(prices, base_load) - pv_cost
+                          - np.dot(multipliers_upper, upper) + np.dot(multipliers_lower, lower))
+            lower_bound = max(lower_bound, dual_value)
+
+            # Feasible schedule: the relaxed schedule if it keeps the limits, otherwise a repair that
+            # first reserves the building load of the master (the relaxed building load before the
+            # first master), then no building load (its columns are added to the master as well)
+            load = base_load + building['load'] + sum(chunk['load'] for chunk in chunks)
+            violation = np.maximum(load - upper, lower - load)
+            candidate = (building, chunks)
+            if violation.max() > 1e-6:
+                for reserved_load in (master_building_load if master_building_load is not None else building['load'], 0):
+                    candidate = _repair_schedule(building_data, chunk_data, base_load + reserved_load, prices, C_t, upper, lower,
+                                                 base_load, solver_name, car_settings, repair_time_limit, settings)
+                    if candidate is not None:
+                        add_columns(*candidate)
+                        break
+            if candidate is not None:
+                cost = float(np.dot(C_t, base_load + candidate[0]['load'] + sum(chunk['load'] for chunk in candidate[1])) - pv_cost)
+                if cost < upper_bound:
+                    upper_bound = cost
+                    best = candidate
+
+            gap = (upper_bound - lower_bound) / max(1.0, abs(upper_bound)) if best is not None else np.inf
+            iterations.append({
+                'iteration': iteration,
+                'lower_bound': lower_bound,
+                'upper_bound': upper_bound,
+                'gap': gap,
+                'max_violation': float(violation.max()),
+                'repaired': bool(violation.max() > 1e-6),
+                'subproblem_time': building['solve_time'] + sum(chunk['solve_time'] for chunk in chunks),
+                'iteration_time': time.perf_counter() - start,
+            })
+            print(f"Iteration {iteration}: lower bound {lower_bound:.4f}, upper bound {upper_bound:.4f}, "
+                  f"gap {gap:.2e}, max limit violation {violation.max():.3f} kW")
+            if gap <= tolerance:
+                break
+
+            # Next multipliers: the duals of the limit rows in the master over all schedules so far
+            loads = sp.csc_matrix(np.column_stack(column_loads))
+            weights, multipliers_upper, multipliers_lower, _ = solve_master(
+                loads, np.array(column_costs), np.array(column_agents), 1 + n_C, lower - base_load, upper - base_load, penalty)
+            master_building_load = loads @ np.where(np.array(column_agents) == 0, weights, 0)
+
+    if best is None:
+        raise RuntimeError("No feasible schedule was found")
+    return decomposition_results(input_data, best[0], car_chunks, best[1]), iterations
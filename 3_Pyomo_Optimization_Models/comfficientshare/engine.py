@@ -0,0 +1,270 @@
+# ===================================================================
+# Persistent-Solver Scenario Engine (Build Once, Update Params, Solve)
+# ===================================================================
+
+import io
+import sys
+import time
+
+import pyomo.environ as pyo
+from pyomo.common.tee import TeeStream, capture_output
+from pyomo.contrib.appsi.base import TerminationCondition
+from pyomo.contrib.appsi.solvers import Gurobi, Highs
+
+from .model import build_model
+
+
+# Persistent (APPSI) solver interfaces available to the engine
+PERSISTENT_SOLVERS = {
+    'gurobi': Gurobi,
+    'highs': Highs,
+}
+
+# Variables passed from the solution of one scenario to the next as MIP start
+WARM_START_VARIABLES = ('P_car_charge', 'SOC', 'P_shift', 'P_shift_to', 'y_shift')
+
+
+# Create a persistent solver interface by name
+def persistent_solver(solver_name='gurobi', tee=False):
+    if solver_name not in PERSISTENT_SOLVERS:
+        raise ValueError(f"Unknown persistent solver '{solver_name}', expected one of {tuple(PERSISTENT_SOLVERS)}")
+    solver = PERSISTENT_SOLVERS[solver_name]()
+    if not solver.available():
+        raise RuntimeError(f"Persistent solver '{solver_name}' is not available")
+    solver.config.stream_solver = tee
+    # A failed scenario must not stop the sweep, the termination condition is reported instead
+    solver.config.load_solution = False
+    return solver
+
+
+# Build the model once with mutable scenario parameters and load it into a persistent solver
+# Only the shift window and the formulation change the model structure, everything passed in
+# **scenario (max_shift_share, receiving_factor, target_soc) can be updated afterwards
+def build_scenario_engine(input_data, solver_name='gurobi', shift_window=24, formulation='milp', tee=False, **scenario):
+    start = time.perf_counter()
+    model = build_model(input_data, shift_window=shift_window, formulation=formulation, mutable=True, **scenario)
+    solver = persistent_solver(solver_name, tee=tee)
+    solver.set_instance(model)
+    track_first_incumbent(model, solver)
+    model.engine_build_time = time.perf_counter() - start
+    return model, solver
+
+
+# Record the solver time of the first incumbent of every solve in model.first_incumbent_time
+# Gurobi: public MIPSOL callback; HiGHS: the improving-solution callback of the highspy model if
+# the interface exposes it, otherwise the first incumbent of the parsed solver log
+def track_first_incumbent(model, solver):
+    model.first_incumbent_time = None
+    model.first_incumbent_from_log = False
+
+    def record(runtime):
+        if model.first_incumbent_time is None:
+            model.first_incumbent_time = runtime
+
+    if isinstance(solver, Gurobi):
+        from gurobipy import GRB
+
+        def gurobi_callback(cb_model, cb_solver, where):
+            if where == GRB.Callback.MIPSOL:
+                record(cb_solver.cbGet(GRB.Callback.RUNTIME))
+
+        solver.set_callback(gurobi_callback)
+    elif hasattr(getattr(solver, '_solver_model', None), 'cbMipImprovingSolution'):
+        solver._solver_model.cbMipImprovingSolution.subscribe(lambda event: record(event.data_out.running_time))
+    else:
+        model.first_incumbent_from_log = True
+
+
+# Repair the values of the previous solution for the current scenario: integers are
+# rounded, values are clipped to the variable bounds, and the shifted load is clipped to
+# the receiving limits and scaled down to the shifting limit of the current scenario
+def repair_warm_start(model):
+    for name in WARM_START_VARIABLES:
+        if not hasattr(model, name):
+            continue
+        for var in getattr(model, name).values():
+            if var.fixed or var.value is None:
+                continue
+            value = round(var.value) if var.is_integer() else var.value
+            if var.lb is not None:
+                value = max(value, var.lb)
+            if var.ub is not None:
+                value = min(value, var.ub)
+            var.set_value(value, skip_validation=True)
+
+    for t in model.T:
+        if model.P_shift[t].fixed or model.P_shift[t].value is None:
+            continue
+        shift_limit = pyo.value(model.P_flexible[t] * model.Max_Shifting_Capability[t])
+        if hasattr(model, 'P_shift_to'):
+            parts = {delta: model.P_shift_to[t, delta] for delta in model.TD_out[t]
+                     if not model.P_shift_to[t, delta].fixed and model.P_shift_to[t, delta].value is not None}
+            for delta, part in parts.items():
+                receiving_limit = pyo.value((model.Receiving_Factor - 1) * model.P_flexible[t + delta])
+                part.set_value(min(part.value, receiving_limit), skip_validation=True)
+            total = sum(part.value for part in parts.values())
+            scale = min(1.0, shift_limit / total) if total > 0 else 1.0
+            for part in parts.values():
+                part.set_value(part.value * scale, skip_validation=True)
+            model.P_shift[t].set_value(total * scale, skip_validation=True)
+        else:
+            # P_shift[t] is moved to the target with y_shift[t, delta] = 1 and must keep its
+            # receiving limit as well
+            value = min(model.P_shift[t].value, shift_limit)
+            for delta in model.TD_out[t]:
+                if model.y_shift[t, delta].value is not None and model.y_shift[t, delta].value > 0.5:
+                    value = min(value, pyo.value((model.Receiving_Factor - 1) * model.P_flexible[t + delta]))
+            model.P_shift[t].set_value(max(value, 0), skip_validation=True)
+
+
+# Pass the current variable values to the solver as MIP start of the next solve
+def apply_warm_start(model, solver):
+    if isinstance(solver, Gurobi):
+        for name in WARM_START_VARIABLES:
+            if not hasattr(model, name):
+                continue
+            for var in getattr(model, name).values():
+                if not var.fixed and var.value is not None:
+                    solver.set_var_attr(var, 'Start', var.value)
+    else:
+        # The HiGHS interface passes the current variable values with setSolution
+        solver.config.warmstart = True
+
+
+# Remove the MIP start of apply_warm_start, so the next solve starts cold
+def clear_warm_start(model, solver):
+    if isinstance(solver, Gurobi):
+        from gurobipy import GRB
+
+        for name in WARM_START_VARIABLES:
+            if not hasattr(model, name):
+                continue
+            for var in getattr(model, name).values():
+                if not var.fixed:
+                    solver.set_var_attr(var, 'Start', GRB.UNDEFINED)
+    else:
+        solver.config.warmstart = False
+
+
+# Update the mutable scenario parameters of a built model in place
+# The persistent solver picks up the changed coefficients and bounds on the next solve
+def update_scenario(model, max_shift_share=None, receiving_factor=None, target_soc=None):
+    if max_shift_share is not None:
+        for t in model.T:
+            model.Max_Shifting_Capability[t] = max_shift_share
+
+    if receiving_factor is not None:
+        model.Receiving_Factor = receiving_factor
+
+    if target_soc is not None:
+        first = model.T.first()
+        for c in model.C:
+            model.SOC_Target[c] = target_soc
+            # "No charging at the start of the week" only applies when the cars start at 100% SOC
+            if target_soc == 100 and c not in model.no_charging_initial_constraint:
+                model.no_charging_initial_constraint.add(c, model.P_car_charge[c, first] == 0)
+            elif target_soc != 100 and c in model.no_charging_initial_constraint:
+                del model.no_charging_initial_constraint[c]
+
+
+# Relative gap between the best solution and the best bound of a solve
+def relative_mip_gap(best_feasible, best_bound):
+    if best_feasible is None or best_bound is None:
+        return None
+    return abs(best_feasible - best_bound) / max(abs(best_feasible), 1e-10)
+
+
+# Solve with the solver log captured (still echoed with stream_solver) and record the time of
+# the first incumbent of the parsed log in model.first_incumbent_time
+def _solve_with_logged_incumbent(model, solver):
+    # telemetry imports this module, so its log parser is imported here
+    from .telemetry import parse_solver_log
+
+    buffer = io.StringIO()
+    stream_solver = solver.config.stream_solver
+    solver.config.stream_solver = True
+    try:
+        with TeeStream(*((sys.stdout, buffer) if stream_solver else (buffer,))) as streams:
+            with capture_output(streams.STDOUT):
+                results = solver.solve(model)
+    finally:
+        solver.config.stream_solver = stream_solver
+    log_solver = next(name for name, interface in PERSISTENT_SOLVERS.items() if isinstance(solver, interface))
+    incumbents = [point['time'] for point in parse_solver_log(buffer.getvalue(), log_solver)['trajectory']
+                  if point['incumbent'] is not None and point['time'] is not None]
+    model.first_incumbent_time = incumbents[0] if incumbents else None
+    return results
+
+
+# Solve the current scenario incrementally and load the solution if one was found
+def solve_scenario(model, solver):
+    model.first_incumbent_time = None
+    start = time.perf_counter()
+    if getattr(model, 'first_incumbent_from_log', False):
+        results = _solve_with_logged_incumbent(model, solver)
+    else:
+        results = solver.solve(model)
+    solve_time = time.perf_counter() - start
+
+    optimal = results.termination_condition == TerminationCondition.optimal
+    if results.best_feasible_objective is not None:
+        results.solution_loader.load_vars()
+
+    return {
+        'termination_condition': results.termination_condition.name,
+        'optimal': optimal,
+        'cost': pyo.value(model.objective) if results.best_feasible_objective is not None else None,
+        'best_bound': results.best_objective_bound,
+        'gap': relative_mip_gap(results.best_feasible_objective, results.best_objective_bound),
+        'time_to_first_incumbent': model.first_incumbent_time,
+        'solve_time': solve_time,
+    }
+
+
+# Run a sweep of scenarios on one built model: one model build plus N incremental solves
+# Each scenario is a dict of update_scenario() arguments; on_solved(model, scenario, summary)
+# is called after each solve, e.g. to extract and write the results of that scenario
+# With warm_start the repaired solution of the previous scenario is the MIP start of the next,
+# so neighbouring scenarios (e.g. 20% -> 30% shift) should be consecutive
+# With cold_baseline every warm-started scenario is solved again without the MIP start, and the
+# cold first-incumbent and solve times are reported next to the warm ones (the next warm start
+# then uses the solution of the cold solve, a solution of the same scenario)
+def run_scenario_sweep(model, solver, scenarios, on_solved=None, warm_start=True, cold_baseline=False):
+    summaries = []
+    for i, scenario in enumerate(scenarios):
+        update_scenario(model, **scenario)
+        warm_started = warm_start and i > 0 and summaries[-1]['cost'] is not None
+        if warm_started:
+            repair_warm_start(model)
+            apply_warm_start(model, solver)
+        else:
+            clear_warm_start(model, solver)
+        summary = solve_scenario(model, solver)
+        summary.update(scenario, warm_started=warm_started)
+        summaries.append(summary)
+        first_incumbent = summary['time_to_first_incumbent']
+        print(f"Scenario {scenario}: {summary['termination_condition']}, cost {summary['cost']}, "
+              f"solved in {summary['solve_time']:.2f} s"
+              + (" (warm start)" if warm_started else "")
+              + (f", first incumbent after {first_incumbent:.2f} s" if first_incumbent is not None else "")
+              + (f", gap {summary['gap']:.2e}" if summary['gap'] is not None else ""))
+        if on_solved is not None:
+            on_solved(model, scenario, summary)
+
+        if cold_baseline:
+            if warm_started:
+                clear_warm_start(model, solver)
+                cold = solve_scenario(model, solver)
+            else:
+                cold = summary
+            summary['cold_time_to_first_incumbent'] = cold['time_to_first_incumbent']
+            summary['cold_solve_time'] = cold['solve_time']
+            cold_first = cold['time_to_first_incumbent']
+            summary['first_incumbent_speedup'] = (cold_first / first_incumbent
+                                                  if cold_first is not None and first_incumbent else None)
+            if warm_started:
+                print(f"  cold start: solved in {cold['solve_time']:.2f} s"
+                      + (f", first incumbent after {cold_first:.2f} s" if cold_first is not None else "")
+                      + (f" (warm start {summary['first_incumbent_speedup']:.1f}x faster)"
+                         if summary['first_incumbent_speedup'] is not None else ""))
+    return summaries
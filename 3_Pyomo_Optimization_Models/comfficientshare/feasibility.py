@@ -0,0 +1,112 @@
+# ====================================================================
+# Structural Feasibility Pre-Check of the Input Data (NumPy, No Model)
+# ====================================================================
+# Infeasible inputs are found from the arrays before a model is built:
+#  - trip: the energy of a trip (car_distance / Car_Mileage) is more than
+#    the battery holds between the target SOC and SOC_min, so the car
+#    arrives below SOC_min (Car SOC Constraints 7.2.3)
+#  - charging: a stay at home is too short to recharge the car to the
+#    target SOC before its departure (or the end of the horizon with
+#    final_soc); the SOC balance of the model adds P_car_max x eta per
+#    charging interval, from the second interval of the stay
+#    (Car SOC Constraints 7.2.2, 7.2.4 and 7.2.5)
+#  - static_load: the fixed load and the flexible load that cannot be
+#    shifted away exceed Upper_Power_Limit without any car charging
+#    (Upper Connection Limit Constraint 7.3)
+# Each check is necessary for feasibility, not sufficient: the cars and
+# the building share the connection limit, which only the solve checks.
+
+import numpy as np
+import pandas as pd
+
+from .model import STATIC_PARAMETERS, charging_energy_per_interval, trip_energy
+
+
+# Tolerance of the energy and power comparisons
+TOLERANCE = 1e-6
+
+# Columns of the pre-check report
+FEASIBILITY_COLUMNS = ['check', 'car', 'start', 'end', 'start_time', 'end_time', 'required', 'available', 'unit']
+
+
+# (row, first column, last column) of the runs of True in each row of a 2-D boolean array
+def _runs(mask):
+    padded = np.pad(mask.astype(np.int8), ((0, 0), (1, 1)))
+    step = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(step == 1)
+    _, stops = np.nonzero(step == -1)
+    return rows, starts, stops - 1
+
+
+# Report rows of the failing runs
+def _issues(check, cars, starts, ends, required, available, unit, timeseries):
+    return pd.DataFrame({
+        'check': check,
+        'car': cars,
+        'start': starts,
+        'end': ends,
+        'start_time': timeseries[starts] if timeseries is not None else None,
+        'end_time': timeseries[ends] if timeseries is not None else None,
+        'required': required,
+        'available': available,
+        'unit': unit,
+    }, columns=FEASIBILITY_COLUMNS)
+
+
+# Structural infeasibilities of the scenario build_model(input_data, **settings) would build
+#   max_shift_share, target_soc, final_soc, initial_soc, pending_received - the build_model()
+#                settings of the scenario (the others do not change the checks)
+# Returns one row per infeasible trip, stay at home or run of overloaded intervals (empty if
+# none is found) with the intervals, their timestamps, the required and the available energy
+# (kWh) or load (kW)
+def check_feasibility(input_data, max_shift_share=0.20, target_soc=100, final_soc=True, initial_soc=None,
+                      pending_received=None, **settings):
+    par = STATIC_PARAMETERS
+    location = np.asarray(input_data['car_location']) == 1
+    distance = np.asarray(input_data['car_trip_distance'], dtype=float)
+    n_C, n_T = location.shape
+    car_ids = np.asarray(input_data['car_ids'])
+    timeseries = np.asarray(input_data['timeseries']) if 'timeseries' in input_data else None
+    reports = []
+
+    # Trips: runs away from home that end with an arrival; the distance is recorded at the
+    # last interval away
+    cars, starts, ends = _runs(~location)
+    arriving = ends < n_T - 1
+    cars, starts, ends = cars[arriving], starts[arriving], ends[arriving]
+    arriving_energy = trip_energy(distance[cars, ends])
+    soc_margin = (target_soc - par['SOC_min']) / 100 * par['Battery_Capacity']
+    failed = arriving_energy > soc_margin + TOLERANCE
+    reports.append(_issues('trip', car_ids[cars[failed]], starts[failed], ends[failed], arriving_energy[failed],
+                           soc_margin, 'kWh', timeseries))
+
+    # Stays at home: SOC at the first interval (the initial SOC or the SOC at arrival) up to the
+    # target SOC at the last one, with the charging intervals after the first one
+    cars, starts, ends = _runs(location)
+    start_soc = np.full(len(cars), float(target_soc))
+    if initial_soc is not None:
+        first = starts == 0
+        start_soc[first] = [initial_soc[car] for car in car_ids[cars[first]]]
+    arrived = starts > 0
+    start_soc[arrived] = target_soc - trip_energy(distance[cars[arrived], starts[arrived] - 1]) * 100 / par['Battery_Capacity']
+    needed_energy = np.maximum(target_soc - start_soc, 0) / 100 * par['Battery_Capacity']
+    charging_energy = charging_energy_per_interval() * (ends - starts)
+    required = (ends < n_T - 1) | final_soc
+    failed = required & (needed_energy > charging_energy + TOLERANCE)
+    reports.append(_issues('charging', car_ids[cars[failed]], starts[failed], ends[failed], needed_energy[failed],
+                           charging_energy[failed], 'kWh', timeseries))
+
+    # Building load: the fixed load and the flexible load that stays at its interval (plus the
+    # shifted load already committed to it) against the upper connection limit
+    static_load = (np.asarray(input_data['P_fixed'], dtype=float)
+                   + (1 - max_shift_share) * np.asarray(input_data['P_flexible'], dtype=float))
+    if pending_received is not None:
+        static_load = static_load + np.asarray(pending_received, dtype=float)
+    overloaded = static_load > par['Upper_Power_Limit'] + TOLERANCE
+    _, starts, ends = _runs(overloaded[np.newaxis, :])
+    # The intervals between two runs are below the limit, so the maximum from one run start to
+    # the next is the peak of the run
+    peak_load = np.maximum.reduceat(static_load, starts) if len(starts) else np.zeros(0)
+    reports.append(_issues('static_load', None, starts, ends, peak_load, par['Upper_Power_Limit'], 'kW', timeseries))
+
+    return pd.concat([report for report in reports if len(report)] or [reports[0]], ignore_index=True)
@@ -0,0 +1,199 @@
+# ====================================================================
+# Greedy / Valley-Filling Heuristic Scheduler (NumPy, No Solver)
+# ====================================================================
+# A feasible schedule of the model in milliseconds from the input arrays:
+#  - flexible load: every P_shift[t] (max_shift_share of P_flexible[t], at
+#    most the receiving limit of the target) is moved as a whole to the
+#    target in the shift window with the largest saving (the exact
+#    formulations allow one target per interval); shifts into intervals
+#    over the connection limit are dropped, smallest saving first
+#  - cars: the charging energy of every stay at home is filled into the
+#    cheapest intervals of the stay, ties at the lowest building load first
+#    (valley filling), within the connection limit. 'uncontrolled' charges
+#    at full power from the arrival and does not shift load (reference of
+#    uncontrolled charging)
+# The schedule is a standalone result (heuristic_results), a MIP start
+# (load_heuristic_start) and the reference of the comparison plots.
+
+import time
+
+import numpy as np
+
+from .matrix import shift_pairs
+from .model import STATIC_PARAMETERS
+
+# Charging strategies of the heuristic
+HEURISTIC_STRATEGIES = ('smart', 'uncontrolled')
+
+
+# Shifts of the flexible load: origin intervals, shift intervals and shifted load (kW)
+def _shift_flexible_load(input_data, load, max_shift_share, shift_window, receiving_factor, upper_limit):
+    P_flexible = np.asarray(input_data['P_flexible'], dtype=float)
+    C_t = np.asarray(input_data['C_t'], dtype=float)
+    t_k, delta_k = shift_pairs(len(C_t), shift_window)
+    target_k = t_k + delta_k
+    amount_k = np.minimum(max_shift_share * P_flexible[t_k], (receiving_factor - 1) * P_flexible[target_k])
+    saving_k = (C_t[t_k] - C_t[target_k]) * amount_k
+
+    # Target with the largest saving of every origin interval (pairs sorted by origin, then saving)
+    order = np.lexsort((-saving_k, t_k))
+    best = order[np.r_[True, t_k[order][1:] != t_k[order][:-1]]]
+    chosen = best[saving_k[best] > 0]
+
+    # Drop the shifts into intervals over the connection limit, smallest saving first
+    chosen = chosen[np.argsort(-saving_k[chosen], kind='stable')]
+    while len(chosen):
+        shifted = load - np.bincount(t_k[chosen], weights=amount_k[chosen], minlength=len(load)) \
+            + np.bincount(target_k[chosen], weights=amount_k[chosen], minlength=len(load))
+        over = shifted > upper_limit + 1e-9
+        if not over.any():
+            break
+        chosen = np.delete(chosen, np.flatnonzero(over[target_k[chosen]])[-1])
+    return t_k[chosen], delta_k[chosen], amount_k[chosen]
+
+
+# Build the heuristic schedule of one scenario
+#   strategy  - 'smart' (cheapest intervals and load shifting) or 'uncontrolled'
+#   final_soc - charge the cars at home at the end of the horizon to the target SOC
+# Returns the schedule arrays (P_car_charge and SOC per car, P_shift, the shifts as origin /
+# delta / load), the cost and the run time; raises a ValueError if a stay is too short to
+# recharge the arriving trip within the charging power and the connection limit
+def heuristic_schedule(input_data, max_shift_share=0.20, shift_window=24, receiving_factor=1.2,
+                       target_soc=100, strategy='smart', final_soc=True):
+    if strategy not in HEURISTIC_STRATEGIES:
+        raise ValueError(f"Unknown heuristic strategy '{strategy}', expected one of {HEURISTIC_STRATEGIES}")
+    start = time.perf_counter()
+    par = STATIC_PARAMETERS
+
+    P_fixed = np.asarray(input_data['P_fixed'], dtype=float)
+    P_flexible = np.asarray(input_data['P_flexible'], dtype=float)
+    P_pv = np.asarray(input_data['P_pv'], dtype=float)
+    C_t = np.asarray(input_data['C_t'], dtype=float)
+    location = np.asarray(input_data['car_location'], dtype=int)
+    distance = np.asarray(input_data['car_trip_distance'], dtype=float)
+    n_C, n_T = location.shape
+    upper_limit = par['Upper_Power_Limit']
+
+    # Flexible load shifting
+    load = P_fixed + P_flexible
+    if np.any(load > upper_limit + 1e-9):
+        raise ValueError("The fixed and flexible load alone exceed the upper connection limit")
+    if strategy == 'smart':
+        shift_origin, shift_delta, shift_load = _shift_flexible_load(input_data, load, max_shift_share, shift_window,
+                                                                     receiving_factor, upper_limit)
+    else:
+        shift_origin, shift_delta, shift_load = np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+    P_shift = np.bincount(shift_origin, weights=shift_load, minlength=n_T)
+    P_shift_received = np.bincount(shift_origin + shift_delta, weights=shift_load, minlength=n_T)
+    load = load - P_shift + P_shift_received
+
+    # Car charging, one stay at home after the other
+    soc_per_kw = par['eta'] * 100 / par['Battery_Capacity']
+    P_car_charge = np.zeros((n_C, n_T))
+    SOC = np.full((n_C, n_T), float(target_soc))
+    for i in range(n_C):
+        home = location[i] == 1
+        first = np.flatnonzero(home & ~np.r_[False, home[:-1]])
+        last = np.flatnonzero(home & ~np.r_[home[1:], False])
+        for arrival, departure in zip(first, last):
+            # SOC at arrival (the first interval starts at the target SOC); charging adds to the
+            # SOC from the second interval at home
+            arrival_soc = target_soc
+            if arrival > 0:
+                arrival_soc = target_soc - distance[i, arrival - 1] / par['Car_Mileage'] * 100 / par['Battery_Capacity']
+                if arrival_soc < par['SOC_min'] - 1e-9:
+                    raise ValueError(f"Car {input_data['car_ids'][i]} arrives below SOC_min at interval {arrival}")
+            needed = 0.0
+            if departure < n_T - 1 or final_soc:
+                needed = (target_soc - arrival_soc) / soc_per_kw
+
+            slots = np.arange(arrival + 1, departure + 1)
+            if strategy == 'smart':
+                slots = slots[np.lexsort((load[slots], C_t[slots]))]
+            power = np.clip(upper_limit - load[slots], 0, par['P_car_max'])
+            charge = np.clip(needed - (np.cumsum(power) - power), 0, power)
+            if charge.sum() < needed - 1e-6:
+                raise ValueError(f"Car {input_data['car_ids'][i]} cannot be recharged in the stay at intervals "
+                                 f"{arrival}-{departure}")
+            P_car_charge[i, slots] = charge
+            load[slots] += charge
+            SOC[i, arrival:departure + 1] = arrival_soc + np.cumsum(P_car_charge[i, arrival:departure + 1]) * soc_per_kw
+
+            # Away: the SOC of the departure is kept until the next arrival
+            next_arrival = first[first > departure]
+            SOC[i, departure + 1:next_arrival[0] if len(next_arrival) else n_T] = SOC[i, departure]
+
+    return {
+        'strategy': strategy,
+        'P_car_charge': P_car_charge,
+        'SOC': SOC,
+        'P_shift': P_shift,
+        'P_shift_received': P_shift_received,
+        'shift_origin': shift_origin,
+        'shift_delta': shift_delta,
+        'shift_load': shift_load,
+        'cost': float(np.dot(C_t, load - P_pv)),
+        'run_time': time.perf_counter() - start,
+    }
+
+
+# Heuristic schedule in the result format of extract_results
+def heuristic_results(input_data, schedule):
+    P_fixed = np.asarray(input_data['P_fixed'], dtype=float)
+    P_flexible = np.asarray(input_data['P_flexible'], dtype=float)
+    P_pv = np.asarray(input_data['P_pv'], dtype=float)
+    P_cars_total = schedule['P_car_charge'].sum(axis=0)
+    P_flexible_post_shift = P_flexible - schedule['P_shift'] + schedule['P_shift_received']
+    building_load = P_fixed + P_flexible_post_shift + P_cars_total
+    Delta_P_shift = np.zeros(len(P_fixed), dtype=int)
+    Delta_P_shift[schedule['shift_origin']] = schedule['shift_delta']
+
+    results_dict = {
+        'Timeseries': input_data['timeseries'],
+        'P_fixed': P_fixed.tolist(),
+        'P_flexible': P_flexible.tolist(),
+        'P_shift': schedule['P_shift'].tolist(),
+        'Delta_P_shift': Delta_P_shift.tolist(),
+        'P_flexible_post_shift': P_flexible_post_shift.tolist(),
+        'P_pv': P_pv.tolist(),
+        'P_total': (building_load - P_pv).tolist(),
+        'P_total_noPV': building_load.tolist(),
+    }
+    for i, car in enumerate(input_data['car_ids']):
+        results_dict[f'SOC_{car}'] = schedule['SOC'][i].tolist()
+        results_dict[f'P_car_charge_{car}'] = schedule['P_car_charge'][i].tolist()
+    results_dict['P_cars_total'] = P_cars_total.tolist()
+    return results_dict
+
+
+# Load the heuristic schedule into the variables of a built model (build_model) of the same
+# scenario as MIP start; pass it to the solver with apply_warm_start (persistent solvers) or
+# solver.solve(model, warmstart=True)
+def load_heuristic_start(model, schedule):
+    def set_start(var, value):
+        if not var.fixed:
+            var.set_value(value, skip_validation=True)
+
+    for i, c in enumerate(model.C):
+        for t in model.T:
+            set_start(model.P_car_charge[c, t], schedule['P_car_charge'][i, t])
+            set_start(model.SOC[c, t], schedule['SOC'][i, t])
+    for t in model.T:
+        set_start(model.P_shift[t], schedule['P_shift'][t])
+
+    shifts = {(t, delta): load for t, delta, load in
+              zip(schedule['shift_origin'].tolist(), schedule['shift_delta'].tolist(), schedule['shift_load'].tolist())}
+    shifted = {t for t, _ in shifts}
+    for t, delta in model.TD:
+        if hasattr(model, 'P_shift_to'):
+            set_start(model.P_shift_to[t, delta], shifts.get((t, delta), 0.0))
+        if hasattr(model, 'y_shift'):
+            set_start(model.y_shift[t, delta], 1 if (t, delta) in shifts or (t not in shifted and delta == 0) else 0)
+    if hasattr(model, 'z_shift'):
+        for t in model.T:
+            set_start(model.z_shift[t], 1 if t in shifted else 0)
+        for (t, delta) in shifts:
+            set_start(model.Delta_P_shift[t], delta)
+        for t in model.T:
+            if t not in shifted:
+                set_start(model.Delta_P_shift[t], 0)
@@ -0,0 +1,211 @@
+# ====================================================================
+# Irreducible Infeasible Subsystem of the In-Memory Solver Model
+# ====================================================================
+# The IIS of an infeasible model is computed on the solver model held in
+# memory, without writing and re-reading an LP file, and its members are
+# mapped back to the Pyomo components and their (car, t) / (t, delta)
+# indices:
+#  - Gurobi: computeIIS() on the gurobipy model of a direct or persistent
+#    interface (built with gurobi_persistent if the model was solved with
+#    the LP file interface); handles the integrality and the MIQCP rows
+#  - HiGHS (and the backends without an IIS): elastic filter and deletion
+#    filter on the LP relaxation of the HiGHS model of the appsi
+#    interface. The elastic filter collects the rows that have to be
+#    violated until the elastic LP is infeasible, the deletion filter
+#    drops every row and bound of that set that is not needed for the
+#    infeasibility (one small LP per candidate, not per row of the model).
+#    A model whose LP relaxation is feasible (a conflict of the binary
+#    shift decisions) yields an empty IIS.
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+
+from .solvers import resolve_solver_name
+
+
+# Violation of an elastic slack that counts as a violated row
+TOLERANCE = 1e-7
+
+# Report fields of the index sets of the model components
+INDEX_FIELDS = {'C': ('car',), 'T': ('t',), 'TD': ('t', 'delta')}
+
+# Columns of the IIS report
+IIS_COLUMNS = ['component', 'member', 'car', 't', 'delta', 'time', 'name']
+
+
+# Report row of a constraint or variable of the model
+def _member(component_data, member, timeseries):
+    component = component_data.parent_component()
+    row = {'component': component.name, 'member': member, 'car': None, 't': None, 'delta': None, 'time': None,
+           'name': component_data.name}
+    if component.is_indexed():
+        index = component_data.index()
+        index = index if isinstance(index, tuple) else (index,)
+        fields = [field for subset in component.index_set().subsets()
+                  for field in INDEX_FIELDS.get(subset.local_name, (subset.local_name,))]
+        row.update(zip(fields, index))
+    if timeseries is not None and row['t'] is not None:
+        row['time'] = timeseries.iloc[row['t']]
+    return row
+
+
+# IIS of the gurobipy model of the solver (a gurobi_persistent instance of the model if the
+# solver holds none)
+def _gurobi_iis(model, solver):
+    if getattr(solver, '_solver_model', None) is None or not hasattr(solver._solver_model, 'computeIIS'):
+        solver = pyo.SolverFactory('gurobi_persistent')
+        solver.set_instance(model)
+    grb_model = solver._solver_model
+    grb_model.computeIIS()
+
+    members = []
+    constrs, qconstrs, grb_vars = grb_model.getConstrs(), grb_model.getQConstrs(), grb_model.getVars()
+    for constr, in_iis in zip(constrs, grb_model.getAttr('IISConstr', constrs)):
+        if in_iis:
+            members.append((solver._solver_con_to_pyomo_con_map[constr], 'constraint'))
+    for constr, in_iis in zip(qconstrs, grb_model.getAttr('IISQConstr', qconstrs)):
+        if in_iis:
+            members.append((solver._solver_con_to_pyomo_con_map[constr], 'constraint'))
+    for grb_var, lower, upper in zip(grb_vars, grb_model.getAttr('IISLB', grb_vars), grb_model.getAttr('IISUB', grb_vars)):
+        if lower:
+            members.append((solver._solver_var_to_pyomo_var_map[grb_var], 'lower bound'))
+        if upper:
+            members.append((solver._solver_var_to_pyomo_var_map[grb_var], 'upper bound'))
+    return members
+
+
+# HiGHS model of the LP relaxation without objective, silent
+def _highs_feasibility_lp(lp):
+    import highspy
+
+    lp.integrality_ = []
+    lp.col_cost_ = np.zeros(lp.num_col_)
+    highs = highspy.Highs()
+    highs.setOptionValue('output_flag', False)
+    highs.passModel(lp)
+    return highs
+
+
+# Run the LP; True if it is infeasible
+def _infeasible(highs):
+    import highspy
+
+    highs.run()
+    return highs.getModelStatus() in (highspy.HighsModelStatus.kInfeasible,
+                                      highspy.HighsModelStatus.kUnboundedOrInfeasible)
+
+
+# Rows and column bounds of an IIS of the LP relaxation of the HiGHS model of the solver
+# (an appsi_highs instance of the model if the solver holds none)
+# Returns the members, or None if the LP relaxation is feasible
+def _highs_iis(model, solver):
+    if getattr(solver, '_solver_model', None) is None or not hasattr(solver._solver_model, 'getLp'):
+        solver = pyo.SolverFactory('appsi_highs')
+        solver.set_instance(model)
+    lp = solver._solver_model.getLp()
+    n_col, n_row = lp.num_col_, lp.num_row_
+    row_lower, row_upper = np.array(lp.row_lower_), np.array(lp.row_upper_)
+    col_lower, col_upper = np.array(lp.col_lower_), np.array(lp.col_upper_)
+    inf = np.inf
+
+    # Elastic filter: every row gets a slack up and down with cost 1; the rows violated at the
+    # optimum become hard (slacks fixed to zero) until the elastic LP is infeasible
+    elastic = _highs_feasibility_lp(solver._solver_model.getLp())
+    rows = np.arange(n_row)
+    elastic.addCols(2 * n_row, np.ones(2 * n_row), np.zeros(2 * n_row), np.full(2 * n_row, inf), 2 * n_row,
+                    np.arange(2 * n_row, dtype=np.int32), np.concatenate([rows, rows]).astype(np.int32),
+                    np.concatenate([np.ones(n_row), -np.ones(n_row)]))
+    hard = np.zeros(n_row, dtype=bool)
+    while not _infeasible(elastic):
+        slack = np.asarray(elastic.getSolution().col_value[n_col:])
+        violated = ((slack[:n_row] > TOLERANCE) | (slack[n_row:] > TOLERANCE)) & ~hard
+        if not violated.any():
+            return None
+        hard |= violated
+        slacks = np.concatenate([np.flatnonzero(violated), np.flatnonzero(violated) + n_row]) + n_col
+        elastic.changeColsBounds(len(slacks), slacks.astype(np.int32), np.zeros(len(slacks)), np.zeros(len(slacks)))
+
+    # Deletion filter on the rows: the LP with only the hard rows, a row that is not needed for
+    # the infeasibility stays free
+    highs = _highs_feasibility_lp(lp)
+    free_rows = np.flatnonzero(~hard).astype(np.int32)
+    highs.changeRowsBounds(len(free_rows), free_rows, np.full(len(free_rows), -inf), np.full(len(free_rows), inf))
+    iis_rows = []
+    for row in np.flatnonzero(hard):
+        highs.changeRowBounds(int(row), -inf, inf)
+        if not _infeasible(highs):
+            highs.changeRowBounds(int(row), row_lower[row], row_upper[row])
+            iis_rows.append(int(row))
+
+    # Deletion filter on the bounds of the columns of the IIS rows
+    import highspy
+
+    start, index = np.asarray(lp.a_matrix_.start_), np.asarray(lp.a_matrix_.index_)
+    if lp.a_matrix_.format_ == highspy.MatrixFormat.kColwise:
+        columns = np.repeat(np.arange(n_col), np.diff(start))[np.isin(index, iis_rows)]
+    else:
+        columns = index[np.isin(np.repeat(np.arange(n_row), np.diff(start)), iis_rows)]
+    iis_bounds = []
+    for col in np.unique(columns):
+        for member, bounds in (('lower bound', col_lower), ('upper bound', col_upper)):
+            if np.isinf(bounds[col]):
+                continue
+            kept = bounds[col]
+            bounds[col] = -inf if member == 'lower bound' else inf
+            highs.changeColBounds(int(col), col_lower[col], col_upper[col])
+            if not _infeasible(highs):
+                bounds[col] = kept
+                highs.changeColBounds(int(col), col_lower[col], col_upper[col])
+                iis_bounds.append((int(col), member))
+
+    pyomo_vars = {col: solver._vars[var_id][0] for var_id, col in solver._pyomo_var_to_solver_var_map.items()}
+    return ([(solver._solver_con_to_pyomo_con_map[row], 'constraint') for row in iis_rows]
+            + [(pyomo_vars[col], member) for col, member in iis_bounds])
+
+
+# IIS of an infeasible model, computed in memory by the backend
+#   solver     - the solver the model was solved with; its in-memory solver model is used if it
+#                holds one (persistent / direct / appsi interfaces), otherwise it is built
+#   timeseries - timestamps of the intervals, reported next to t
+# Returns one row per constraint or variable bound of the IIS (component, member, car, t,
+# delta, time, name); report.attrs['method'] names the method, an empty report of the HiGHS
+# method means the LP relaxation is feasible
+def compute_iis(model, solver_name=None, solver=None, timeseries=None):
+    solver_name = resolve_solver_name(solver_name)
+    if solver_name == 'gurobi':
+        members, method = _gurobi_iis(model, solver), 'Gurobi computeIIS'
+    else:
+        members, method = _highs_iis(model, solver), 'HiGHS elastic and deletion filter on the LP relaxation'
+    timeseries = pd.to_datetime(pd.Series(timeseries)).reset_index(drop=True) if timeseries is not None else None
+    report = pd.DataFrame([_member(data, member, timeseries) for data, member in members or []], columns=IIS_COLUMNS)
+    report.attrs['method'] = method
+    return report
+
+
+# Compact text of an IIS report: one line per component, member type and car with the
+# intervals as ranges
+def format_iis_report(report):
+    if len(report) == 0:
+        return f"IIS ({report.attrs.get('method')}): no conflict found in the LP relaxation"
+    lines = [f"IIS ({report.attrs.get('method')}): {len(report)} members"]
+    for (component, member, car), group in report.groupby(['component', 'member', 'car'], dropna=False, sort=False):
+        intervals = sorted(group['t'].dropna().astype(int))
+        ranges = []
+        for t in intervals:
+            if ranges and t == ranges[-1][1] + 1:
+                ranges[-1][1] = t
+            else:
+                ranges.append([t, t])
+        text = f"  {component} ({member})"
+        if car is not None and not pd.isna(car):
+            text += f" car {car}"
+        if ranges:
+            text += " t=" + ", ".join(f"{first}" if first == last else f"{first}-{last}" for first, last in ranges)
+            times = group['time'].dropna()
+            if len(times) and min(times) == max(times):
+                text += f" ({min(times):%Y-%m-%d %H:%M})"
+            elif len(times):
+                text += f" ({min(times):%Y-%m-%d %H:%M} to {max(times):%Y-%m-%d %H:%M})"
+        lines.append(text)
+    return "\n".join(lines)
@@ -0,0 +1,440 @@
+# ====================================================================
+# Direct Sparse-Matrix Model Assembly (Without Pyomo Expressions)
+# ====================================================================
+# Assembles the same constraint system as build_model (SOC dynamics,
+# connection limits, flexible load shifting) as scipy.sparse blocks with
+# vectorized NumPy index arithmetic and passes it to the matrix API of
+# the solver (gurobipy MVar or highspy). Single-variable constraints are
+# variable bounds, like build_model(compact=True).
+
+import time
+
+import numpy as np
+import pyomo.environ as pyo
+import scipy.sparse as sp
+
+from .model import STATIC_PARAMETERS, build_model
+from .solvers import get_solver
+
+# Formulations that are linear and can be assembled as a matrix
+MATRIX_FORMULATIONS = ('milp', 'transport')
+
+
+# Sparse feasible shifts (t, delta) in the same t-major order as model.TD
+def shift_pairs(n_T, shift_window):
+    t_grid = np.arange(n_T)[:, None]
+    delta_grid = np.arange(-shift_window, shift_window + 1)[None, :]
+    valid = (t_grid + delta_grid >= 0) & (t_grid + delta_grid < n_T)
+    t_k = np.broadcast_to(t_grid, valid.shape)[valid]
+    delta_k = np.broadcast_to(delta_grid, valid.shape)[valid]
+    return t_k, delta_k
+
+
+# Assemble the matrix model of one scenario
+# Returns a dictionary with the objective, bounds, variable types, the CSR constraint
+# matrix with row bounds and the column / row slices of every variable and constraint block
+def build_matrix_model(input_data, max_shift_share=0.20, shift_window=24, receiving_factor=1.2,
+                       target_soc=100, formulation='milp', reporting_variables=True):
+    if formulation not in MATRIX_FORMULATIONS:
+        raise ValueError(f"Unknown matrix formulation '{formulation}', expected one of {MATRIX_FORMULATIONS}")
+    start = time.perf_counter()
+    par = STATIC_PARAMETERS
+
+    P_fixed = np.asarray(input_data['P_fixed'], dtype=float)
+    P_flexible = np.asarray(input_data['P_flexible'], dtype=float)
+    P_pv = np.asarray(input_data['P_pv'], dtype=float)
+    C_t = np.asarray(input_data['C_t'], dtype=float)
+    location = np.asarray(input_data['car_location'], dtype=int)
+    distance = np.asarray(input_data['car_trip_distance'], dtype=float)
+    n_C, n_T = location.shape
+
+    t_k, delta_k = shift_pairs(n_T, shift_window)
+    n_K = len(t_k)
+    target_k = t_k + delta_k
+
+    # Column layout
+    # -------------
+    columns = {}
+    n_cols = 0
+    for name, size in [('P_car_charge', n_C * n_T), ('SOC', n_C * n_T), ('P_shift', n_T), ('P_shift_to', n_K)]:
+        columns[name] = slice(n_cols, n_cols + size)
+        n_cols += size
+    reporting = formulation == 'milp' and reporting_variables
+    column_blocks = []
+    if formulation == 'milp':
+        column_blocks.append(('y_shift', n_K))
+    if reporting:
+        column_blocks += [('z_shift', n_T), ('Delta_P_shift', n_T)]
+    for name, size in column_blocks:
+        columns[name] = slice(n_cols, n_cols + size)
+        n_cols += size
+
+    def col(name, index=None):
+        offset = columns[name].start
+        return offset + (np.arange(columns[name].stop - offset) if index is None else index)
+
+    # Car index helpers, car-major like the (cars, time steps) input arrays
+    car_time = np.arange(n_C * n_T).reshape(n_C, n_T)
+
+    # Variable bounds (single-variable constraints of the Pyomo model)
+    # -----------------------------------------------------------------
+    lb = np.zeros(n_cols)
+    ub = np.full(n_cols, np.inf)
+    vtype = np.full(n_cols, 'C')
+
+    # Car charging power: P_car_max at home, 0 when away and at the first interval at 100% SOC
+    charge_ub = par['P_car_max'] * (location == 1)
+    if target_soc == 100:
+        charge_ub[:, 0] = 0
+    ub[columns['P_car_charge']] = charge_ub.ravel()
+
+    # SOC bounds, initial SOC, SOC at departure, SOC at arrival and final SOC
+    soc_lb = np.full((n_C, n_T), float(par['SOC_min']))
+    soc_ub = np.full((n_C, n_T), float(par['SOC_max']))
+    soc_lb[:, 0] = np.maximum(soc_lb[:, 0], target_soc)
+    soc_ub[:, 0] = np.minimum(soc_ub[:, 0], target_soc)
+    departure = np.zeros((n_C, n_T), dtype=bool)
+    departure[:, :-1] = (location[:, :-1] == 1) & (location[:, 1:] == 0)
+    soc_lb[departure] = np.maximum(soc_lb[departure], target_soc)
+    arrival = np.zeros((n_C, n_T), dtype=bool)
+    arrival[:, 1:] = (location[:, :-1] == 0) & (location[:, 1:] == 1)
+    soc_arrival = target_soc - (distance[:, :-1] / par['Car_Mileage']) * (100 / par['Battery_Capacity'])
+    soc_lb[arrival] = np.maximum(soc_lb[arrival], soc_arrival[arrival[:, 1:]])
+    soc_ub[arrival] = np.minimum(soc_ub[arrival], soc_arrival[arrival[:, 1:]])
+    final_home = location[:, -1] == 1
+    soc_lb[final_home, -1] = np.maximum(soc_lb[final_home, -1], target_soc)
+    lb[columns['SOC']] = soc_lb.ravel()
+    ub[columns['SOC']] = soc_ub.ravel()
+
+    # Shifted flexible load and its parts moved to each target interval
+    shift_limit = P_flexible * max_shift_share
+    ub[columns['P_shift']] = shift_limit
+    shift_to_ub = (receiving_factor - 1) * P_flexible[target_k]
+    if formulation == 'transport':
+        shift_to_ub[delta_k == 0] = 0
+    # Intervals without flexible load: shifts from or to them are fixed to zero
+    zero_flex = P_flexible <= 0
+    fixed_k = zero_flex[t_k] | zero_flex[target_k]
+    shift_to_ub[fixed_k] = 0
+    ub[columns['P_shift_to']] = shift_to_ub
+
+    if formulation == 'milp':
+        y_ub = np.where(fixed_k, 0.0, 1.0)
+        y_lb = np.zeros(n_K)
+        # No shift from an interval without flexible load: y_shift[t, 0] = 1
+        y_lb[zero_flex[t_k] & (delta_k == 0)] = 1
+        y_ub[zero_flex[t_k] & (delta_k == 0)] = 1
+        lb[columns['y_shift']] = y_lb
+        ub[columns['y_shift']] = y_ub
+        vtype[columns['y_shift']] = 'B'
+    if reporting:
+        ub[columns['z_shift']] = np.where(zero_flex, 0.0, 1.0)
+        vtype[columns['z_shift']] = 'B'
+        lb[columns['Delta_P_shift']] = np.where(zero_flex, 0, -shift_window)
+        ub[columns['Delta_P_shift']] = np.where(zero_flex, 0, shift_window)
+        vtype[columns['Delta_P_shift']] = 'I'
+
+    # Constraint blocks as COO triplets (row, column, value) with row bounds
+    # ----------------------------------------------------------------------
+    blocks = []
+    rows = {}
+    n_rows = 0
+
+    def add_block(name, n_block_rows, entries, row_lower, row_upper):
+        nonlocal n_rows
+        block_rows = np.concatenate([np.asarray(r) for r, _, _ in entries]) + n_rows
+        block_cols = np.concatenate([np.asarray(c) for _, c, _ in entries])
+        block_vals = np.concatenate([np.broadcast_to(np.asarray(v, dtype=float), np.shape(r)) for r, _, v in entries])
+        blocks.append((block_rows, block_cols, block_vals,
+                       np.broadcast_to(row_lower, n_block_rows), np.broadcast_to(row_upper, n_block_rows)))
+        rows[name] = slice(n_rows, n_rows + n_block_rows)
+        n_rows += n_block_rows
+
+    # SOC during charging periods: SOC[c, t] - SOC[c, t-1] - eta * 100 / Battery_Capacity * P_car_charge[c, t] = 0
+    charging = np.zeros((n_C, n_T), dtype=bool)
+    charging[:, 1:] = (location[:, 1:] == 1) & (location[:, :-1] == 1)
+    idx = car_time[charging]
+    r = np.arange(len(idx))
+    add_block('soc_during_charging', len(idx), [
+        (r, col('SOC', idx), 1.0),
+        (r, col('SOC', idx - 1), -1.0),
+        (r, col('P_car_charge', idx), -par['eta'] * 100 / par['Battery_Capacity']),
+    ], 0.0, 0.0)
+
+    # Connection limits: Lower <= P_fixed + P_flexible - P_shift + received + charging <= Upper
+    t_all = np.arange(n_T)
+    add_block('power_limit', n_T, [
+        (t_all, col('P_shift'), -1.0),
+        (target_k, col('P_shift_to'), 1.0),
+        (np.tile(t_all, n_C), col('P_car_charge'), 1.0),
+    ], par['Lower_Power_Limit'] - P_fixed - P_flexible, par['Upper_Power_Limit'] - P_fixed - P_flexible)
+
+    # Enforce load shifting: P_shift[t] = sum of the parts moved from t
+    add_block('enforce_shift', n_T, [
+        (t_all, col('P_shift'), 1.0),
+        (t_k, col('P_shift_to'), -1.0),
+    ], 0.0, 0.0)
+
+    if formulation == 'milp':
+        # Each P_shift[t] is assigned to exactly one target interval
+        add_block('shift_assignment', n_T, [(t_k, col('y_shift'), 1.0)], 1.0, 1.0)
+
+        # P_shift_to[t, delta] <= P_flexible[t] * Max_Shifting_Capability * y_shift[t, delta]
+        k_all = np.arange(n_K)
+        add_block('link_shift_to', n_K, [
+            (k_all, col('P_shift_to'), 1.0),
+            (k_all, col('y_shift'), -shift_limit[t_k]),
+        ], -np.inf, 0.0)
+
+        # Reporting variables z_shift and Delta_P_shift
+        if reporting:
+            # P_shift[t] <= P_flexible[t] * Max_Shifting_Capability * z_shift[t]
+            add_block('link_z_shift', n_T, [
+                (t_all, col('P_shift'), 1.0),
+                (t_all, col('z_shift'), -shift_limit),
+            ], -np.inf, 0.0)
+
+            # Delta_P_shift[t] = sum(delta * y_shift[t, delta]) * z_shift[t], linearized with big-M = 2 * shift_window
+            M = 2 * shift_window
+            add_block('delta_p_shift', 2 * n_T, [
+                (t_all, col('Delta_P_shift'), 1.0),
+                (t_k, col('y_shift'), -delta_k),
+                (t_all, col('z_shift'), M),
+                (n_T + t_all, col('Delta_P_shift'), 1.0),
+                (n_T + t_k, col('y_shift'), -delta_k),
+                (n_T + t_all, col('z_shift'), -M),
+            ], np.concatenate([np.full(n_T, -np.inf), np.full(n_T, -M)]), np.concatenate([np.full(n_T, M), np.full(n_T, np.inf)]))
+            add_block('delta_p_shift_zero', n_T, [
+                (t_all, col('Delta_P_shift'), 1.0),
+                (t_all, col('z_shift'), -shift_window),
+            ], -np.inf, 0.0)
+            add_block('delta_p_shift_zero_lower', n_T, [
+                (t_all, col('Delta_P_shift'), 1.0),
+                (t_all, col('z_shift'), shift_window),
+            ], 0.0, np.inf)
+
+        # Prevent y_shift[t, 0] when P_shift[t] > 0: P_shift[t] + limit * y_shift[t, 0] <= limit
+        k_zero = np.flatnonzero(delta_k == 0)
+        add_block('prevent_zero_shift', n_T, [
+            (t_all, col('P_shift'), 1.0),
+            (t_all, col('y_shift', k_zero), shift_limit),
+        ], -np.inf, shift_limit)
+
+    A = sp.csr_matrix((np.concatenate([b[2] for b in blocks]),
+                       (np.concatenate([b[0] for b in blocks]), np.concatenate([b[1] for b in blocks]))),
+                      shape=(n_rows, n_cols))
+
+    # Objective: sum C_t * (P_building[t] - P_pv[t]) = constant + linear terms
+    # ------------------------------------------------------------------------
+    c = np.zeros(n_cols)
+    c[columns['P_car_charge']] = np.tile(C_t, n_C)
+    c[columns['P_shift']] = -C_t
+    c[columns['P_shift_to']] = C_t[target_k]
+    objective_constant = float(np.sum(C_t * (P_fixed + P_flexible - P_pv)))
+
+    return {
+        'formulation': formulation,
+        'n_C': n_C,
+        'n_T': n_T,
+        't_k': t_k,
+        'delta_k': delta_k,
+        'c': c,
+        'objective_constant': objective_constant,
+        'lb': lb,
+        'ub': ub,
+        'vtype': vtype,
+        'A': A,
+        'row_lower': np.concatenate([b[3] for b in blocks]),
+        'row_upper': np.concatenate([b[4] for b in blocks]),
+        'columns': columns,
+        'rows': rows,
+        'build_time': time.perf_counter() - start,
+    }
+
+
+# Solve with the gurobipy matrix API (MVar and addMConstr)
+def _solve_gurobi(mm, tee, time_limit):
+    import gurobipy as gp
+    from gurobipy import GRB
+
+    m = gp.Model()
+    m.Params.OutputFlag = int(tee)
+    if time_limit is not None:
+        m.Params.TimeLimit = time_limit
+    x = m.addMVar(len(mm['c']), lb=mm['lb'], ub=mm['ub'], obj=mm['c'], vtype=mm['vtype'])
+    m.ObjCon = mm['objective_constant']
+
+    A, lower, upper = mm['A'], mm['row_lower'], mm['row_upper']
+    equal = lower == upper
+    less = np.isfinite(upper) & ~equal
+    greater = np.isfinite(lower) & ~equal
+    m.addMConstr(A[equal], x, '=', upper[equal])
+    m.addMConstr(A[less], x, '<', upper[less])
+    m.addMConstr(A[greater], x, '>', lower[greater])
+    m.optimize()
+
+    optimal = m.Status == GRB.OPTIMAL
+    has_solution = m.SolCount > 0
+    return {
+        'optimal': optimal,
+        'status': m.Status,
+        'x': x.X if has_solution else None,
+        'cost': m.ObjVal if has_solution else None,
+    }
+
+
+# Solve with the highspy matrix API (row-wise HighsLp)
+def _solve_highs(mm, tee, time_limit):
+    import highspy
+
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', bool(tee))
+    if time_limit is not None:
+        h.setOptionValue('time_limit', float(time_limit))
+
+    A = mm['A']
+    lp = highspy.HighsLp()
+    lp.num_col_ = A.shape[1]
+    lp.num_row_ = A.shape[0]
+    lp.col_cost_ = mm['c']
+    lp.col_lower_ = mm['lb']
+    lp.col_upper_ = mm['ub']
+    lp.row_lower_ = mm['row_lower']
+    lp.row_upper_ = mm['row_upper']
+    lp.offset_ = mm['objective_constant']
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.start_ = A.indptr
+    lp.a_matrix_.index_ = A.indices
+    lp.a_matrix_.value_ = A.data
+    h.passModel(lp)
+
+    integer_columns = np.flatnonzero(mm['vtype'] != 'C')
+    if len(integer_columns):
+        h.changeColsIntegrality(len(integer_columns), integer_columns,
+                                np.full(len(integer_columns), highspy.HighsVarType.kInteger))
+    h.run()
+
+    status = h.getModelStatus()
+    info = h.getInfo()
+    has_solution = info.primal_solution_status == 2
+    return {
+        'optimal': status == highspy.HighsModelStatus.kOptimal,
+        'status': h.modelStatusToString(status),
+        'x': np.array(h.getSolution().col_value) if has_solution else None,
+        'cost': info.objective_function_value if has_solution else None,
+    }
+
+
+MATRIX_SOLVERS = {
+    'gurobi': _solve_gurobi,
+    'highs': _solve_highs,
+}
+
+
+# Solve the matrix model; returns optimal flag, solver status, solution vector x and cost
+def solve_matrix_model(mm, solver_name='gurobi', tee=False, time_limit=None):
+    if solver_name not in MATRIX_SOLVERS:
+        raise ValueError(f"Unknown matrix solver '{solver_name}', expected one of {tuple(MATRIX_SOLVERS)}")
+    start = time.perf_counter()
+    solution = MATRIX_SOLVERS[solver_name](mm, tee, time_limit)
+    solution['solve_time'] = time.perf_counter() - start
+    return solution
+
+
+# Solution vector of the matrix model as arrays per variable block
+def solution_arrays(mm, x):
+    n_C, n_T = mm['n_C'], mm['n_T']
+    arrays = {name: x[block] for name, block in mm['columns'].items()}
+    arrays['P_car_charge'] = arrays['P_car_charge'].reshape(n_C, n_T)
+    arrays['SOC'] = arrays['SOC'].reshape(n_C, n_T)
+    arrays['P_shift_received'] = np.bincount(mm['t_k'] + mm['delta_k'], weights=arrays['P_shift_to'], minlength=n_T)
+    return arrays
+
+
+# Load the matrix solution into the variables of a Pyomo model of the same scenario
+def load_into_pyomo(mm, x, model):
+    arrays = solution_arrays(mm, x)
+    for i, c in enumerate(model.C):
+        for t in model.T:
+            model.P_car_charge[c, t].set_value(arrays['P_car_charge'][i, t], skip_validation=True)
+            model.SOC[c, t].set_value(arrays['SOC'][i, t], skip_validation=True)
+    for t in model.T:
+        model.P_shift[t].set_value(arrays['P_shift'][t], skip_validation=True)
+    for k, (t, delta) in enumerate(zip(mm['t_k'].tolist(), mm['delta_k'].tolist())):
+        model.P_shift_to[t, delta].set_value(arrays['P_shift_to'][k], skip_validation=True)
+        if mm['formulation'] == 'milp':
+            model.y_shift[t, delta].set_value(round(arrays['y_shift'][k]), skip_validation=True)
+    if 'z_shift' in mm['columns']:
+        for t in model.T:
+            model.z_shift[t].set_value(round(arrays['z_shift'][t]), skip_validation=True)
+            model.Delta_P_shift[t].set_value(round(arrays['Delta_P_shift'][t]), skip_validation=True)
+
+
+# Largest violation of any constraint or variable bound of a Pyomo model at its current values
+def max_violation(model):
+    violation = 0.0
+    for con in model.component_data_objects(pyo.Constraint, active=True):
+        body = pyo.value(con.body)
+        if con.has_lb():
+            violation = max(violation, pyo.value(con.lower) - body)
+        if con.has_ub():
+            violation = max(violation, body - pyo.value(con.upper))
+    for var in model.component_data_objects(pyo.Var):
+        if var.value is None:
+            continue
+        if var.lb is not None:
+            violation = max(violation, var.lb - var.value)
+        if var.ub is not None:
+            violation = max(violation, var.value - var.ub)
+    return violation
+
+
+# Parity check of the matrix backend against the Pyomo model of the same scenario:
+# both are solved, and the matrix solution is checked against every Pyomo constraint
+# The costs are compared with the relative MIP gap of the solvers (default 1e-4), the
+# constraints and the objective of the loaded solution with the feasibility tolerance; without
+# an optimal solution of both models the check reports parity False
+def check_parity(input_data, solver_name='gurobi', formulation='milp', tolerance=1e-6, cost_tolerance=1e-4, **settings):
+    mm = build_matrix_model(input_data, formulation=formulation, **settings)
+    matrix_solution = solve_matrix_model(mm, solver_name)
+
+    start = time.perf_counter()
+    model = build_model(input_data, formulation=formulation, **settings)
+    pyomo_build_time = time.perf_counter() - start
+    pyomo_results = get_solver(solver_name).solve(model, load_solutions=False)
+    pyomo_termination_condition = str(pyomo_results.solver.termination_condition)
+    # Without an optimal solution of both models (infeasible, time limit) there is no parity
+    if pyomo_termination_condition != 'optimal' or not matrix_solution['optimal']:
+        return {
+            'matrix_build_time': mm['build_time'],
+            'pyomo_build_time': pyomo_build_time,
+            'matrix_cost': matrix_solution['cost'],
+            'pyomo_cost': None,
+            'pyomo_termination_condition': pyomo_termination_condition,
+            'matrix_cost_in_pyomo': None,
+            'cost_difference': None,
+            'max_violation': None,
+            'parity': False,
+        }
+    model.solutions.load_from(pyomo_results)
+    pyomo_cost = pyo.value(model.objective)
+
+    load_into_pyomo(mm, matrix_solution['x'], model)
+    violation = max_violation(model)
+    matrix_cost_in_pyomo = pyo.value(model.objective)
+
+    cost_difference = abs(matrix_solution['cost'] - pyomo_cost)
+    scale = max(1.0, abs(pyomo_cost))
+    return {
+        'matrix_build_time': mm['build_time'],
+        'pyomo_build_time': pyomo_build_time,
+        'matrix_cost': matrix_solution['cost'],
+        'pyomo_cost': pyomo_cost,
+        'pyomo_termination_condition': str(pyomo_results.solver.termination_condition),
+        'matrix_cost_in_pyomo': matrix_cost_in_pyomo,
+        'cost_difference': cost_difference,
+        'max_violation': violation,
+        'parity': (cost_difference <= cost_tolerance * scale
+                   and abs(matrix_cost_in_pyomo - matrix_solution['cost']) <= tolerance * scale
+                   and violation <= tolerance),
+    }
@@ -0,0 +1,583 @@
+# ==============================================================
+# ComfficientShare Pyomo Model (Sets, Parameters, Variables,
+# Objective Function and Constraints)
+# ==============================================================
+
+import numpy as np
+import pyomo.environ as pyo
+
+from .compaction import fold_single_variable_rule, new_compaction_report
+from .profiling import end_phase, start_run_manifest
+
+
+# Available formulations of the flexible load shifting:
+#   'miqcp'     - original formulation, P_shift[t] * y_shift[t, delta] products (non-convex MIQCP)
+#   'milp'      - exact linearization with disaggregated shifted power P_shift_to[t, delta] (pure MILP)
+#   'transport' - divisible shifting, P_shift_to[t, delta] is a flow to any targets in the window
+#                 (pure LP screening model and lower bound on the cost of the exact formulations)
+FORMULATIONS = ('miqcp', 'milp', 'transport')
+
+# Static technical parameters of the building and the cars (shared with the matrix backend)
+STATIC_PARAMETERS = {
+    'SOC_min': 20,               # Minimum allowable SOC (Percentage)
+    'SOC_max': 100,              # Maximum allowable SOC (Percentage)
+    'eta': 0.95,                 # Charging efficiency per Car (Percentage)
+    'Upper_Power_Limit': 65,     # Upper power limit (kW)
+    'Lower_Power_Limit': 0,      # Lower power limit (kW)
+    'Battery_Capacity': 84,      # Battery capacity per Car (kWh)
+    'P_car_max': 11,             # Max Charging Power per Car (11kW for CUPRA Born Charger)
+    'Car_Mileage': 6.28,         # Car mileage per Car (km/kWh)
+}
+
+
+# Energy (kWh) the SOC balance of the model adds per charging interval at full power
+# (P_car_max x eta, see the SOC during charging constraint), shared by the NumPy pre-checks
+# and the year-long data preparation so they follow the model
+def charging_energy_per_interval():
+    return STATIC_PARAMETERS['P_car_max'] * STATIC_PARAMETERS['eta']
+
+
+# Energy (kWh) the SOC at arrival of the model takes off for a trip of the given distance (km)
+def trip_energy(distance):
+    return distance / STATIC_PARAMETERS['Car_Mileage']
+
+
+# Build the optimization model for one scenario
+#   max_shift_share  - max share of the flexible load that can be shifted (0.20 = 20%)
+#   shift_window     - max shift in 15-minute intervals in each direction (24 = 6 hours)
+#   receiving_factor - max flexible load at the receiving interval (1.2 = 120% of original)
+#   compact          - fold single-variable constraints into variable bounds / fixed variables,
+#                      the removed rows and columns are reported in model.compaction_report
+#   mutable          - declare the scenario parameters (Max_Shifting_Capability, Receiving_Factor,
+#                      SOC_Target) as mutable Params, so a built model can be updated in place
+#   reporting_variables - optimize Delta_P_shift and z_shift (only used for reporting); with False
+#                      they are dropped with their constraints and Delta_P_shift is derived from
+#                      y_shift after the solve (see results.delta_p_shift_value)
+#   initial_soc, initial_charge - per-car SOC and charging power at the first interval (dicts by car,
+#                      e.g. carried over from the previous window of a rolling horizon); by default
+#                      the cars start at the target SOC without charging at 100%
+#   pending_received - shifted load (kW) already committed to each interval from before the horizon
+#   final_soc        - require the target SOC at the end of the horizon (cars at home); a window
+#                      of a rolling horizon that is followed by another window leaves it out
+def build_model(input_data, max_shift_share=0.20, shift_window=24, receiving_factor=1.2,
+                target_soc=100, formulation='miqcp', compact=False, mutable=False, reporting_variables=True,
+                initial_soc=None, initial_charge=None, pending_received=None, final_soc=True):
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"Unknown formulation '{formulation}', expected one of {FORMULATIONS}")
+    if compact and mutable:
+        raise ValueError("Compaction folds the parameter values into variable bounds, a mutable model cannot be compacted")
+
+    # Wall time, CPU time and memory of the build sections, stored in model.build_phases
+    build_phases = start_run_manifest('build_model')
+
+    # Model compaction pass applied to the single-variable constraint blocks below
+    compaction_report = new_compaction_report()
+
+    def compacted(rule):
+        return fold_single_variable_rule(rule, compaction_report) if compact else rule
+
+    # =================================
+    # Section 3: Define Model and Sets
+    # =================================
+
+    # Define the optimization model
+    model = pyo.ConcreteModel()
+
+    # Set of time intervals T, corresponding to each 15-minute interval in the week
+    n_T = len(input_data['P_fixed'])
+    model.T = pyo.Set(initialize=range(n_T), ordered=True)
+
+    # Set of cars based on available car identifiers from the input data
+    car_ids = input_data['car_ids']
+    model.C = pyo.Set(initialize=car_ids, ordered=True)
+
+    # Sparse set of feasible shifts (t, delta): P_shift[t] can be moved to interval t+delta
+    # within the forward/backward range of ±shift_window intervals and inside the horizon
+    shift_pairs = [(t, delta) for t in range(n_T)
+                   for delta in range(max(-shift_window, -t), min(shift_window, n_T - 1 - t) + 1)]
+    model.TD = pyo.Set(initialize=shift_pairs, dimen=2, ordered=True)
+
+    # Forward adjacency: shifts delta leaving interval t (target t+delta)
+    # Reverse adjacency: shifts delta arriving at interval t (origin t-delta)
+    model.TD_out = pyo.Set(model.T, initialize={t: [] for t in range(n_T)}, ordered=True)
+    model.TD_in = pyo.Set(model.T, initialize={t: [] for t in range(n_T)}, ordered=True)
+    for t, delta in shift_pairs:
+        model.TD_out[t].add(delta)
+        model.TD_in[t + delta].add(delta)
+
+    # Time intervals without flexible load: nothing can be shifted from or to them, so their
+    # shift variables are fixed to zero up front instead of being constrained by big-M rows
+    zero_flex = set(np.flatnonzero(np.asarray(input_data['P_flexible']) <= 0).tolist())
+    model.T_zero_flex = pyo.Set(initialize=sorted(zero_flex), ordered=True)
+
+    # A shift (t, delta) is fixed if its origin or its target interval has no flexible load
+    def shift_fixed(t, delta):
+        return t in zero_flex or t + delta in zero_flex
+
+    # Define subsets for car-specific data at each time interval
+    # Binary sets for car location status, where '1' indicates the car is at home, '0' if away
+    # and distance set indicating trip distance at the end of each trip
+    # The (cars, time steps) arrays are flattened in the same car-major order as the index
+    car_time_index = [(car, t) for car in car_ids for t in range(n_T)]
+    model.car_location = pyo.Param(model.C, model.T, initialize=dict(zip(car_time_index, input_data['car_location'].ravel().tolist())), within=pyo.Binary)
+    model.car_distance = pyo.Param(model.C, model.T, initialize=dict(zip(car_time_index, input_data['car_trip_distance'].ravel().tolist())), within=pyo.NonNegativeReals)
+
+    end_phase(build_phases, 'sets')
+
+    # =================================
+    # Section 4: Define Parameters
+    # =================================
+
+    # Define static parameters within the Pyomo model
+    model.SOC_min = pyo.Param(initialize=STATIC_PARAMETERS['SOC_min'])  # Minimum allowable SOC (Percentage)
+    model.SOC_max = pyo.Param(initialize=STATIC_PARAMETERS['SOC_max']) # Maximum allowable SOC (Percentage)
+
+    # Define parameters within the Pyomo model
+    model.P_fixed = pyo.Param(model.T, initialize={t: input_data['P_fixed'][t] for t in model.T}, within=pyo.NonNegativeReals)   # Fixed power consumption at each time interval (kW)
+
+    model.P_flexible = pyo.Param(model.T, initialize={t: input_data['P_flexible'][t] for t in model.T}, within=pyo.NonNegativeReals)   # Flexible power consumption at each time interval (kW)
+
+    model.P_pv = pyo.Param(model.T, initialize={t: input_data['P_pv'][t] for t in model.T}, within=pyo.NonNegativeReals)   # PV generation at each time interval (kW)
+
+    model.C_t = pyo.Param(model.T, initialize={t: input_data['C_t'][t] for t in model.T}, within=pyo.NonNegativeReals)   # Electricity cost at each time interval (€/kWh)
+
+    model.eta = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=STATIC_PARAMETERS['eta'])   # Charging efficiency per Car (Percentage)
+
+    model.Max_Shifting_Capability = pyo.Param(model.T, within=pyo.NonNegativeReals, initialize=max_shift_share, mutable=mutable)   # Max percentage of flexible load that can be shifted (Percentage)
+
+    model.Receiving_Factor = pyo.Param(within=pyo.NonNegativeReals, initialize=receiving_factor, mutable=mutable)   # Max flexible load at the receiving interval (Factor of original)
+
+    model.Upper_Power_Limit = pyo.Param(model.T, within=pyo.NonNegativeReals, initialize=STATIC_PARAMETERS['Upper_Power_Limit'])   # Upper power limit (kW)
+
+    model.Lower_Power_Limit = pyo.Param(model.T, within=pyo.NonNegativeReals, initialize=STATIC_PARAMETERS['Lower_Power_Limit'])   # Lower power limit (kW)
+
+    model.Battery_Capacity = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=STATIC_PARAMETERS['Battery_Capacity'])   # Battery capacity per Car (kWh)
+
+    model.P_car_max = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=STATIC_PARAMETERS['P_car_max'])   # Max Charging Power per Car (11kW for CUPRA Born Charger)
+
+    model.Car_Mileage = pyo.Param(model.C, within=pyo.NonNegativeReals, initialize=STATIC_PARAMETERS['Car_Mileage'])   # Car mileage per Car (km/kWh)
+
+    # Target SOC, assuming all cars at 100% SOC
+    model.SOC_Target = pyo.Param(model.C, initialize={car: target_soc for car in model.C}, mutable=mutable)
+
+    end_phase(build_phases, 'parameters')
+
+    # =================================================
+    # Section 5: Define Variables (Decision Variables)
+    # =================================================
+
+    # Charging power for each car at each time interval (kW)
+    # The domain is non-negative as charging power cannot be negative
+    model.P_car_charge = pyo.Var(model.C, model.T, domain=pyo.NonNegativeReals)
+
+    # State of Charge (SOC) for each car at each time interval (%)
+    # Bounds are defined by SOC_min and SOC_max parameters
+    model.SOC = pyo.Var(model.C, model.T, bounds=(model.SOC_min, model.SOC_max))
+
+    # Shifted flexible load at each time interval (kW)
+    # The domain is non-negative as load shifting cannot reduce the overall load below zero
+    model.P_shift = pyo.Var(model.T, domain=pyo.NonNegativeReals)     # Non-negative for fractional flexible loads
+
+    # The shift decisions are binary in the exact formulations only
+    if formulation != 'transport':
+        # Binary variable y_shift[t, delta] that determines whether P_shift[t] is moved to interval t+delta
+        model.y_shift = pyo.Var(model.TD, domain=pyo.Binary)
+
+    # Reporting variables of the exact formulations (shift interval for the results and the histogram)
+    reporting = formulation != 'transport' and reporting_variables
+    if reporting:
+        # Delta_P_shift allows a forward/backward range of ±shift_window intervals
+        model.Delta_P_shift = pyo.Var(model.T, domain=pyo.Integers, bounds=(-shift_window, shift_window))
+
+        # Introduce a new binary variable z_shift[t] that is 1 if P_shift[t] > 0, and 0 otherwise
+        model.z_shift = pyo.Var(model.T, domain=pyo.Binary)
+
+    # MILP formulation: P_shift_to[t, delta] is the part of P_shift[t] moved to interval t+delta (kW)
+    # It replaces every product P_shift[t] * y_shift[t, delta] of the MIQCP formulation
+    # Transport formulation: P_shift_to[t, delta] is the flow of shifted load from t to t+delta (kW)
+    if formulation in ('milp', 'transport'):
+        model.P_shift_to = pyo.Var(model.TD, domain=pyo.NonNegativeReals)
+
+    # Transport formulation: a flow back into the same interval is not a shift
+    if formulation == 'transport':
+        for t in model.T:
+            model.P_shift_to[t, 0].fix(0)
+
+    # Fix the shift variables of the intervals without flexible load
+    # (no shift from t: y_shift[t, 0] = 1 keeps the assignment to exactly one target)
+    for t in model.T_zero_flex:
+        model.P_shift[t].fix(0)
+        if reporting:
+            model.z_shift[t].fix(0)
+            model.Delta_P_shift[t].fix(0)
+    for t, delta in model.TD:
+        if shift_fixed(t, delta):
+            if formulation in ('milp', 'transport'):
+                model.P_shift_to[t, delta].fix(0)
+            if formulation != 'transport':
+                model.y_shift[t, delta].fix(1 if t in zero_flex and delta == 0 else 0)
+
+    # Shifted load moved from interval t to interval t+delta
+    def moved_shift(model, t, delta):
+        if formulation in ('milp', 'transport'):
+            return model.P_shift_to[t, delta]
+        return model.P_shift[t] * model.y_shift[t, delta]
+
+    # ===========================================================
+    # Section 5.1: Define Shared Expressions (Built Once per Step)
+    # ===========================================================
+
+    # Shifted load committed to interval t before the start of the horizon (kW)
+    if pending_received is not None:
+        model.P_shift_pending = pyo.Param(model.T, initialize={t: pending_received[t] for t in model.T}, within=pyo.NonNegativeReals)
+
+    # Flexible load received at interval t from all other intervals (kW)
+    def received_shift_rule(model, t):
+        received = sum(moved_shift(model, t - delta, delta) for delta in model.TD_in[t])
+        if pending_received is not None:
+            received += model.P_shift_pending[t]
+        return received
+
+    model.P_shift_received = pyo.Expression(model.T, rule=received_shift_rule)
+
+    # Building load at interval t after shifting, including car charging, without PV (kW)
+    # Shared by the objective, the connection limits and the result extraction
+    def building_load_rule(model, t):
+        return (model.P_fixed[t] + model.P_flexible[t] - model.P_shift[t]
+            + model.P_shift_received[t]  # Add received flexible load
+            + sum(model.P_car_charge[c, t] for c in model.C))
+
+    model.P_building = pyo.Expression(model.T, rule=building_load_rule)
+
+    end_phase(build_phases, 'variables')
+
+    # ========================================================================
+    # Section 6: Define Objective Function: Minimize Overall Electricity Costs
+    # ========================================================================
+
+    # Define the objective function to minimize electricity costs
+    def objective_rule(model):
+        return sum(model.C_t[t] * (model.P_building[t] - model.P_pv[t]) for t in model.T)
+
+    # Add the objective to the model
+    model.objective = pyo.Objective(rule=objective_rule, sense=pyo.minimize)
+
+    end_phase(build_phases, 'objective')
+
+    # ==================================================
+    # Section 7: Define Constraints (All 5 Constraints)
+    # ==================================================
+
+    # ==========================================
+    # Section 7.1: Car Charging Power Constraint
+    # ==========================================
+
+    def car_charging_power_rule(model, c, t):
+        # If the car is available for charging (binary 1 in Cars_location sheet)
+        if model.car_location[c, t] == 1:
+            return model.P_car_charge[c, t] <= model.P_car_max[c]
+        # If the car is not available for charging (binary 0 in Cars_location sheet)
+        else:
+            return model.P_car_charge[c, t] == 0
+
+    # Add the constraint to the model
+    model.car_charging_power_constraint = pyo.Constraint(model.C, model.T, rule=compacted(car_charging_power_rule))
+
+    # ===========================================================================
+    # Section 7.1.1: No charging at the start of the week if SOC is already 100%
+    # ===========================================================================
+
+    def no_charging_initial_rule(model, c):
+        # Charging power at the first time interval carried over from the previous horizon
+        if initial_charge is not None:
+            return model.P_car_charge[c, model.T.first()] == initial_charge[c]
+        # At the first time interval, if SOC starts at 100%, P_car_charge should be 0
+        if pyo.value(model.SOC_Target[c]) == 100:
+            return model.P_car_charge[c, model.T.first()] == 0
+        else:
+            return pyo.Constraint.Skip
+
+    # Add the constraint to the model
+    model.no_charging_initial_constraint = pyo.Constraint(model.C, rule=compacted(no_charging_initial_rule))
+
+    # ================================
+    # Section 7.2: Car SOC Constraints
+    # ================================
+
+    # ===========================================================
+    # Car SOC Constraint 7.2.1: Initial SOC at Start of the Week
+    # ===========================================================
+
+    def initial_soc_rule(model, c):
+        # SOC at the first time interval carried over from the previous horizon
+        if initial_soc is not None:
+            return model.SOC[c, model.T.first()] == initial_soc[c]
+        # At the first time interval, all cars start with 100% SOC
+        return model.SOC[c, model.T.first()] == model.SOC_Target[c]
+
+    # Add the constraint to the model
+    model.initial_soc_constraint = pyo.Constraint(model.C, rule=compacted(initial_soc_rule))
+
+    # =======================================================
+    # Car SOC Constraint 7.2.2: SOC at Departure (SOC_target)
+    # =======================================================
+
+    def soc_target_rule(model, c, t):
+        # Check if car switches from "at building" (1) to "not at building" (0)
+        if t < model.T.last() and model.car_location[c, t] == 1 and model.car_location[c, t + 1] == 0:
+            return model.SOC[c, t] >= model.SOC_Target[c]
+        else:
+            return pyo.Constraint.Skip
+
+    # Add the constraint to the model
+    model.soc_target_constraint = pyo.Constraint(model.C, model.T, rule=compacted(soc_target_rule))
+
+    # =======================================================
+    # Car SOC Constraints 7.2.3: SOC at Arrival (SOC_arrival)
+    # =======================================================
+
+    def soc_arrival_rule(model, c, t):
+        # Check if car switches from "not at building" (0) to "at building" (1)
+        if t < model.T.last() and model.car_location[c, t] == 0 and model.car_location[c, t + 1] == 1:
+            # SOC at arrival based on trip distance; must remain above SOC_min
+            return model.SOC[c, t + 1] == model.SOC_Target[c] - (model.car_distance[c, t] / model.Car_Mileage[c]) * (100 / model.Battery_Capacity[c])
+        else:
+            return pyo.Constraint.Skip
+
+    # Additional Constraint: Enforce SOC_min after arrival
+    def enforce_minimum_soc_rule(model, c, t):
+        # Ensure SOC does not drop below SOC_min after arriving
+        if t < model.T.last() and model.car_location[c, t] == 0 and model.car_location[c, t + 1] == 1:
+            return model.SOC[c, t + 1] >= model.SOC_min
+        else:
+            return pyo.Constraint.Skip
+
+    # Add the constraints to the model
+    model.soc_arrival_constraint = pyo.Constraint(model.C, model.T, rule=compacted(soc_arrival_rule))
+    model.enforce_minimum_soc_constraint = pyo.Constraint(model.C, model.T, rule=compacted(enforce_minimum_soc_rule))
+
+    # ======================================================
+    # Car SOC Constraints 7.2.4: SOC During Charging Periods
+    # ======================================================
+
+    def soc_during_charging_rule(model, c, t):
+        # Only during the time car is at the building for charging
+        if t > model.T.first() and model.car_location[c, t] == 1 and model.car_location[c, t - 1] == 1:
+            # SOC at time t is equal to SOC at (t-1) plus charging increment
+            return model.SOC[c, t] == model.SOC[c, t - 1] + (model.P_car_charge[c, t] * model.eta[c] * 100 / model.Battery_Capacity[c])
+        else:
+            return pyo.Constraint.Skip
+
+    # Additional Constraint: Enforce SOC_max during charging
+    def enforce_maximum_soc_rule(model, c, t):
+        # Ensure SOC does not exceed SOC_max during charging
+        if t > model.T.first() and model.car_location[c, t] == 1:
+            return model.SOC[c, t] <= model.SOC_max
+        else:
+            return pyo.Constraint.Skip
+
+    # Add the constraints to the model
+    model.soc_during_charging_constraint = pyo.Constraint(model.C, model.T, rule=soc_during_charging_rule)
+    model.enforce_maximum_soc_constraint = pyo.Constraint(model.C, model.T, rule=compacted(enforce_maximum_soc_rule))
+
+    # ======================================================
+    # Car SOC Constraint 7.2.5: Final SOC at End of the Week
+    # ======================================================
+
+    def final_soc_rule(model, c):
+        # At the last time interval, ensure the car reaches 100% SOC if it is at home
+        if final_soc and model.car_location[c, model.T.last()] == 1:
+            return model.SOC[c, model.T.last()] >= model.SOC_Target[c]
+        else:
+            return pyo.Constraint.Skip
+
+    # Add the constraint to the model
+    model.final_soc_constraint = pyo.Constraint(model.C, rule=compacted(final_soc_rule))
+
+    # ===============================================
+    # Section 7.3: Upper Connection Limit Constraint
+    # ===============================================
+
+    def upper_power_limit_rule(model, t):
+        return model.P_building[t] <= model.Upper_Power_Limit[t]
+
+    model.power_limit_upper = pyo.Constraint(model.T, rule=upper_power_limit_rule)
+
+    # ==============================================
+    # Section 7.4: Lower Connection Limit Constraint
+    # ==============================================
+
+    def lower_power_limit_rule(model, t):
+        return model.Lower_Power_Limit[t] <= model.P_building[t]
+
+    model.power_limit_lower = pyo.Constraint(model.T, rule=lower_power_limit_rule)
+
+    # ================================================
+    # Section 7.5: Flexible Load Shifting Constraints
+    # ================================================
+
+    # ================================================================
+    # Flexible Load 7.5.1: Restrict P_shift to Available Flexible Load
+    # ================================================================
+    # Constraint: Ensure P_shift[t] is between 0 and max_shift_share of P_flexible[t]
+
+    # Lower bound: P_shift[t] must be at least 0 kW (shifting is optional)
+    def flexible_load_limit_lower_rule(model, t):
+        return model.P_shift[t] >= 0  # Allows no shifting when it's not needed
+
+    model.flexible_load_limit_lower = pyo.Constraint(model.T, rule=compacted(flexible_load_limit_lower_rule))
+
+    # Upper bound: P_shift[t] cannot exceed max_shift_share of P_flexible[t]
+    def flexible_load_limit_upper_rule(model, t):
+        if t in zero_flex:
+            return pyo.Constraint.Skip
+        return model.P_shift[t] <= model.P_flexible[t] * model.Max_Shifting_Capability[t]
+
+    model.flexible_load_limit_upper = pyo.Constraint(model.T, rule=compacted(flexible_load_limit_upper_rule))
+
+    # =========================================================
+    # Flexible Load 7.5.2: Assign Binary Variables for Shifting
+    # =========================================================
+
+    # This ensures that each P_shift[t] is assigned to exactly one target interval.
+    # Constraint to ensure that P_shift[t] is assigned to exactly one time interval
+    def shift_assignment_rule(model, t):
+        if t in zero_flex:
+            return pyo.Constraint.Skip
+        return sum(model.y_shift[t, delta] for delta in model.TD_out[t]) == 1
+
+    # The transport formulation splits P_shift[t] over any number of target intervals
+    if formulation != 'transport':
+        model.shift_assignment = pyo.Constraint(model.T, rule=shift_assignment_rule)
+
+    # ================================================================
+    # Flexible Load 7.5.3: Enforce Load Balance at the Target Interval
+    # ================================================================
+
+    # This ensures that no time interval gets overloaded beyond Receiving_Factor of its original flexible load.
+    # Constraint to limit the final flexible load after shifting
+    def shifted_load_limit_rule(model, t, delta):
+        if shift_fixed(t, delta):
+            return pyo.Constraint.Skip
+        return model.P_flexible[t + delta] + moved_shift(model, t, delta) <= model.Receiving_Factor * model.P_flexible[t + delta]
+
+    # With P_shift_to (MILP/transport) this only bounds P_shift_to[t, delta]
+    def shifted_load_bound_rule(model, t, delta):
+        if shift_fixed(t, delta):
+            return pyo.Constraint.Skip
+        return moved_shift(model, t, delta) <= (model.Receiving_Factor - 1) * model.P_flexible[t + delta]
+
+    if compact and formulation in ('milp', 'transport'):
+        model.shifted_load_limit = pyo.Constraint(model.TD, rule=compacted(shifted_load_bound_rule))
+    else:
+        model.shifted_load_limit = pyo.Constraint(model.TD, rule=shifted_load_limit_rule)
+
+    # ===========================================
+    # Flexible Load 7.5.4: Enforce Load Shifting
+    # ===========================================
+
+    # This ensures that P_shift[t] moves to exactly one location and does not disappear.
+    # (Transport formulation: the flows leaving interval t add up to P_shift[t].)
+    # Constraint to ensure the shifted load is assigned properly
+    def enforce_shift_rule(model, t):
+        if t in zero_flex:
+            return pyo.Constraint.Skip
+        return model.P_shift[t] == sum(moved_shift(model, t, delta) for delta in model.TD_out[t])
+
+    model.enforce_shift = pyo.Constraint(model.T, rule=enforce_shift_rule)
+
+    # MILP formulation: P_shift_to[t, delta] can only be nonzero for the chosen target interval.
+    # The big-M is the upper bound of P_shift[t], so the link is exact.
+    if formulation == 'milp':
+        def link_shift_to_rule(model, t, delta):
+            if shift_fixed(t, delta):
+                return pyo.Constraint.Skip
+            return model.P_shift_to[t, delta] <= model.P_flexible[t] * model.Max_Shifting_Capability[t] * model.y_shift[t, delta]
+
+        model.link_shift_to = pyo.Constraint(model.TD, rule=link_shift_to_rule)
+
+    # The transport formulation has no binary shift decisions, so it is complete here
+    if formulation == 'transport':
+        if compact:
+            model.compaction_report = compaction_report
+        end_phase(build_phases, 'constraints')
+        model.build_phases = build_phases['phases']
+        return model
+
+    # Delta_P_shift and z_shift only describe the solution, without them the shift interval
+    # is derived from y_shift after the solve
+    if reporting:
+        # ==========================================================================
+        # Flexible Load 7.5.5: Add a Constraint to Link z_shift[t] to P_shift[t]
+        # ==========================================================================
+
+        # The big-M of each interval is the upper bound of P_shift[t] from the flexible load data
+        def link_z_shift_rule(model, t):
+            if t in zero_flex:
+                return pyo.Constraint.Skip
+            return model.P_shift[t] <= model.z_shift[t] * model.P_flexible[t] * model.Max_Shifting_Capability[t]
+
+        model.link_z_shift = pyo.Constraint(model.T, rule=link_z_shift_rule)
+
+        # =======================================================================
+        # Flexible Load 7.5.6: Define Delta_P_shift[t] based on y_shift[t, delta]
+        # =======================================================================
+
+        # This ensures that Delta_P_shift represents the actual shift interval.
+        # Ensure that Delta_P_shift[t] is 0 when no load is shifted.
+        if formulation == 'milp':
+            # Delta_P_shift[t] = sum(delta * y_shift[t, delta]) * z_shift[t], linearized with big-M = 2 * shift_window
+            def chosen_delta(model, t):
+                return sum(delta * model.y_shift[t, delta] for delta in model.TD_out[t])
+
+            def delta_p_shift_upper_rule(model, t):
+                if t in zero_flex:
+                    return pyo.Constraint.Skip
+                return model.Delta_P_shift[t] - chosen_delta(model, t) <= 2 * shift_window * (1 - model.z_shift[t])
+
+            def delta_p_shift_lower_rule(model, t):
+                if t in zero_flex:
+                    return pyo.Constraint.Skip
+                return model.Delta_P_shift[t] - chosen_delta(model, t) >= -2 * shift_window * (1 - model.z_shift[t])
+
+            def delta_p_shift_zero_upper_rule(model, t):
+                if t in zero_flex:
+                    return pyo.Constraint.Skip
+                return model.Delta_P_shift[t] <= shift_window * model.z_shift[t]
+
+            def delta_p_shift_zero_lower_rule(model, t):
+                if t in zero_flex:
+                    return pyo.Constraint.Skip
+                return model.Delta_P_shift[t] >= -shift_window * model.z_shift[t]
+
+            model.delta_p_shift_upper = pyo.Constraint(model.T, rule=delta_p_shift_upper_rule)
+            model.delta_p_shift_lower = pyo.Constraint(model.T, rule=delta_p_shift_lower_rule)
+            model.delta_p_shift_zero_upper = pyo.Constraint(model.T, rule=delta_p_shift_zero_upper_rule)
+            model.delta_p_shift_zero_lower = pyo.Constraint(model.T, rule=delta_p_shift_zero_lower_rule)
+        else:
+            def delta_p_shift_definition_rule(model, t):
+                if t in zero_flex:
+                    return pyo.Constraint.Skip
+                return model.Delta_P_shift[t] == sum(delta * model.y_shift[t, delta] for delta in model.TD_out[t]) * model.z_shift[t]
+
+            model.delta_p_shift_definition = pyo.Constraint(model.T, rule=delta_p_shift_definition_rule)
+
+    # ============================================================================
+    # Flexible Load 7.5.7: Prevent y_shift[t, 0] from being 1 when P_shift[t] > 0
+    # ============================================================================
+
+    # If P_shift[t] > 0, at least one nonzero shift interval must be chosen.
+    # Linear big-M form with the upper bound of P_shift[t]: y_shift[t, 0] = 1 forces P_shift[t] = 0
+    def prevent_zero_shift_rule(model, t):
+        if t in zero_flex:
+            return pyo.Constraint.Skip
+        return model.P_shift[t] <= model.P_flexible[t] * model.Max_Shifting_Capability[t] * (1 - model.y_shift[t, 0])
+
+    model.prevent_zero_shift = pyo.Constraint(model.T, rule=prevent_zero_shift_rule)
+
+    if compact:
+        model.compaction_report = compaction_report
+
+    end_phase(build_phases, 'constraints')
+    model.build_phases = build_phases['phases']
+    return model
@@ -0,0 +1,120 @@
+# ====================================================================
+# Result Plots of One Scenario (Figures of the Thesis Scripts)
+# ====================================================================
+# The plots of Section 9 of Comfficientshare_v9_Summer.py and
+# Comfficientshare_v10_Winter.py for a results table in the format of
+# extract_results, with the same file names, labels and colours, so the
+# figures of a sweep scenario can be compared with the thesis figures.
+
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+
+# Legend position of the power profiles and tick step (hours) of the shift histogram per season
+SEASON_STYLE = {
+    'SUMMER': {'profiles_legend': 'upper right', 'histogram_tick_step': 2},
+    'WINTER': {'profiles_legend': 'upper left', 'histogram_tick_step': 1},
+}
+
+
+# Scenario label of the plot titles, e.g. "20% Shift, 6H Limit"
+def scenario_label(max_shift_share, horizon_hours):
+    return f"{round(max_shift_share * 100)}% Shift, {horizon_hours}H Limit"
+
+
+# Time series plot with one or more lines and filled areas
+#   lines, areas - (column, label, style) of the lines and of the filled areas
+def _time_series_plot(results_df, file_path, title, xlabel, ylabel, lines=(), areas=(), legend_loc=None,
+                      bbox_inches=None):
+    plt.figure(figsize=(14, 8))
+    for column, label, style in lines:
+        plt.plot(results_df['Timeseries'], results_df[column], label=label, **style)
+    for column, label, style in areas:
+        plt.fill_between(results_df['Timeseries'], results_df[column], label=label, **style)
+    plt.xlabel(xlabel, fontsize=14)
+    plt.ylabel(ylabel, fontsize=14)
+    plt.title(title, fontsize=16)
+    plt.legend(fontsize=12, loc=legend_loc)
+    plt.grid(linestyle='--', linewidth=0.7, alpha=0.5)
+    plt.savefig(file_path, dpi=300, bbox_inches=bbox_inches)
+    plt.close()
+
+
+# Write the plots of the thesis scripts for one scenario into folder
+#   results_df - results table (extract_results), car_ids - cars of the scenario
+#   season     - 'SUMMER' or 'WINTER' (axis labels and layout), label - scenario_label()
+# Returns the paths of the written plots
+def write_result_plots(results_df, folder, car_ids, season, label):
+    style = SEASON_STYLE[season]
+    xlabel = f"{season.capitalize()} Week Time"
+    suffix = label.replace('%', 'P').replace(', ', '_')
+    paths = []
+
+    def path(name):
+        paths.append(os.path.join(folder, f"{name}_{suffix}.png"))
+        return paths[-1]
+
+    # 1. Total power demand with PV, 2. without PV (the line of the total plus the filled area)
+    _time_series_plot(results_df, path('Total_Power_Demand_with_PV'), f'Total Power Demand with PV System ({label})',
+                      xlabel, 'Power (kW)',
+                      lines=[('P_total', 'Total Power Demand (With PV)', {'color': 'mediumblue', 'lw': 2.5})],
+                      areas=[('P_total', None, {'color': 'mediumblue', 'alpha': 1.0})])
+    _time_series_plot(results_df, path('Total_Power_Demand_without_PV'),
+                      f'Total Power Demand without PV System ({label})', xlabel, 'Power (kW)',
+                      lines=[('P_total_noPV', 'Total Power Demand (Without PV)', {'color': 'darkred', 'lw': 2.5})],
+                      areas=[('P_total_noPV', None, {'color': 'darkred', 'alpha': 1.0})])
+
+    # 3. SOC of each car
+    for car in car_ids:
+        _time_series_plot(results_df, path(f'SOC_Car_{car}'), f'SOC Evolution for Car {car} ({label})',
+                          xlabel, 'State of Charge (%)',
+                          lines=[(f'SOC_{car}', f'SOC of Car {car}', {'color': 'forestgreen', 'lw': 2.5})])
+
+    # 4. Fixed load, flexible load after shifting, PV and total car charging
+    _time_series_plot(results_df, path('Power_Profiles'), f'Power Profiles Over Time ({label})', xlabel, 'Power (kW)',
+                      lines=[('P_fixed', 'Fixed Load (kW)', {'color': 'saddlebrown', 'lw': 1.5}),
+                             ('P_flexible_post_shift', 'Flexible Load After Shifting (kW)', {'color': 'blue', 'lw': 1.5})],
+                      areas=[('P_pv', 'PV Generation (kW)', {'color': 'goldenrod', 'alpha': 0.7}),
+                             ('P_cars_total', 'Car Charging Total (kW)', {'color': 'darkgreen', 'alpha': 1.0})],
+                      legend_loc=style['profiles_legend'], bbox_inches='tight')
+
+    # 5. Charging power of each car, 6. total charging power of the cars
+    for car in car_ids:
+        _time_series_plot(results_df, path(f'Charging_Power_Car_{car}'), f'Charging Power Profile for Car {car} ({label})',
+                          xlabel, 'Power (kW)',
+                          lines=[(f'P_car_charge_{car}', f'Charging Power of Car {car} (kW)', {'color': 'dodgerblue', 'lw': 2.5})])
+    _time_series_plot(results_df, path(f'{len(car_ids)}_Cars_Charging_Power'),
+                      f'Total Car Charging Power ({len(car_ids)} Cars) ({label})', xlabel, 'Power (kW)',
+                      lines=[('P_cars_total', 'Car Charging Total (kW)', {'color': 'royalblue', 'lw': 2.5})])
+
+    # 7. Shifted flexible load, 8. flexible load before and after shifting
+    _time_series_plot(results_df, path('Flexible_Load_Shifting_Plot'), f'Flexible Load Shifting Over Time ({label})',
+                      xlabel, 'Power (kW)',
+                      lines=[('P_shift', 'Shifted Flexible Load (kW)', {'color': 'olivedrab', 'lw': 2.5})])
+    _time_series_plot(results_df, path('Flexible_Load_Comparison'),
+                      f'Comparison of Flexible Load Before and After Shifting ({label})', xlabel, 'Flexible Load (kW)',
+                      lines=[('P_flexible', 'P_flexible Before Shifting', {'color': 'deepskyblue', 'linestyle': 'dashed', 'lw': 2.5}),
+                             ('P_flexible_post_shift', 'P_flexible After Shifting', {'color': 'blue', 'lw': 2.5})])
+
+    # 9. Histogram of the shifted load over the shift time (hours)
+    delta_p_shift_values = results_df['Delta_P_shift'].dropna().astype(int) / 4
+    p_shift_values = results_df['P_shift'].dropna().astype(float)
+    if len(delta_p_shift_values) != len(p_shift_values):
+        raise ValueError("Mismatch: Delta_P_shift and P_shift must have the same length!")
+    bin_min, bin_max = delta_p_shift_values.min(), delta_p_shift_values.max()
+    bins = np.arange(bin_min - 0.5, bin_max + 1, 1)
+    hist, bin_edges = np.histogram(delta_p_shift_values, bins=bins, weights=p_shift_values)
+    plt.figure(figsize=(14, 8))
+    plt.bar(bin_edges[:-1], hist, width=1, align='edge', color='olivedrab', edgecolor='black', linewidth=1.5)
+    plt.xticks(np.arange(bin_min, bin_max + 1, style['histogram_tick_step']))
+    plt.xlabel('Shifted Time (Hours)', fontsize=14)
+    plt.ylabel('Total Shifted Load (kW)', fontsize=14)
+    plt.title(f'Histogram of Flexible Load Shifting ({label})', fontsize=16)
+    plt.grid(axis='y', linestyle='--', linewidth=0.7, alpha=0.5)
+    plt.legend(['Total Shifted Load'], fontsize=12)
+    plt.savefig(path('Flexible_Load_Shifting_Histogram'), dpi=300)
+    plt.close()
+
+    return paths
@@ -0,0 +1,110 @@
+# ====================================================================
+# Per-Phase Timing and Memory Run Manifest
+# ====================================================================
+# A run is a sequence of phases (Excel load, model build, solve, LP
+# export, result extraction, Excel write, plots, ...). end_phase() closes
+# the phase that started at the previous call (or at the start of the
+# run) and records its wall time, CPU time, resident memory (current,
+# change and process peak) and, if tracemalloc is tracing, the change
+# and the peak of the Python allocations. The phases are written as a
+# JSON run manifest next to the results workbook.
+
+import datetime
+import json
+import os
+import resource
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+# Current resident memory of the process (MB), None where /proc is not available
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+
+# Peak resident memory of the process so far (ru_maxrss is in kB on Linux)
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Timers and memory at a phase boundary; the traced peak is the peak since the previous
+# boundary (of any manifest, inner phases included)
+def _mark():
+    mark = {'wall': time.perf_counter(), 'cpu': time.process_time(), 'rss': current_rss_mb(),
+            'python': None, 'python_peak': None}
+    if tracemalloc.is_tracing():
+        mark['python'], mark['python_peak'] = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+    return mark
+
+
+# Start the manifest of a run; the first phase starts now
+#   trace_memory - trace the Python allocations with tracemalloc (slows down allocation-heavy
+#                  phases such as the model build, off by default)
+#   **metadata   - scenario settings and other run information stored in the manifest
+def start_run_manifest(run_name=None, trace_memory=False, **metadata):
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return {
+        'run': run_name,
+        'started': datetime.datetime.now().isoformat(timespec='seconds'),
+        'metadata': metadata,
+        'phases': [],
+        '_mark': _mark(),
+    }
+
+
+# Close the current phase under name and start the next one
+#   phases - phases recorded inside this one (e.g. model.build_phases of build_model)
+# Returns the phase record
+def end_phase(manifest, name, phases=None):
+    start, end = manifest['_mark'], _mark()
+    phase = {
+        'phase': name,
+        'wall_time': end['wall'] - start['wall'],
+        'cpu_time': end['cpu'] - start['cpu'],
+        'rss_MB': end['rss'],
+        'rss_delta_MB': end['rss'] - start['rss'] if end['rss'] is not None and start['rss'] is not None else None,
+        'peak_rss_MB': peak_rss_mb(),
+    }
+    if end['python'] is not None and start['python'] is not None:
+        phase['python_delta_MB'] = (end['python'] - start['python']) / 2**20
+        phase['python_peak_MB'] = max([end['python_peak'] / 2**20]
+                                      + [inner.get('python_peak_MB', 0) for inner in phases or []])
+    if phases:
+        phase['phases'] = phases
+    manifest['phases'].append(phase)
+    manifest['_mark'] = end
+    return phase
+
+
+# Write the manifest as JSON with the totals of the run
+def write_run_manifest(manifest, file_path):
+    record = {key: value for key, value in manifest.items() if key != '_mark'}
+    record.update({
+        'finished': datetime.datetime.now().isoformat(timespec='seconds'),
+        'total_wall_time': sum(phase['wall_time'] for phase in manifest['phases']),
+        'total_cpu_time': sum(phase['cpu_time'] for phase in manifest['phases']),
+        'peak_rss_MB': peak_rss_mb(),
+    })
+    with open(file_path, 'w') as manifest_file:
+        json.dump(record, manifest_file, indent=2, default=str)
+
+
+# Table of the phases (inner phases as 'phase/inner') with their share of the wall time
+def run_summary(manifest):
+    rows = []
+    for phase in manifest['phases']:
+        rows.append({key: value for key, value in phase.items() if key != 'phases'})
+        for inner in phase.get('phases', []):
+            rows.append(dict(inner, phase=f"{phase['phase']}/{inner['phase']}"))
+    summary = pd.DataFrame(rows)
+    total = sum(phase['wall_time'] for phase in manifest['phases'])
+    summary['wall_share'] = summary['wall_time'] / total if total > 0 else 0.0
+    return summary
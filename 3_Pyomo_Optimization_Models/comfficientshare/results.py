@@ -0,0 +1,55 @@
+# ==========================================
+# Result Extraction from the Solved Model
+# ==========================================
+
+# Shifted load below this value (kW) counts as no shift when deriving the shift interval
+SHIFT_TOLERANCE = 1e-6
+
+
+# Shift interval of P_shift[t]; the transport formulation may split P_shift[t] over
+# several targets, so the target receiving the largest part of it is reported
+def delta_p_shift_value(model, t):
+    if hasattr(model, 'Delta_P_shift'):
+        return model.Delta_P_shift[t]()
+    # Exact formulation solved without reporting variables: the chosen y_shift[t, delta]
+    if hasattr(model, 'y_shift'):
+        if model.P_shift[t].value is None or model.P_shift[t].value <= SHIFT_TOLERANCE:
+            return 0
+        return max(model.TD_out[t], key=lambda delta: model.y_shift[t, delta].value)
+    flows = {delta: model.P_shift_to[t, delta].value for delta in model.TD_out[t]}
+    delta, flow = max(flows.items(), key=lambda item: item[1])
+    return delta if flow > 0 else 0
+
+
+# Collect the time series results of the solved model in a dictionary
+def extract_results(model, input_data):
+    P_fixed = input_data['P_fixed']
+    P_flexible = input_data['P_flexible']
+    P_pv = input_data['P_pv']
+
+    # Evaluate the shared model expressions once per time step
+    received = [model.P_shift_received[t]() for t in model.T]
+    building_load = [model.P_building[t]() for t in model.T]
+
+    # Initialize dictionaries to store results
+    results_dict = {
+        'Timeseries': input_data['timeseries'],
+        'P_fixed': [P_fixed[t] for t in model.T],
+        'P_flexible': [P_flexible[t] for t in model.T],
+        'P_shift': [model.P_shift[t]() for t in model.T],
+        'Delta_P_shift': [delta_p_shift_value(model, t) for t in model.T],
+        'P_flexible_post_shift': [P_flexible[t] - model.P_shift[t]() + received[t] for t in model.T],
+        'P_pv': [P_pv[t] for t in model.T],
+        'P_total': [building_load[t] - P_pv[t] for t in model.T],
+        'P_total_noPV': building_load
+    }
+
+    # Add SOC results and individual car charging power to the results_dict
+    for car in model.C:
+        results_dict[f'SOC_{car}'] = [model.SOC[car, t]() for t in model.T]
+        results_dict[f'P_car_charge_{car}'] = [model.P_car_charge[car, t]() for t in model.T]
+
+    # Add collective car charging power over all cars
+    results_dict['P_cars_total'] = [sum(model.P_car_charge[c, t]() for c in model.C) for t in model.T]
+
+    return results_dict
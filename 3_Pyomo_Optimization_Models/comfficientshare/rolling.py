@@ -0,0 +1,137 @@
+# ====================================================================
+# Rolling-Horizon (Receding-Horizon MPC) Solve Mode
+# ====================================================================
+# The horizon is solved in overlapping windows (e.g. optimize 48 h,
+# commit 24 h). Each window commits the car schedule and the shifts
+# leaving its first commit_hours; the next window starts at the end of
+# the committed part with the SOC and charging power of that interval
+# carried over and the shifted load already committed to its intervals
+# added as pending received load.
+
+import time
+
+import numpy as np
+import pyomo.environ as pyo
+
+from .data import INTERVALS_PER_HOUR
+from .model import STATIC_PARAMETERS, build_model
+from .results import delta_p_shift_value
+
+
+# Input data of the intervals start..stop-1 (same keys as load_input_data)
+def slice_input_data(input_data, start, stop):
+    window = dict(input_data)
+    for key in ('P_fixed', 'P_flexible', 'P_pv', 'C_t'):
+        window[key] = input_data[key][start:stop]
+    for key in ('car_location', 'car_trip_distance'):
+        window[key] = input_data[key][:, start:stop]
+    window['timeseries'] = input_data['timeseries'][start:stop].reset_index(drop=True)
+    return window
+
+
+# Shifted load moved from interval t to t+delta in a solved window model
+def _moved_shift_value(model, t, delta):
+    if hasattr(model, 'P_shift_to'):
+        return model.P_shift_to[t, delta].value or 0.0
+    return (model.P_shift[t].value or 0.0) * round(model.y_shift[t, delta].value or 0.0)
+
+
+# Solve the horizon of input_data in rolling windows and stitch the committed schedules
+#   solver          - Pyomo solver (e.g. SolverFactory('gurobi')) used for every window
+#   optimize_hours  - length of each window, commit_hours - part of each window that is kept
+#   **settings      - build_model() settings (max_shift_share, shift_window, formulation, ...)
+# Returns the stitched results (same keys as extract_results) and one timing row per window
+def solve_rolling_horizon(solver, input_data, optimize_hours=48, commit_hours=24, **settings):
+    optimize_steps = optimize_hours * INTERVALS_PER_HOUR
+    commit_steps = commit_hours * INTERVALS_PER_HOUR
+    if not 0 < commit_steps < optimize_steps:
+        raise ValueError("The committed part of a window must be shorter than the window")
+
+    car_ids = input_data['car_ids']
+    n_C, n_T = np.shape(input_data['car_location'])
+    P_car_charge = np.zeros((n_C, n_T))
+    SOC = np.zeros((n_C, n_T))
+    P_shift = np.zeros(n_T)
+    Delta_P_shift = np.zeros(n_T, dtype=int)
+    received = np.zeros(n_T)
+
+    windows = []
+    start = 0
+    while start < n_T:
+        stop = min(start + optimize_steps, n_T)
+        commit_stop = stop if stop == n_T else start + commit_steps
+
+        # Initial conditions carried over from the committed part of the previous window
+        # (the SOC of a car on a trip is not defined by the model, the target SOC is used instead)
+        carried = {}
+        if start > 0:
+            initial_soc = np.where(np.isnan(SOC[:, start]), settings.get('target_soc', 100), SOC[:, start])
+            carried = {
+                'initial_soc': dict(zip(car_ids, np.clip(initial_soc, STATIC_PARAMETERS['SOC_min'], STATIC_PARAMETERS['SOC_max']))),
+                'initial_charge': dict(zip(car_ids, np.clip(np.nan_to_num(P_car_charge[:, start]), 0, STATIC_PARAMETERS['P_car_max']))),
+                'pending_received': received[start:stop].copy(),
+            }
+
+        build_start = time.perf_counter()
+        # Only the last window requires the target SOC at its end
+        model = build_model(slice_input_data(input_data, start, stop), final_soc=stop == n_T, **settings, **carried)
+        build_time = time.perf_counter() - build_start
+        solve_start = time.perf_counter()
+        results = solver.solve(model)
+        solve_time = time.perf_counter() - solve_start
+        if results.solver.termination_condition != pyo.TerminationCondition.optimal:
+            raise RuntimeError(f"Window {len(windows)} (intervals {start}-{stop - 1}) was not solved to optimality: "
+                               f"{results.solver.termination_condition}")
+
+        # Commit the car schedule (including the SOC and charging power at commit_stop, which
+        # are the initial conditions of the next window) and the shifts leaving the committed intervals
+        keep = min(commit_stop + 1, stop) - start
+        for i, car in enumerate(car_ids):
+            P_car_charge[i, start:start + keep] = [model.P_car_charge[car, t].value or 0.0 for t in range(keep)]
+            SOC[i, start:start + keep] = [np.nan if model.SOC[car, t].value is None else model.SOC[car, t].value
+                                          for t in range(keep)]
+        for t in range(commit_stop - start):
+            P_shift[start + t] = model.P_shift[t].value
+            Delta_P_shift[start + t] = delta_p_shift_value(model, t)
+            for delta in model.TD_out[t]:
+                received[start + t + delta] += _moved_shift_value(model, t, delta)
+
+        windows.append({
+            'window': len(windows),
+            'start': start,
+            'stop': stop,
+            'commit_stop': commit_stop,
+            'variables': model.nvariables(),
+            'constraints': model.nconstraints(),
+            'build_time': build_time,
+            'solve_time': solve_time,
+            'window_cost': pyo.value(model.objective),
+        })
+        print(f"Window {len(windows) - 1}: intervals {start}-{stop - 1}, committed up to {commit_stop - 1}, "
+              f"built in {build_time:.2f} s, solved in {solve_time:.2f} s")
+        start = commit_stop
+
+    # Stitched schedule in the result format of extract_results
+    P_fixed = np.asarray(input_data['P_fixed'], dtype=float)
+    P_flexible = np.asarray(input_data['P_flexible'], dtype=float)
+    P_pv = np.asarray(input_data['P_pv'], dtype=float)
+    P_cars_total = P_car_charge.sum(axis=0)
+    building_load = P_fixed + P_flexible - P_shift + received + P_cars_total
+
+    results_dict = {
+        'Timeseries': input_data['timeseries'],
+        'P_fixed': P_fixed.tolist(),
+        'P_flexible': P_flexible.tolist(),
+        'P_shift': P_shift.tolist(),
+        'Delta_P_shift': Delta_P_shift.tolist(),
+        'P_flexible_post_shift': (P_flexible - P_shift + received).tolist(),
+        'P_pv': P_pv.tolist(),
+        'P_total': (building_load - P_pv).tolist(),
+        'P_total_noPV': building_load.tolist(),
+    }
+    for i, car in enumerate(car_ids):
+        results_dict[f'SOC_{car}'] = SOC[i].tolist()
+        results_dict[f'P_car_charge_{car}'] = P_car_charge[i].tolist()
+    results_dict['P_cars_total'] = P_cars_total.tolist()
+
+    return results_dict, windows
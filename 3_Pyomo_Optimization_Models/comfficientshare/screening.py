@@ -0,0 +1,32 @@
+# ==================================================================
+# Transport LP Screening Model (Divisible Flexible Load Shifting)
+# ==================================================================
+
+import time
+
+import pyomo.environ as pyo
+
+from .model import build_model
+
+
+# Build and solve the transport LP of a scenario
+# Returns the LP cost (€), the solve time (s) and the solved model
+def solve_transport_lp(solver, input_data, **settings):
+    model = build_model(input_data, formulation='transport', **settings)
+
+    start = time.perf_counter()
+    results = solver.solve(model)
+    solve_time = time.perf_counter() - start
+
+    if results.solver.termination_condition != pyo.TerminationCondition.optimal:
+        raise RuntimeError(f"Transport LP could not be solved to optimality: {results.solver.termination_condition}")
+
+    return pyo.value(model.objective), solve_time, model
+
+
+# Relaxation gap between the exact (MIQCP/MILP) cost and the transport LP cost
+# The LP cost is a lower bound, so the gap is non-negative up to the solver tolerance
+def relaxation_gap(exact_cost, lp_cost):
+    absolute_gap = exact_cost - lp_cost
+    relative_gap = absolute_gap / abs(exact_cost) if exact_cost != 0 else float('nan')
+    return absolute_gap, relative_gap
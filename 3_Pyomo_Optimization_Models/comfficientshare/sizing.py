@@ -0,0 +1,247 @@
+# ====================================================================
+# Pre-Solve Model Size Estimate and Memory Budget Guard
+# ====================================================================
+# The size of every component of build_model() follows from the inputs:
+# the car schedules (charging, departure and arrival intervals), the
+# intervals without flexible load (fixed shift variables) and the sparse
+# shift pairs (t, delta) of the shift window. estimate_model_size()
+# counts the variables, constraint rows, linear nonzeros and quadratic
+# terms of each component with NumPy, without building the model, and
+# estimates the memory of the built Pyomo model from them. The memory
+# budget guard rejects a scenario whose estimate does not fit, or moves
+# it to a lighter model (no reporting variables, compaction, the next
+# formulation) before the build starts.
+#
+# The counts are the ones of the built model: nvariables() and
+# nconstraints() include fixed variables and rows without free
+# variables, the nonzeros and quadratic terms only count free variables
+# with a nonzero coefficient (as written to the solver). A positive
+# max_shift_share is assumed, and with compaction a consistent input
+# (a conflicting input keeps a few more rows, see compaction.py).
+
+import numpy as np
+import pandas as pd
+
+from .model import FORMULATIONS
+
+
+# Memory of the built Pyomo model (bytes per variable, constraint row, linear nonzero,
+# quadratic term, element of a (car, interval) parameter and shift pair of the sets),
+# fitted to the resident memory of builds of the thesis weeks and of synthetic cases with
+# 1 to 400 cars, 1 to 56 days and ±6H to ±24H windows (within 10% above 20 MB)
+MEMORY_BYTES = {
+    'variable': 120,
+    'constraint': 190,
+    'nonzero': 80,
+    'quadratic': 140,
+    'car_parameter': 245,
+    'shift_pair': 290,
+}
+
+# Memory of the Python process before the build (interpreter, Pyomo, NumPy and pandas, MB)
+BASE_MEMORY_MB = 150
+
+
+# Component row of the size table
+def _component(name, kind, count, fixed=0, domain=None, nonzeros=0, quadratic=0):
+    return {'component': name, 'kind': kind, 'domain': domain, 'count': int(count), 'fixed': int(fixed),
+            'nonzeros': int(nonzeros), 'quadratic': int(quadratic)}
+
+
+# Size of the model build_model(input_data, **settings) would build
+#   shift_window, target_soc, formulation, compact, reporting_variables, initial_charge,
+#   final_soc - the build_model() settings of the scenario; the other settings
+#               (max_shift_share, receiving_factor, mutable, initial_soc, pending_received)
+#               do not change the size
+# Returns the totals and the table of the components (variables, constraints, objective)
+def estimate_model_size(input_data, shift_window=24, target_soc=100, formulation='miqcp', compact=False,
+                        reporting_variables=True, initial_charge=None, final_soc=True, **settings):
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"Unknown formulation '{formulation}', expected one of {FORMULATIONS}")
+    exact = formulation != 'transport'
+    linear = formulation in ('milp', 'transport')
+    reporting = exact and reporting_variables
+
+    location = np.asarray(input_data['car_location']) == 1
+    n_C, n_T = location.shape
+    flexible = np.asarray(input_data['P_flexible'], dtype=float) > 0
+    priced = np.asarray(input_data['C_t'], dtype=float) != 0
+    n_flex = int(flexible.sum())
+
+    # Shift pairs of every origin interval and the free pairs (origin and target with flexible
+    # load); the window is symmetric, so the free pairs arriving at t equal the ones leaving t
+    t = np.arange(n_T)
+    low, high = np.maximum(t - shift_window, 0), np.minimum(t + shift_window, n_T - 1)
+    n_TD = int((high - low + 1).sum())
+    flexible_before = np.concatenate([[0], np.cumsum(flexible)])
+    free_out = np.where(flexible, flexible_before[high + 1] - flexible_before[low], 0)
+    n_free = int(free_out.sum())
+    # Transport: the flow P_shift_to[t, 0] back into the same interval is fixed
+    free_received = free_out - flexible if formulation == 'transport' else free_out
+
+    # Car schedule: departures, arrivals, charging intervals after a charging interval
+    departure = location[:, :-1] & ~location[:, 1:]
+    arrival = ~location[:, :-1] & location[:, 1:]
+    charging = location[:, 1:] & location[:, :-1]
+    initial_rows = n_C if initial_charge is not None or target_soc == 100 else 0
+    final_rows = int(location[:, -1].sum()) if final_soc else 0
+
+    # Compaction fixes the charging power of the cars away from home (and at the first interval),
+    # the SOC at the first interval and at every arrival, and removes the single-variable rows
+    fixed_charge = np.zeros_like(location)
+    fixed_soc = np.zeros_like(location)
+    if compact:
+        fixed_charge = ~location
+        if initial_rows:
+            fixed_charge[:, 0] = True
+        fixed_soc[:, 0] = True
+        fixed_soc[:, 1:] |= arrival
+    free_charge = ~fixed_charge
+
+    def rows(count):
+        return 0 if compact else count
+
+    components = [
+        # Variables
+        _component('P_car_charge', 'variable', n_C * n_T, fixed_charge.sum(), 'continuous'),
+        _component('SOC', 'variable', n_C * n_T, fixed_soc.sum(), 'continuous'),
+        _component('P_shift', 'variable', n_T, n_T - n_flex, 'continuous'),
+    ]
+    if exact:
+        components.append(_component('y_shift', 'variable', n_TD, n_TD - n_free, 'binary'))
+    if reporting:
+        components.append(_component('Delta_P_shift', 'variable', n_T, n_T - n_flex, 'integer'))
+        components.append(_component('z_shift', 'variable', n_T, n_T - n_flex, 'binary'))
+    if linear:
+        components.append(_component('P_shift_to', 'variable', n_TD,
+                                     n_TD - n_free + (n_flex if formulation == 'transport' else 0), 'continuous'))
+
+    # Objective: cost of the building load of every interval with a nonzero price
+    objective_linear = (free_charge & priced).sum() + (flexible & priced).sum()
+    if linear:
+        objective_linear += (free_received * priced).sum()
+    components.append(_component('objective', 'objective', 1, nonzeros=objective_linear,
+                                 quadratic=0 if linear else (free_out * priced).sum()))
+
+    # Constraints
+    n_charging = int(charging.sum())
+    charging_nonzeros = (~fixed_soc[:, 1:] & charging).sum() + (~fixed_soc[:, :-1] & charging).sum() \
+        + (free_charge[:, 1:] & charging).sum()
+    building_nonzeros = n_flex + free_charge.sum() + (free_received.sum() if linear else 0)
+    building_quadratic = 0 if linear else n_free
+    components += [
+        _component('car_charging_power_constraint', 'constraint', rows(n_C * n_T), nonzeros=rows(n_C * n_T)),
+        _component('no_charging_initial_constraint', 'constraint', rows(initial_rows), nonzeros=rows(initial_rows)),
+        _component('initial_soc_constraint', 'constraint', rows(n_C), nonzeros=rows(n_C)),
+        _component('soc_target_constraint', 'constraint', rows(departure.sum()), nonzeros=rows(departure.sum())),
+        _component('soc_arrival_constraint', 'constraint', rows(arrival.sum()), nonzeros=rows(arrival.sum())),
+        _component('enforce_minimum_soc_constraint', 'constraint', rows(arrival.sum()), nonzeros=rows(arrival.sum())),
+        _component('soc_during_charging_constraint', 'constraint', n_charging, nonzeros=charging_nonzeros),
+        _component('enforce_maximum_soc_constraint', 'constraint', rows(location[:, 1:].sum()),
+                   nonzeros=rows(location[:, 1:].sum())),
+        _component('final_soc_constraint', 'constraint', rows(final_rows), nonzeros=rows(final_rows)),
+        _component('power_limit_upper', 'constraint', n_T, nonzeros=building_nonzeros, quadratic=building_quadratic),
+        _component('power_limit_lower', 'constraint', n_T, nonzeros=building_nonzeros, quadratic=building_quadratic),
+        _component('flexible_load_limit_lower', 'constraint', rows(n_T), nonzeros=rows(n_flex)),
+        _component('flexible_load_limit_upper', 'constraint', rows(n_flex), nonzeros=rows(n_flex)),
+    ]
+    if exact:
+        components.append(_component('shift_assignment', 'constraint', n_flex, nonzeros=n_free))
+    if compact and linear:
+        components.append(_component('shifted_load_limit', 'constraint', 0))
+    else:
+        components.append(_component('shifted_load_limit', 'constraint', n_free,
+                                     nonzeros=free_received.sum() if linear else 0,
+                                     quadratic=0 if linear else n_free))
+    components.append(_component('enforce_shift', 'constraint', n_flex, nonzeros=n_flex + (free_received.sum() if linear else 0),
+                                 quadratic=0 if linear else n_free))
+    if formulation == 'milp':
+        components.append(_component('link_shift_to', 'constraint', n_free, nonzeros=2 * n_free))
+    if reporting:
+        components.append(_component('link_z_shift', 'constraint', n_flex, nonzeros=2 * n_flex))
+        # y_shift[t, 0] has a zero coefficient in the chosen shift interval
+        if formulation == 'milp':
+            for name in ('delta_p_shift_upper', 'delta_p_shift_lower'):
+                components.append(_component(name, 'constraint', n_flex, nonzeros=n_flex + n_free))
+            for name in ('delta_p_shift_zero_upper', 'delta_p_shift_zero_lower'):
+                components.append(_component(name, 'constraint', n_flex, nonzeros=2 * n_flex))
+        else:
+            components.append(_component('delta_p_shift_definition', 'constraint', n_flex, nonzeros=n_flex,
+                                         quadratic=n_free - n_flex))
+    if exact:
+        components.append(_component('prevent_zero_shift', 'constraint', n_flex, nonzeros=2 * n_flex))
+
+    table = pd.DataFrame(components)
+    variables = table[table['kind'] == 'variable']
+    constraints = table[table['kind'] == 'constraint']
+    size = {
+        'formulation': formulation,
+        'intervals': n_T,
+        'cars': n_C,
+        'shift_pairs': n_TD,
+        'variables': int(variables['count'].sum()),
+        'free_variables': int((variables['count'] - variables['fixed']).sum()),
+        'binary': int((variables['count'] - variables['fixed'])[variables['domain'] == 'binary'].sum()),
+        'integer': int((variables['count'] - variables['fixed'])[variables['domain'] == 'integer'].sum()),
+        'constraints': int(constraints['count'].sum()),
+        'nonzeros': int(constraints['nonzeros'].sum()),
+        'quadratic': int(constraints['quadratic'].sum()),
+        'components': table,
+    }
+    size['model_memory_MB'] = (MEMORY_BYTES['variable'] * size['variables']
+                               + MEMORY_BYTES['constraint'] * size['constraints']
+                               + MEMORY_BYTES['nonzero'] * size['nonzeros']
+                               + MEMORY_BYTES['quadratic'] * size['quadratic']
+                               + MEMORY_BYTES['car_parameter'] * 2 * n_C * n_T
+                               + MEMORY_BYTES['shift_pair'] * n_TD) / 2**20
+    size['memory_MB'] = BASE_MEMORY_MB + size['model_memory_MB']
+    return size
+
+
+# One-line summary of a size estimate
+def format_model_size(size):
+    return (f"{size['formulation']} model of {size['cars']} cars x {size['intervals']} intervals: "
+            f"{size['variables']} variables ({size['free_variables']} free, {size['binary']} binary, "
+            f"{size['integer']} integer), {size['constraints']} constraints, {size['nonzeros']} nonzeros, "
+            f"{size['quadratic']} quadratic terms, about {size['memory_MB']:.0f} MB")
+
+
+# Lighter variants of the settings, in the order they are tried: without the reporting
+# variables, compacted (unless mutable), then the later formulations of FORMULATIONS
+def _lighter_settings(settings):
+    candidates = []
+    current = dict(settings)
+    if current.get('reporting_variables', True) and current.get('formulation', 'miqcp') != 'transport':
+        current = dict(current, reporting_variables=False)
+        candidates.append(current)
+    if not current.get('compact', False) and not current.get('mutable', False):
+        current = dict(current, compact=True)
+        candidates.append(current)
+    formulation = current.get('formulation', 'miqcp')
+    for lighter in FORMULATIONS[FORMULATIONS.index(formulation) + 1:]:
+        candidates.append(dict(current, formulation=lighter))
+    return candidates
+
+
+# Check the estimated memory of the scenario against memory_budget_mb before the build
+#   on_exceed - 'abort': raise a MemoryError if the estimate exceeds the budget
+#               'switch': use the first lighter settings (see _lighter_settings) that fit the
+#               budget, MemoryError if none does
+# Returns the settings to build (the given ones if they fit or there is no budget) and their size
+def apply_memory_budget(input_data, settings, memory_budget_mb=None, on_exceed='switch'):
+    if on_exceed not in ('abort', 'switch'):
+        raise ValueError(f"Unknown on_exceed '{on_exceed}', expected 'abort' or 'switch'")
+    size = estimate_model_size(input_data, **settings)
+    if memory_budget_mb is None or size['memory_MB'] <= memory_budget_mb:
+        return settings, size
+    message = (f"Estimated memory of the {size['formulation']} model ({size['memory_MB']:.0f} MB) "
+               f"exceeds the memory budget of {memory_budget_mb:.0f} MB")
+    if on_exceed == 'abort':
+        raise MemoryError(message)
+    for lighter in _lighter_settings(settings):
+        lighter_size = estimate_model_size(input_data, **lighter)
+        if lighter_size['memory_MB'] <= memory_budget_mb:
+            changes = ', '.join(f"{key}={lighter[key]!r}" for key in lighter if lighter[key] != settings.get(key))
+            print(f"{message}, building with {changes} ({lighter_size['memory_MB']:.0f} MB)")
+            return lighter, lighter_size
+    raise MemoryError(f"{message}, and none of the lighter models fits")
@@ -0,0 +1,146 @@
+# ====================================================================
+# Solver Layer (Gurobi, HiGHS or CBC Chosen by Configuration)
+# ====================================================================
+# The Pyomo interfaces of the supported backends and the names of their
+# common options. The backend is chosen by name, else by the environment
+# variable COMFFICIENTSHARE_SOLVER, else the first available backend is
+# used, so the models also run without a Gurobi licence. gurobipy is only
+# imported for the IIS of an infeasible model.
+
+import os
+import time
+
+import pyomo.environ as pyo
+
+from .engine import relative_mip_gap
+from .model import FORMULATIONS, build_model
+from .telemetry import solve_with_telemetry
+
+
+# Pyomo solver name, option names and formulations of each backend
+# (the non-convex MIQCP formulation needs Gurobi)
+SOLVER_BACKENDS = {
+    'gurobi': {'pyomo_name': 'gurobi', 'threads': 'Threads', 'time_limit': 'TimeLimit', 'mip_gap': 'MIPGap',
+               'formulations': ('miqcp', 'milp', 'transport')},
+    'highs': {'pyomo_name': 'appsi_highs', 'threads': 'threads', 'time_limit': 'time_limit', 'mip_gap': 'mip_rel_gap',
+              'formulations': ('milp', 'transport')},
+    'cbc': {'pyomo_name': 'cbc', 'threads': 'threads', 'time_limit': 'seconds', 'mip_gap': 'ratioGap',
+            'formulations': ('milp', 'transport')},
+}
+
+# Order in which an unconfigured backend is chosen
+SOLVER_PREFERENCE = ('gurobi', 'highs', 'cbc')
+
+# Environment variable with the backend of the scripts that do not set one
+SOLVER_ENVIRONMENT_VARIABLE = 'COMFFICIENTSHARE_SOLVER'
+
+
+# Backends whose solver is installed
+def available_solvers():
+    return [name for name in SOLVER_PREFERENCE
+            if pyo.SolverFactory(SOLVER_BACKENDS[name]['pyomo_name']).available(exception_flag=False)]
+
+
+# Backend name of the configuration: the given name, the environment variable or the first
+# available backend
+def resolve_solver_name(solver_name=None):
+    solver_name = solver_name or os.environ.get(SOLVER_ENVIRONMENT_VARIABLE)
+    if solver_name is None:
+        available = available_solvers()
+        if not available:
+            raise RuntimeError(f"None of the solver backends {SOLVER_PREFERENCE} is available")
+        return available[0]
+    if solver_name not in SOLVER_BACKENDS:
+        raise ValueError(f"Unknown solver backend '{solver_name}', expected one of {tuple(SOLVER_BACKENDS)}")
+    return solver_name
+
+
+# Pyomo solver of a backend with the common options set
+def get_solver(solver_name=None, threads=None, time_limit=None, mip_gap=None):
+    solver_name = resolve_solver_name(solver_name)
+    backend = SOLVER_BACKENDS[solver_name]
+    solver = pyo.SolverFactory(backend['pyomo_name'])
+    if not solver.available(exception_flag=False):
+        raise RuntimeError(f"Solver backend '{solver_name}' ({backend['pyomo_name']}) is not available")
+    for option, value in (('threads', threads), ('time_limit', time_limit), ('mip_gap', mip_gap)):
+        if value is not None:
+            solver.options[backend[option]] = value
+    return solver
+
+
+# Raise a ValueError if the backend cannot solve the formulation
+def check_formulation(solver_name, formulation):
+    if formulation not in SOLVER_BACKENDS[solver_name]['formulations']:
+        raise ValueError(f"The '{formulation}' formulation cannot be solved with '{solver_name}', "
+                         f"expected one of {SOLVER_BACKENDS[solver_name]['formulations']}")
+
+
+# Solve a built model with a backend; the solution is loaded if the solver found one
+# Returns the termination condition, the objective, the best bound, the relative gap, the
+# solve time and the solver telemetry (solve_with_telemetry)
+def solve_with_backend(model, solver_name=None, tee=False, threads=None, time_limit=None, mip_gap=None):
+    solver = get_solver(solver_name, threads=threads, time_limit=time_limit, mip_gap=mip_gap)
+    start = time.perf_counter()
+    results, telemetry = solve_with_telemetry(solver, model, tee=tee, load_solutions=False)
+    solve_time = time.perf_counter() - start
+
+    objective = best_bound = None
+    if len(results.solution) > 0:
+        model.solutions.load_from(results)
+        objective = pyo.value(model.objective)
+        best_bound = telemetry['best_bound']
+    return {
+        'termination_condition': str(results.solver.termination_condition),
+        'objective': objective,
+        'best_bound': best_bound,
+        'gap': relative_mip_gap(objective, best_bound),
+        'solve_time': solve_time,
+        'telemetry': telemetry,
+    }
+
+
+# Write the IIS of an infeasible model exported as LP file (model.write) with Gurobi
+# (iis.compute_iis computes it on the in-memory solver model without the LP file)
+def write_gurobi_iis(lp_file='model.lp', iis_file='model_iis.ilp'):
+    import gurobipy as gp
+
+    iis_prob = gp.read(lp_file)
+    iis_prob.computeIIS()
+    iis_prob.write(iis_file)
+
+
+# Solve every input with every backend and formulation: one row per run with the build
+# time, the solve time, the objective and the gap. A backend that cannot solve a formulation
+# or fails (e.g. a size-limited licence) is reported in the termination condition
+#   input_files - {label: input workbook} (e.g. the summer and winter instances)
+#   solver_names - backends to compare (None: all available backends)
+#   **settings  - build_model() settings (max_shift_share, shift_window, ...)
+def benchmark_backends(input_files, solver_names=None, formulations=FORMULATIONS, time_limit=None, **settings):
+    from .data import load_input_data
+
+    solver_names = available_solvers() if solver_names is None else solver_names
+    rows = []
+    for label, file_path in input_files.items():
+        input_data = load_input_data(file_path)
+        for formulation in formulations:
+            for solver_name in solver_names:
+                row = {'instance': label, 'solver': solver_name, 'formulation': formulation, 'build_time': None,
+                       'solve_time': None, 'termination_condition': None, 'objective': None, 'gap': None,
+                       'nodes': None, 'peak_memory_MB': None}
+                rows.append(row)
+                if formulation not in SOLVER_BACKENDS[solver_name]['formulations']:
+                    row['termination_condition'] = 'formulation not supported'
+                    continue
+                start = time.perf_counter()
+                model = build_model(input_data, formulation=formulation, **settings)
+                row['build_time'] = time.perf_counter() - start
+                try:
+                    summary = solve_with_backend(model, solver_name, time_limit=time_limit)
+                except Exception as error:
+                    row['termination_condition'] = f"error: {str(error).splitlines()[0]}"
+                    continue
+                row.update({key: summary[key] for key in ('solve_time', 'termination_condition', 'objective', 'gap')})
+                row.update({key: summary['telemetry'][key] for key in ('nodes', 'peak_memory_MB')})
+                print(f"{label} / {formulation} / {solver_name}: {row['termination_condition']}, "
+                      f"objective {row['objective']}, solved in {row['solve_time']:.2f} s")
+    return rows
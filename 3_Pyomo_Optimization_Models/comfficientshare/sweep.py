@@ -0,0 +1,158 @@
+# ====================================================================
+# Parallel Scenario Sweep (Season x Shift Share x Horizon Grid)
+# ====================================================================
+# Every scenario is an independent model, so the grid is solved in a
+# process pool and the solver threads of the machine are split between
+# the workers.
+
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .cache import load_cached_solution, solve_cache_key, solve_kpis, store_solution
+from .data import INTERVALS_PER_HOUR, load_input_data
+from .model import build_model
+from .plots import scenario_label, write_result_plots
+from .results import extract_results
+from .solvers import SOLVER_BACKENDS, check_formulation, get_solver, resolve_solver_name
+from .telemetry import solve_with_telemetry, write_telemetry
+
+
+# Input workbooks of the seasons, relative to 3_Pyomo_Optimization_Models
+SEASON_FILES = {
+    'SUMMER': os.path.join('Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx'),
+    'WINTER': os.path.join('Pyomo_Optimization_Model_Winter', 'Comfficientshare_v10_Winter.xlsx'),
+}
+
+# Scenarios of the grid seasons x shift shares x horizons (hours) x receiving factors
+# Without receiving factors the receiving limit follows the shift share (20% -> 1.2)
+def scenario_grid(seasons, shift_shares, horizons, receiving_factors=None):
+    scenarios = []
+    for season in seasons:
+        for share in shift_shares:
+            for hours in horizons:
+                for factor in (receiving_factors or [None]):
+                    scenarios.append({
+                        'season': season,
+                        'max_shift_share': share,
+                        'horizon_hours': hours,
+                        'receiving_factor': 1 + share if factor is None else factor,
+                    })
+    return scenarios
+
+
+# The 14 scenarios of the thesis: 20/30/40/50% shift with a 6H horizon and
+# 50% shift with a 12/18/24H horizon, in summer and winter
+THESIS_SCENARIOS = [
+    scenario
+    for season in SEASON_FILES
+    for scenario in (scenario_grid([season], [0.20, 0.30, 0.40, 0.50], [6])
+                     + scenario_grid([season], [0.50], [12, 18, 24]))
+]
+
+
+# Results folder name of a scenario, e.g. OptimizationResults_SUMMER_20PShift_6HLimit
+def scenario_name(scenario):
+    name = f"OptimizationResults_{scenario['season']}_{round(scenario['max_shift_share'] * 100)}PShift_{scenario['horizon_hours']}HLimit"
+    if abs(scenario['receiving_factor'] - (1 + scenario['max_shift_share'])) > 1e-9:
+        name += f"_{round(scenario['receiving_factor'] * 100)}PReceive"
+    return name
+
+
+# Build, solve and write the results of one scenario (runs in a worker process)
+# With a cache_dir an unchanged scenario is loaded from the solve cache instead of solved
+# With plots the figures of the thesis scripts are written next to the results (plots.py)
+def solve_sweep_scenario(scenario, base_dir, output_dir=None, solver_name=None, threads=None,
+                         formulation='milp', reporting_variables=False, cache_dir=None, tee=False, plots=True):
+    start = time.perf_counter()
+    input_data = load_input_data(os.path.join(base_dir, SEASON_FILES[scenario['season']]))
+    settings = {'max_shift_share': scenario['max_shift_share'],
+                'shift_window': scenario['horizon_hours'] * INTERVALS_PER_HOUR,
+                'receiving_factor': scenario['receiving_factor'], 'formulation': formulation,
+                'reporting_variables': reporting_variables}
+    solver_name = resolve_solver_name(solver_name)
+    pyomo_name = SOLVER_BACKENDS[solver_name]['pyomo_name']
+
+    cache_key = solve_cache_key(input_data, settings, pyomo_name) if cache_dir is not None else None
+    cached = load_cached_solution(cache_dir, cache_key, input_data) if cache_dir is not None else None
+    telemetry = None
+    if cached is not None:
+        results_dict, kpis = cached
+        termination_condition = 'optimal'
+        build_time = time.perf_counter() - start
+        solve_time = 0.0
+    else:
+        model = build_model(input_data, **settings)
+        build_time = time.perf_counter() - start
+
+        solver = get_solver(solver_name, threads=threads)
+        start = time.perf_counter()
+        results, telemetry = solve_with_telemetry(solver, model, tee=tee)
+        solve_time = time.perf_counter() - start
+
+        termination_condition = str(results.solver.termination_condition)
+        if termination_condition == 'optimal':
+            results_dict = extract_results(model, input_data)
+            kpis = solve_kpis(model, results_dict, input_data, solve_time)
+            if cache_dir is not None:
+                store_solution(cache_dir, cache_key, results_dict, kpis)
+
+    optimal = termination_condition == 'optimal'
+    summary = dict(scenario, name=scenario_name(scenario), termination_condition=termination_condition,
+                   cost=kpis['cost'] if optimal else None, cache_hit=cached is not None,
+                   build_time=build_time, solve_time=solve_time, threads=threads, pid=os.getpid())
+    if telemetry is not None:
+        summary.update({key: telemetry[key] for key in ('nodes', 'root_relaxation', 'mip_gap', 'peak_memory_MB')})
+
+    # Write the solver telemetry (also of a failed solve) and the time series results of the
+    # scenario to its results folder
+    folder = os.path.join(output_dir, summary['name']) if output_dir is not None else None
+    if folder is not None and (optimal or telemetry is not None):
+        os.makedirs(folder, exist_ok=True)
+    if folder is not None and telemetry is not None:
+        write_telemetry(dict(telemetry, scenario=scenario, solver_name=solver_name, settings=settings),
+                        os.path.join(folder, 'solver_telemetry.json'))
+    if folder is not None and optimal:
+        summary['output_file'] = os.path.join(folder, f"{summary['name']}.xlsx")
+        results_df = pd.DataFrame(results_dict)
+        results_df.to_excel(summary['output_file'], index=False)
+        if plots:
+            write_result_plots(results_df, folder, input_data['car_ids'], scenario['season'],
+                               scenario_label(scenario['max_shift_share'], scenario['horizon_hours']))
+
+    return summary
+
+
+# Run the scenarios in a process pool; the total solver threads are split evenly between
+# the workers, so parallel workers do not oversubscribe the cores
+# Returns the summaries (one per scenario) in the order of the scenarios
+def run_parallel_sweep(scenarios, base_dir, output_dir=None, workers=None, total_threads=None,
+                       solver_name=None, formulation='milp', reporting_variables=False, cache_dir=None, plots=True):
+    solver_name = resolve_solver_name(solver_name)
+    check_formulation(solver_name, formulation)
+    total_threads = total_threads or os.cpu_count() or 1
+    workers = max(1, min(workers or total_threads, len(scenarios)))
+    threads = max(1, total_threads // workers)
+
+    if output_dir is None:
+        output_dir = os.path.join(base_dir, datetime.datetime.now().strftime("Results_Sweep_%Y-%m-%d_%H-%M-%S"))
+
+    start = time.perf_counter()
+    summaries = [None] * len(scenarios)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(solve_sweep_scenario, scenario, base_dir, output_dir, solver_name, threads,
+                               formulation, reporting_variables, cache_dir, False, plots): i
+                   for i, scenario in enumerate(scenarios)}
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries[futures[future]] = summary
+            print(f"{summary['name']}: {summary['termination_condition']}, cost {summary['cost']}, "
+                  + ("loaded from the solve cache" if summary['cache_hit'] else f"solved in {summary['solve_time']:.2f} s"))
+    wall_time = time.perf_counter() - start
+
+    print(f"{len(scenarios)} scenarios on {workers} workers x {threads} threads in {wall_time:.2f} s "
+          f"(sum of the scenario times {sum(s['build_time'] + s['solve_time'] for s in summaries):.2f} s)")
+    return summaries
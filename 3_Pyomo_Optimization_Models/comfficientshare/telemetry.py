@@ -0,0 +1,163 @@
+# ====================================================================
+# Structured Solver Telemetry (Parsed Solver Log, JSON Next to Results)
+# ====================================================================
+# The solver log of a solve is captured (and still echoed with tee) and
+# parsed into presolve reductions, root relaxation, node count, the
+# incumbent / bound trajectory over time, the final gap, the threads,
+# the peak memory and the termination status, so formulations and slow
+# scenarios can be compared from the telemetry files instead of the
+# console output. The logs of Gurobi and HiGHS are parsed; other solvers
+# (CBC) only report the fields Pyomo returns.
+
+import io
+import json
+import math
+import re
+import resource
+import sys
+import time
+
+from pyomo.common.tee import TeeStream, capture_output
+
+from .engine import relative_mip_gap
+
+
+# Float of a log value, None for '-', 'inf', 'Large' and other missing values
+def _log_float(text):
+    try:
+        value = float(text.rstrip('%'))
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _search(pattern, log, cast=float):
+    match = re.search(pattern, log, re.MULTILINE)
+    return cast(match.group(1)) if match else None
+
+
+# Gurobi log: presolve, root relaxation, branch-and-bound node lines and the final summary
+def _parse_gurobi_log(log):
+    telemetry = {
+        'presolve': {
+            'removed_rows': _search(r'^Presolve removed (\d+) rows', log, int),
+            'removed_columns': _search(r'^Presolve removed \d+ rows and (\d+) columns', log, int),
+            'presolved_rows': _search(r'^Presolved: (\d+) rows', log, int),
+            'presolved_columns': _search(r'^Presolved: \d+ rows, (\d+) columns', log, int),
+            'presolved_nonzeros': _search(r'^Presolved: \d+ rows, \d+ columns, (\d+) nonzeros', log, int),
+            'time': _search(r'^Presolve time: ([\d.]+)s', log),
+        },
+        'root_relaxation': _search(r'^Root relaxation: objective ([-+\deE.]+)', log),
+        'nodes': _search(r'^Explored (\d+) nodes', log, int),
+        'simplex_iterations': (_search(r'^Explored \d+ nodes \((\d+) simplex iterations\)', log, int)
+                               or _search(r'^Solved in (\d+) iterations', log, int)),
+        'threads': (_search(r'^Thread count was (\d+)', log, int)
+                    or _search(r'using up to (\d+) threads', log, int)),
+        'log_objective': (_search(r'^Best objective ([-+\deE.]+)', log, _log_float)
+                          or _search(r'^Optimal objective\s+([-+\deE.]+)', log, _log_float)),
+        'log_bound': _search(r'^Best objective .*, best bound ([-+\deE.]+)', log, _log_float),
+        'log_gap': _search(r'^Best objective .*, gap ([\d.]+)%', log, lambda text: float(text) / 100),
+    }
+
+    # Node lines: (H or *) Expl Unexpl ... Incumbent BestBd Gap It/Node Time
+    trajectory = []
+    for line in log.splitlines():
+        if re.match(r'^Found heuristic solution: objective', line):
+            trajectory.append({'time': None, 'incumbent': _log_float(line.split()[-1]), 'bound': None})
+        elif re.match(r'^[H*]?\s*\d+\+?\s+\d+\s', line) and re.search(r'\d+s$', line):
+            tokens = line.split()
+            trajectory.append({'time': _log_float(tokens[-1].rstrip('s')), 'incumbent': _log_float(tokens[-5]),
+                               'bound': _log_float(tokens[-4])})
+    telemetry['trajectory'] = trajectory
+    return telemetry
+
+
+# HiGHS log: presolve reductions, MIP node lines and the solving report
+def _parse_highs_log(log):
+    telemetry = {
+        'presolve': {
+            'presolved_rows': _search(r'^Presolve reductions: rows (\d+)', log, int),
+            'removed_rows': _search(r'^Presolve reductions: rows \d+\(-(\d+)\)', log, int),
+            'presolved_columns': _search(r'columns (\d+)\(-\d+\)', log, int),
+            'removed_columns': _search(r'columns \d+\(-(\d+)\)', log, int),
+            'presolved_nonzeros': _search(r'nonzeros (\d+)\(-\d+\)', log, int),
+            'time': _search(r'^\s+([\d.]+) \(Presolve\)', log),
+        },
+        'root_relaxation': None,
+        'nodes': _search(r'^\s+Nodes\s+(\d+)', log, int),
+        'simplex_iterations': (_search(r'^\s+LP iterations\s+(\d+)', log, int)
+                               or _search(r'^Simplex\s+iterations: (\d+)', log, int)),
+        'threads': _search(r'Thread count (\d+)', log, int),
+        'log_objective': (_search(r'^\s+Primal bound\s+(\S+)', log, _log_float)
+                          or _search(r'^Objective value\s+:\s+(\S+)', log, _log_float)),
+        'log_bound': _search(r'^\s+Dual bound\s+(\S+)', log, _log_float),
+        'log_gap': _search(r'^\s+Gap\s+([\d.]+)%', log, lambda text: float(text) / 100),
+    }
+
+    # Node lines: Src Proc. InQueue Leaves Expl. BestBound BestSol Gap Cuts InLp Confl. LpIters Time
+    trajectory = []
+    for line in log.splitlines():
+        match = re.match(r'^\s*[A-Za-z]?\s+(\d+)\s+\d+\s+\d+\s+[\d.]+%\s+(\S+)\s+(\S+)\s+\S+.*\s([\d.]+)s$', line)
+        if match:
+            point = {'time': float(match.group(4)), 'incumbent': _log_float(match.group(3)),
+                     'bound': _log_float(match.group(2))}
+            trajectory.append(point)
+            # Root relaxation: the first finite bound of the root node (no node processed yet)
+            if telemetry['root_relaxation'] is None and int(match.group(1)) == 0 and point['bound'] is not None:
+                telemetry['root_relaxation'] = point['bound']
+    telemetry['trajectory'] = trajectory
+    return telemetry
+
+
+# Parse a captured solver log (Gurobi or HiGHS, detected from the banner)
+#   solver - 'gurobi' or 'highs' if known (a persistent solver prints its banner only once)
+def parse_solver_log(log, solver=None):
+    if solver == 'gurobi' or 'Gurobi Optimizer' in log:
+        return dict(_parse_gurobi_log(log), log_solver='gurobi')
+    if solver == 'highs' or 'Running HiGHS' in log:
+        return dict(_parse_highs_log(log), log_solver='highs')
+    return {'log_solver': None, 'presolve': {}, 'root_relaxation': None, 'nodes': None, 'simplex_iterations': None,
+            'threads': None, 'log_objective': None, 'log_bound': None, 'log_gap': None, 'trajectory': []}
+
+
+# Peak memory of the process and of its finished child processes (ru_maxrss is in kB on Linux)
+def peak_memory_mb():
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+
+
+# Solve with the solver log captured; tee also echoes the log to the console
+# Returns the Pyomo results and the telemetry record of the solve
+def solve_with_telemetry(solver, model, tee=True, **solve_options):
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    with TeeStream(*((sys.stdout, buffer) if tee else (buffer,))) as streams:
+        with capture_output(streams.STDOUT):
+            results = solver.solve(model, tee=True, **solve_options)
+    wall_time = time.perf_counter() - start
+
+    log = buffer.getvalue()
+    telemetry = parse_solver_log(log)
+    lower_bound = _log_float(str(results.problem.lower_bound))
+    upper_bound = _log_float(str(results.problem.upper_bound))
+    telemetry.update({
+        'termination_condition': str(results.solver.termination_condition),
+        'wall_time': wall_time,
+        'objective': upper_bound if upper_bound is not None else telemetry['log_objective'],
+        'best_bound': lower_bound if lower_bound is not None else telemetry['log_bound'],
+        'threads': telemetry['threads'] if telemetry['threads'] is not None else solver.options.get('threads', solver.options.get('Threads')),
+        'peak_memory_MB': peak_memory_mb(),
+        'solver_options': dict(solver.options),
+        'variables': model.nvariables(),
+        'constraints': model.nconstraints(),
+        'log_lines': log.count('\n'),
+    })
+    telemetry['mip_gap'] = (telemetry['log_gap'] if telemetry['log_gap'] is not None
+                            else relative_mip_gap(telemetry['objective'], telemetry['best_bound']))
+    return results, telemetry
+
+
+# Write a telemetry record (or a list of records) as JSON
+def write_telemetry(telemetry, file_path):
+    with open(file_path, 'w') as telemetry_file:
+        json.dump(telemetry, telemetry_file, indent=2, default=str)
@@ -0,0 +1,57 @@
+# ====================================================================
+# Year-Long Data Preparation: Merging of Short Stays at Home
+# ====================================================================
+
+import numpy as np
+
+from comfficientshare.annual import _merge_short_stays, _recharge_intervals
+
+
+MAX_TRIP_DISTANCE = 400
+
+
+# Random car schedules with short and long stays at home; the trip distance is recorded at
+# the last interval away before each arrival, as in load_input_data / load_fleet_csv
+def _random_fleet(n_cars=20, n_T=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    location = np.ones((n_cars, n_T), dtype=int)
+    distance = np.zeros((n_cars, n_T))
+    for car in range(n_cars):
+        t = int(rng.integers(0, 20))
+        while t < n_T:
+            away = int(rng.integers(1, 30))
+            location[car, t:t + away] = 0
+            if t + away < n_T:
+                distance[car, t + away - 1] = rng.uniform(5, 300)
+            t += away + int(rng.integers(1, 40))
+    return location, distance
+
+
+# Arrival intervals (last interval away before the car is at home again) of each car
+def _arrivals(location):
+    return (location[:, :-1] == 0) & (location[:, 1:] == 1)
+
+
+def test_merge_short_stays_keeps_the_trip_distance():
+    location, distance = _random_fleet()
+    total = distance.sum()
+    merged = _merge_short_stays(location, distance, MAX_TRIP_DISTANCE)
+
+    assert merged > 0
+    assert np.isclose(distance.sum(), total)
+    # Every distance is at an arrival interval (or at the end of a tour that does not return)
+    recorded = np.argwhere(distance > 0)
+    arrivals = _arrivals(location)
+    assert all(t == location.shape[1] - 1 or arrivals[car, t] for car, t in recorded)
+
+
+def test_merge_short_stays_leaves_stays_long_enough_to_recharge():
+    location, distance = _random_fleet(seed=1)
+    _merge_short_stays(location, distance, MAX_TRIP_DISTANCE)
+
+    for car_location, car_distance in zip(location, distance):
+        for arrival in np.flatnonzero((car_location[:-1] == 0) & (car_location[1:] == 1)):
+            departures = np.flatnonzero(car_location[arrival + 1:] == 0)
+            if len(departures):
+                stay = departures[0]
+                assert stay - 1 >= _recharge_intervals(min(car_distance[arrival], MAX_TRIP_DISTANCE))
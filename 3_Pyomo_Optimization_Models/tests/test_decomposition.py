@@ -0,0 +1,49 @@
+# ====================================================================
+# Per-Car Decomposition Against the Monolithic MILP Optimum
+# ====================================================================
+
+import os
+
+import pyomo.environ as pyo
+import pytest
+
+from comfficientshare import build_model, load_input_data, solve_decomposition
+from comfficientshare.model import STATIC_PARAMETERS
+from comfficientshare.rolling import slice_input_data
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOKS = {
+    'summer': os.path.join(BASE_DIR, 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx'),
+    'winter': os.path.join(BASE_DIR, 'Pyomo_Optimization_Model_Winter', 'Comfficientshare_v10_Winter.xlsx'),
+}
+
+# Relative MIP gap of HiGHS (mip_rel_gap default) on the monolithic and the building solves
+MIP_GAP = 1e-4
+TOLERANCE = 1e-3
+
+
+# Summer week with the connection limit of the thesis, and two winter days with a lower limit
+# that binds, so the multipliers and the repair of the schedule are exercised
+@pytest.mark.parametrize('season, intervals, upper_power_limit', [
+    ('summer', None, STATIC_PARAMETERS['Upper_Power_Limit']),
+    ('winter', 192, 25),
+])
+def test_decomposition_bounds_contain_the_monolithic_optimum(monkeypatch, season, intervals, upper_power_limit):
+    monkeypatch.setitem(STATIC_PARAMETERS, 'Upper_Power_Limit', upper_power_limit)
+    input_data = load_input_data(WORKBOOKS[season])
+    if intervals is not None:
+        input_data = slice_input_data(input_data, 0, intervals)
+
+    model = build_model(input_data, formulation='milp')
+    pyo.SolverFactory('appsi_highs').solve(model)
+    monolithic = pyo.value(model.objective)
+
+    _, iterations = solve_decomposition(input_data, solver_name='highs', workers=2, tolerance=TOLERANCE,
+                                        upper_power_limit=upper_power_limit, formulation='milp')
+    lower_bound, upper_bound = iterations[-1]['lower_bound'], iterations[-1]['upper_bound']
+    scale = max(1.0, abs(monolithic))
+
+    assert lower_bound <= monolithic + MIP_GAP * scale
+    assert monolithic <= upper_bound + MIP_GAP * scale
+    assert upper_bound - monolithic <= TOLERANCE * scale
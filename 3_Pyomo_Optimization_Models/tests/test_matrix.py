@@ -0,0 +1,45 @@
+# ====================================================================
+# Parity of the Sparse-Matrix Backend with the Pyomo Model
+# ====================================================================
+
+import os
+
+import numpy as np
+import pytest
+
+from comfficientshare import check_parity, load_input_data
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOKS = {
+    'summer': os.path.join(BASE_DIR, 'Pyomo_Optimization_Model_Summer', 'Comfficientshare_v9_Summer.xlsx'),
+    'winter': os.path.join(BASE_DIR, 'Pyomo_Optimization_Model_Winter', 'Comfficientshare_v10_Winter.xlsx'),
+}
+
+# Relative MIP gap of HiGHS (mip_rel_gap default), the costs of the two models may differ by it
+MIP_GAP = 1e-4
+
+
+@pytest.mark.parametrize('formulation', ['milp', 'transport'])
+@pytest.mark.parametrize('season', ['summer', 'winter'])
+def test_matrix_backend_matches_pyomo(season, formulation):
+    input_data = load_input_data(WORKBOOKS[season])
+    summary = check_parity(input_data, solver_name='highs', formulation=formulation,
+                           max_shift_share=0.20, receiving_factor=1.20, shift_window=24)
+
+    assert summary['pyomo_termination_condition'] == 'optimal'
+    assert summary['parity']
+    assert summary['cost_difference'] <= MIP_GAP * max(1.0, abs(summary['pyomo_cost']))
+
+
+def test_parity_without_solution_is_false():
+    input_data = load_input_data(WORKBOOKS['summer'])
+    # A trip longer than the battery range: the car arrives below SOC_min
+    location = input_data['car_location'][0]
+    arrival = np.flatnonzero((location[:-1] == 0) & (location[1:] == 1))[0]
+    input_data['car_trip_distance'] = input_data['car_trip_distance'].copy()
+    input_data['car_trip_distance'][0, arrival] = 1000
+
+    summary = check_parity(input_data, solver_name='highs', formulation='transport')
+    assert not summary['parity']
+    assert summary['pyomo_cost'] is None